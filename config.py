@@ -11,10 +11,58 @@ OPT_CONVERGENCE_FILE = './settings/opt_convergence.dat'
 OPT_ALGORITHM_FILE = './settings/opt_algorithm.dat'
 D3ZERO_PARAM_FILE = './settings/D3ZERO.dat'
 D3BJ_PARAM_FILE = './settings/D3BJ.dat'
+BASIS_FUNCTIONS_FILE = './settings/basis_functions.dat'
+NODE_PROFILE_FILE = './settings/node_profile.dat'
+PREOPT_METHOD_FILE = './settings/preopt_method.dat'
 
 # directory to store external basis set files
 EXTERNAL_BASIS_DIR = './extbasis'
 
+# file extensions collected as structure files when a directory is added in batch mode
+STRUCTURE_FILE_EXTENSIONS = ['gjf', 'gjc', 'com', 'log', 'out', 'xyz']
+
+# number of threads to scan directories and check files
+FILE_SCAN_THREADS = 8
+
+# minimum interval (ms) to write buffered messages to the log control
+LOG_FLUSH_INTERVAL = 200
+
+# watch folder mode
+WATCH_FILE_EXTENSIONS = ['xyz', 'log', 'out']  # gjf is not watched because generated files are put in the same place
+WATCH_INTERVAL = 5.0  # polling interval (s)
+WATCH_SETTLE_TIME = 5.0  # files unchanged for this time (s) are treated as completely written
+WATCH_STATE_FILE = '.gauprep_watch.json'
+
+# csv file name of cost estimates of generated jobs
+COST_REPORT_FILE = 'gauprep_cost.csv'
+
+# archive or multi-job (Link1) file name of batch mode without extension (series mode: structure file name + _jobs)
+OUTPUT_SINK_STEM = 'gauprep_jobs'
+
+# output root: jobs per directory (shard policy: number), hex digits of the directory name (hash), manifest file
+SHARD_SIZE = 1000
+SHARD_HASH_LENGTH = 2
+MANIFEST_FILE = 'gauprep_manifest.csv'
+
+# summary of log files (csv/json file name without extension, number of processes: None for CPUs)
+LOG_SUMMARY_FILE = 'gauprep_log_summary'
+LOG_SUMMARY_PROCESSES = None
+
+# sweep of levels of theory: csv file of the combination labels and their values
+SWEEP_INDEX_FILE = 'gauprep_sweep.csv'
+
+# duplicate jobs in batch mode: decimals of the aligned coordinates (A), csv file of the duplicates
+DEDUP_DECIMALS = 2
+DUPLICATES_FILE = 'gauprep_duplicates.csv'
+
+# job script generation (bundles of jobs run on one node)
+SCHEDULER_TEMPLATES = {'slurm': './settings/scheduler_slurm.tmpl', 'pbs': './settings/scheduler_pbs.tmpl'}
+BUNDLE_FILE = 'gauprep_bundles.txt'
+SCHEDULER_SCRIPT = 'gauprep_array.sh'
+
+# methods without basis sets (used for pre-optimization)
+SEMIEMPIRICAL_METHODS = ['AM1', 'PM3', 'PM3MM', 'PM6', 'PM7', 'PDDG', 'ZINDO']
+
 # default and fixed keywords in route sections
 DEFAULT_ROUTE_KEYWORDS = 'INT=ultrafine SCF=(tight,xqc)'
 
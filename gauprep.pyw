@@ -1,9 +1,9 @@
 import os
 import sys
 import configparser
-import glob
+import threading
 from pathlib import Path
-from typing import Union
+from typing import Union, Optional
 
 import wx
 from wx import xrc
@@ -11,10 +11,18 @@ from wx import xrc
 APP_DIR = (os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(APP_DIR)
 
-from gauprep import structure_reader
+from gauprep import structure_reader, output_check, conformer, file_list as batch_file_list
+from gauprep.cost import CostReport
+from gauprep import resources, scheduler, restart, log_summary, ensemble_reader, output_sink, output_layout
+from gauprep import settings, sweep, dedup
 from gauprep.gaussian_input import GaussianInputData
+from gauprep.job_writer import write_jobs, get_job_files, ChainWriter
+from gauprep.watcher import FolderWatcher
 import config
 
+PREOPT_SAME_BASIS = 'same'
+IRC_ENDPOINT_SUFFIXES = {'forward': '_fwd', 'reverse': '_rev'}
+
 # Notes:
 # ${NAME} ${NUMBER} are replaced in the interface (here)
 # ${FILENAME} ${GEN} are replaced in the GaussianInputData class
@@ -47,8 +55,12 @@ class MyFileDropTarget(wx.FileDropTarget):
                 self.window.set_title_auto()
 
     def load_to_batch(self, file_list):
-        output_file_list = (self.window.text_ctrl_batch_file_list.GetValue()).split('\n')
-        expanded_file_list = self.expand_file_list(file_list)
+        output_file_list = list(self.window.list_ctrl_batch_file_list.file_list)
+        # sset files in directories are loaded as before
+        expanded_file_list = batch_file_list.expand_file_list(file_list,
+                                                              include=self.window.text_ctrl_batch_include.GetValue(),
+                                                              exclude=self.window.text_ctrl_batch_exclude.GetValue(),
+                                                              extensions=config.STRUCTURE_FILE_EXTENSIONS + ['sset'])
 
         for file in expanded_file_list:
             ext = os.path.splitext(os.path.basename(file))[1]
@@ -57,7 +69,7 @@ class MyFileDropTarget(wx.FileDropTarget):
             else:
                 output_file_list.append(file)
 
-        self.window.text_ctrl_batch_file_list.SetValue('\n'.join(output_file_list))
+        self.window.list_ctrl_batch_file_list.set_file_list(output_file_list)
         self.window.clean_up_batch_file_list()
 
     def load_to_series(self, file_list):
@@ -69,25 +81,193 @@ class MyFileDropTarget(wx.FileDropTarget):
                 self.window.set_series_output_file_auto()
                 self.window.set_series_title_auto()
 
-    @staticmethod
-    def expand_file_list(file_list):
+
+class BatchListCtrl(wx.ListCtrl):
+    """
+    Virtual list control for the batch queue. Only the visible rows are rendered.
+    """
+    COLUMNS = [('file', 300), ('status', 70), ('charge/mult', 75), ('output', 300)]
+
+    def __init__(self, parent, output_file_getter):
+        wx.ListCtrl.__init__(self, parent, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_HRULES)
+        for (i, (label, width)) in enumerate(self.COLUMNS):
+            self.InsertColumn(i, label, width=width)
+        self.output_file_getter = output_file_getter  # function: file > expected output file
+        self.file_list = []
+        self.status = dict()  # file > status string (not in dict: queued)
+        self.charge_multi = dict()  # file > (charge, multi) detected when read
+        self.output_files = dict()  # file > actually generated files
+        self.source_root = None  # common directory of the files (cache)
+        self.Bind(wx.EVT_KEY_DOWN, self.on_key_down)
+
+    def set_file_list(self, file_list):
+        self.file_list = list(file_list)
+        self.source_root = None
+        self.SetItemCount(len(self.file_list))
+        self.Refresh()
+
+    def get_source_root(self):
+        """
+        Common directory of the files ('' if there is none, e.g. on different drives)
+        """
+        if self.source_root is None:
+            try:
+                self.source_root = os.path.commonpath([os.path.dirname(os.path.abspath(f)) for f in self.file_list])
+            except ValueError:
+                self.source_root = ''
+        return self.source_root
+
+    def clear(self):
+        self.status.clear()
+        self.charge_multi.clear()
+        self.output_files.clear()
+        self.set_file_list([])
+
+    def set_result(self, file, status, charge=None, multi=None, output_files=None):
         """
-        ディレクトリを含むファイル名のリストが与えられたとき、ディレクトリ内部も検索して、それ以下にある全ファイルリストを返す
+        output_files: list of files generated for the file
         """
-        expanded_list = []
+        self.status[file] = status
+        if charge is not None and multi is not None:
+            self.charge_multi[file] = (charge, multi)
+        if output_files is not None:
+            self.output_files[file] = '; '.join(str(f) for f in output_files)
+
+    def get_selected_indices(self):
+        selected = []
+        item = self.GetFirstSelected()
+        while item != -1:
+            selected.append(item)
+            item = self.GetNextSelected(item)
+        return selected
+
+    def remove_selected(self):
+        selected = set(self.get_selected_indices())
+        if not selected:
+            return
+        for item in selected:
+            self.Select(item, on=0)
+        self.set_file_list([f for (i, f) in enumerate(self.file_list) if i not in selected])
+
+    def OnGetItemText(self, item, column):
+        file = self.file_list[item]
+        if column == 0:
+            return file
+        elif column == 1:
+            return self.status.get(file, 'queued')
+        elif column == 2:
+            if file in self.charge_multi:
+                return '{:} {:}'.format(*self.charge_multi[file])
+            return ''
+        else:
+            if file in self.output_files:
+                return self.output_files[file]
+            return str(self.output_file_getter(file, item + 1))
 
-        for file in file_list:
-            if os.path.isdir(file):  # ディレクトリが与えられた場合
-                glob_list = glob.glob(file + "/**", recursive=True)  # ディレクトリ内の全ファイル・ディレクトリリストを取得（子ディレクトリも検索）
-                # 全リストのうち、ファイルであるものをexpanded_listに追加する
-                for f in glob_list:
-                    if os.path.isfile(f):
-                        expanded_list.append(f)
+    def on_key_down(self, event):
+        if event.GetKeyCode() in [wx.WXK_DELETE, wx.WXK_BACK]:
+            self.remove_selected()
+        else:
+            event.Skip()
+
+
+class LogSink:
+    """
+    File-like log buffer for the log text control.
+    Messages are accumulated and written to the control at most once per flush interval.
+    Messages may be written from worker threads (e.g. sys.stderr), the control is updated in the main thread.
+    """
+    def __init__(self, text_ctrl: wx.TextCtrl, interval: int = config.LOG_FLUSH_INTERVAL):
+        self.text_ctrl = text_ctrl
+        self.interval = interval  # ms
+        self.buffer = []
+        self.scheduled = False
+        self.lock = threading.Lock()
+
+    def write(self, text):
+        with self.lock:
+            self.buffer.append(text)
+            if self.scheduled:
+                return
+            self.scheduled = True
+        if wx.IsMainThread():
+            wx.CallLater(self.interval, self.flush)
+        else:
+            # timers (wx.CallLater) should be started in the main thread
+            wx.CallAfter(wx.CallLater, self.interval, self.flush)
+
+    def flush(self):
+        if not wx.IsMainThread():
+            return  # e.g. print(flush=True) in a worker thread: the scheduled flush writes the buffer
+        with self.lock:
+            self.scheduled = False
+            if not self.buffer:
+                return
+            text = ''.join(self.buffer)
+            self.buffer = []
+        self.text_ctrl.AppendText(text)
+
+
+class ConflictDialog(wx.Dialog):
+    """
+    One dialog for all conflicting output files in a batch.
+    Checked files are overwritten and unchecked files are skipped, or one action is applied to all.
+    """
+    OVERWRITE = 'overwrite'
+    SKIP = 'skip'
+    RENAME = 'rename'
+
+    def __init__(self, parent, files):
+        wx.Dialog.__init__(self, parent, title='Overwrite?', size=(700, 450),
+                           style=wx.DEFAULT_DIALOG_STYLE | wx.RESIZE_BORDER)
+        self.files = [str(f) for f in files]
+        self.action_for_all = None
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        message = wx.StaticText(self, label='{:} output files already exist or are duplicated. '
+                                            'Checked files will be overwritten.'.format(len(self.files)))
+        sizer.Add(message, 0, wx.ALL, 5)
+        self.check_list_box = wx.CheckListBox(self, choices=self.files)
+        sizer.Add(self.check_list_box, 1, wx.ALL | wx.EXPAND, 5)
+
+        button_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        for (label, handler) in [('apply checked', self.on_apply),
+                                 ('overwrite all', self.on_overwrite_all),
+                                 ('skip all', self.on_skip_all),
+                                 ('rename all', self.on_rename_all),
+                                 ('cancel', self.on_cancel)]:
+            button = wx.Button(self, label=label)
+            button.Bind(wx.EVT_BUTTON, handler)
+            button_sizer.Add(button, 0, wx.ALL, 5)
+        sizer.Add(button_sizer, 0, wx.ALIGN_RIGHT)
+        self.SetSizer(sizer)
+
+    def get_actions(self):
+        """
+        :return: list of actions for each file (same order as given files)
+        """
+        if self.action_for_all is not None:
+            return [self.action_for_all] * len(self.files)
+        checked = set(self.check_list_box.GetCheckedItems())
+        return [self.OVERWRITE if i in checked else self.SKIP for i in range(len(self.files))]
+
+    def on_apply(self, event):
+        self.EndModal(wx.ID_OK)
 
-            else:  # ファイルの場合はそのまま追加
-                expanded_list.append(file)
+    def on_overwrite_all(self, event):
+        self.action_for_all = self.OVERWRITE
+        self.EndModal(wx.ID_OK)
 
-        return expanded_list
+    def on_skip_all(self, event):
+        self.action_for_all = self.SKIP
+        self.EndModal(wx.ID_OK)
+
+    def on_rename_all(self, event):
+        self.action_for_all = self.RENAME
+        self.EndModal(wx.ID_OK)
+
+    def on_cancel(self, event):
+        self.EndModal(wx.ID_CANCEL)
 
 
 class GauprepApp(wx.App):
@@ -101,6 +281,7 @@ class GauprepApp(wx.App):
         self.frame = self.res.LoadFrame(None, 'frame')
         self.frame.SetSize((800, 800))
         self.load_controls()
+        self.create_batch_list_ctrl()
         self.init_controls()
         # self.check_controls()
 
@@ -111,6 +292,18 @@ class GauprepApp(wx.App):
         # Bind event handlers
         self.set_events()
 
+        # the unknown number of basis functions (auto resources) is logged once for each output
+        self.resource_warning_logged = False
+
+        # watch folder mode
+        self.watcher = None
+        self.watch_thread = None  # thread of the current poll
+        self.watch_timer = wx.Timer(self.frame)
+        self.frame.Bind(wx.EVT_TIMER, self.on_watch_timer, self.watch_timer)
+
+        # log summary (worker thread)
+        self.log_summary_thread = None
+
         # menu
         self.create_menu_bar()
 
@@ -121,8 +314,8 @@ class GauprepApp(wx.App):
         self.reset_batch_settings()
 
         # redirect
-        sys.stdout = self.text_ctrl_log
-        sys.stderr = self.text_ctrl_log
+        sys.stdout = self.log_sink
+        sys.stderr = self.log_sink
 
         self.frame.Show()
 
@@ -139,11 +332,21 @@ class GauprepApp(wx.App):
         self.button_title_auto: wx.Button = xrc.XRCCTRL(self.frame, 'button_title_auto')
 
         # General: batch job
-        self.text_ctrl_batch_file_list: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_file_list')
         self.text_ctrl_batch_prefix: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_prefix')
         self.text_ctrl_batch_suffix: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_suffix')
         self.text_ctrl_batch_title: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_title')
+        self.text_ctrl_batch_include: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_include')
+        self.text_ctrl_batch_exclude: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_exclude')
         self.checkbox_batch_overwrite: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_batch_overwrite')
+        self.checkbox_batch_cost_report: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_batch_cost_report')
+        self.checkbox_batch_dedup: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_batch_dedup')
+        self.checkbox_batch_irc_endpoints: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_batch_irc_endpoints')
+        self.checkbox_batch_restart: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_batch_restart')
+        self.choice_batch_restart_geometry: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_batch_restart_geometry')
+        self.choice_batch_output_sink: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_batch_output_sink')
+        self.text_ctrl_batch_output_root: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_output_root')
+        self.choice_batch_shard: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_batch_shard')
+        self.text_ctrl_batch_sweep: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_batch_sweep')
         self.button_batch_reset: wx.Button = xrc.XRCCTRL(self.frame, 'button_batch_reset')
 
         # General series job
@@ -158,10 +361,24 @@ class GauprepApp(wx.App):
         self.button_series_xyz_file: wx.Button = xrc.XRCCTRL(self.frame, 'button_series_xyz_file')
         self.button_series_output_file_auto: wx.Button = xrc.XRCCTRL(self.frame, 'button_series_output_file_auto')
         self.button_series_title_auto: wx.Button = xrc.XRCCTRL(self.frame, 'button_series_title_auto')
+        self.checkbox_series_prune: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_series_prune')
+        self.choice_series_prune_method: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_series_prune_method')
+        self.text_ctrl_series_prune_threshold: wx.TextCtrl = xrc.XRCCTRL(self.frame,
+                                                                         'text_ctrl_series_prune_threshold')
+        self.text_ctrl_series_prune_energy_window: wx.TextCtrl = xrc.XRCCTRL(self.frame,
+                                                                             'text_ctrl_series_prune_energy_window')
+        self.checkbox_series_cost_report: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_series_cost_report')
+        self.choice_series_output_sink: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_series_output_sink')
+        self.text_ctrl_series_output_root: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_series_output_root')
+        self.choice_series_shard: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_series_shard')
+        self.text_ctrl_series_chain_length: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_series_chain_length')
+        self.choice_series_chain_mode: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_series_chain_mode')
 
         # Link0
         self.text_ctrl_cpu_cores: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_cpu_cores')
         self.text_ctrl_memory: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_memory')
+        self.checkbox_auto_resources: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_auto_resources')
+        self.choice_node_profile: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_node_profile')
 
         # Model
         self.choice_method: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_method')
@@ -191,6 +408,11 @@ class GauprepApp(wx.App):
         self.text_ctrl_opt_maxstep: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_opt_maxstep')
         self.text_ctrl_opt_calcfc: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_opt_calcfc')
         self.text_ctrl_opt_modredundant: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_opt_modredundant')
+        self.checkbox_opt_split_scan: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_opt_split_scan')
+        self.choice_opt_preopt_method: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_opt_preopt_method')
+        self.choice_opt_preopt_basis: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_opt_preopt_basis')
+        self.choice_opt_preopt_basis_h_ecp: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_opt_preopt_basis_h_ecp')
+        self.choice_opt_preopt_convergence: wx.Choice = xrc.XRCCTRL(self.frame, 'choice_opt_preopt_convergence')
         self.button_opt_output: wx.Button = xrc.XRCCTRL(self.frame, 'button_opt_output')
 
         # Job: IRC
@@ -201,6 +423,8 @@ class GauprepApp(wx.App):
         self.text_ctrl_irc_maxcyc: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_irc_maxcyc')
         self.text_ctrl_irc_calcfc_predictor: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_irc_calcfc_predictor')
         self.text_ctrl_irc_calcfc_corrector: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_irc_calcfc_corrector')
+        self.checkbox_irc_split: wx.CheckBox = xrc.XRCCTRL(self.frame, 'checkbox_irc_split')
+        self.radio_box_irc_split_fc: wx.RadioBox = xrc.XRCCTRL(self.frame, 'radio_box_irc_split_fc')
         self.button_irc_output: wx.Button = xrc.XRCCTRL(self.frame, 'button_irc_output')
 
         # Job: WFX
@@ -220,6 +444,12 @@ class GauprepApp(wx.App):
 
         # Log
         self.text_ctrl_log: wx.TextCtrl = xrc.XRCCTRL(self.frame, 'text_ctrl_log')
+        self.log_sink = LogSink(self.text_ctrl_log)
+
+    def create_batch_list_ctrl(self):
+        # virtual list control is not available in xrc, so it is attached to the placeholder.
+        self.list_ctrl_batch_file_list = BatchListCtrl(self.frame, self.get_batch_output_file)
+        self.res.AttachUnknownControl('list_ctrl_batch_file_list', self.list_ctrl_batch_file_list, self.frame)
 
     def init_controls(self):
         # set choice controls from setting file
@@ -229,6 +459,21 @@ class GauprepApp(wx.App):
         self.append_items_from_file(self.choice_solvent, config.SOLVENT_FILE)
         self.append_items_from_file(self.choice_opt_convergence, config.OPT_CONVERGENCE_FILE)
         self.append_items_from_file(self.choice_opt_algorithm, config.OPT_ALGORITHM_FILE)
+        self.append_items_from_file(self.choice_opt_preopt_method, config.PREOPT_METHOD_FILE)
+        # 'same' for the same basis set as the target level
+        self.choice_opt_preopt_basis.Append(PREOPT_SAME_BASIS)
+        self.append_items_from_file(self.choice_opt_preopt_basis, config.BASIS_FILE)
+        self.choice_opt_preopt_basis_h_ecp.Append(PREOPT_SAME_BASIS)
+        self.append_items_from_file(self.choice_opt_preopt_basis_h_ecp, config.BASIS_H_ECP_file)
+        self.append_items_from_file(self.choice_opt_preopt_convergence, config.OPT_CONVERGENCE_FILE)
+        self.choice_opt_preopt_method.SetSelection(0)
+        self.choice_opt_preopt_basis.SetSelection(0)
+        self.choice_opt_preopt_basis_h_ecp.SetSelection(0)
+        self.choice_opt_preopt_convergence.SetStringSelection('loose')
+        for profile_name in resources.get_node_profile_names():
+            self.choice_node_profile.Append(profile_name)
+        if self.choice_node_profile.GetCount() > 0:
+            self.choice_node_profile.SetSelection(0)
 
     def check_controls(self):
         assert self.notebook_general is not None
@@ -238,11 +483,22 @@ class GauprepApp(wx.App):
         assert self.button_output_file_auto is not None
         assert self.text_ctrl_title is not None
         assert self.button_title_auto is not None
-        assert self.text_ctrl_batch_file_list is not None
+        assert self.list_ctrl_batch_file_list is not None
         assert self.text_ctrl_batch_prefix is not None
         assert self.text_ctrl_batch_suffix is not None
         assert self.text_ctrl_batch_title is not None
+        assert self.text_ctrl_batch_include is not None
+        assert self.text_ctrl_batch_exclude is not None
         assert self.checkbox_batch_overwrite is not None
+        assert self.checkbox_batch_cost_report is not None
+        assert self.checkbox_batch_dedup is not None
+        assert self.checkbox_batch_irc_endpoints is not None
+        assert self.checkbox_batch_restart is not None
+        assert self.choice_batch_restart_geometry is not None
+        assert self.choice_batch_output_sink is not None
+        assert self.text_ctrl_batch_output_root is not None
+        assert self.choice_batch_shard is not None
+        assert self.text_ctrl_batch_sweep is not None
         assert self.button_batch_reset is not None
         assert self.text_ctrl_series_charge is not None
         assert self.text_ctrl_series_multiplicity is not None
@@ -253,8 +509,20 @@ class GauprepApp(wx.App):
         assert self.button_series_xyz_file is not None
         assert self.button_series_output_file_auto is not None
         assert self.button_series_title_auto is not None
+        assert self.checkbox_series_prune is not None
+        assert self.choice_series_prune_method is not None
+        assert self.text_ctrl_series_prune_threshold is not None
+        assert self.text_ctrl_series_prune_energy_window is not None
+        assert self.checkbox_series_cost_report is not None
+        assert self.choice_series_output_sink is not None
+        assert self.text_ctrl_series_output_root is not None
+        assert self.choice_series_shard is not None
+        assert self.text_ctrl_series_chain_length is not None
+        assert self.choice_series_chain_mode is not None
         assert self.text_ctrl_cpu_cores is not None
         assert self.text_ctrl_memory is not None
+        assert self.checkbox_auto_resources is not None
+        assert self.choice_node_profile is not None
         assert self.choice_method is not None
         assert self.choice_basis is not None
         assert self.choice_basis_h_ecp is not None
@@ -276,6 +544,11 @@ class GauprepApp(wx.App):
         assert self.text_ctrl_opt_maxstep is not None
         assert self.text_ctrl_opt_calcfc is not None
         assert self.text_ctrl_opt_modredundant is not None
+        assert self.checkbox_opt_split_scan is not None
+        assert self.choice_opt_preopt_method is not None
+        assert self.choice_opt_preopt_basis is not None
+        assert self.choice_opt_preopt_basis_h_ecp is not None
+        assert self.choice_opt_preopt_convergence is not None
         assert self.button_opt_output is not None
         assert self.radio_box_irc_algorithm is not None
         assert self.radio_box_irc_direction is not None
@@ -284,6 +557,8 @@ class GauprepApp(wx.App):
         assert self.text_ctrl_irc_maxcyc is not None
         assert self.text_ctrl_irc_calcfc_predictor is not None
         assert self.text_ctrl_irc_calcfc_corrector is not None
+        assert self.checkbox_irc_split is not None
+        assert self.radio_box_irc_split_fc is not None
         assert self.button_irc_output is not None
         assert self.button_wfx_output is not None
         assert self.radio_box_nbo_version is not None
@@ -309,6 +584,8 @@ class GauprepApp(wx.App):
         self.button_wfx_output.Bind(wx.EVT_BUTTON, self.on_button_wfx_output)
         self.button_nbo_output.Bind(wx.EVT_BUTTON, self.on_button_nbo_output)
         self.button_any_output.Bind(wx.EVT_BUTTON, self.on_button_any_output)
+        self.text_ctrl_batch_prefix.Bind(wx.EVT_TEXT, self.on_text_batch_output_name)
+        self.text_ctrl_batch_suffix.Bind(wx.EVT_TEXT, self.on_text_batch_output_name)
 
         self.frame.Bind(wx.EVT_CLOSE, self.on_exit)
 
@@ -333,16 +610,26 @@ class GauprepApp(wx.App):
         menu_save = file.Append(12, "&Save\tCtrl+S")
         menu_load_default = file.Append(13, "&Load Default\tCtrl+D")
         menu_bar.Append(file, "&File")
+        tools = wx.Menu()
+        menu_watch_start = tools.Append(21, "Start &Watch Folder...")
+        menu_watch_stop = tools.Append(22, "Stop Watch Folder")
+        menu_job_script = tools.Append(23, "Make &Job Script from Cost Report...")
+        menu_log_summary = tools.Append(24, "&Summarize Logs in Batch List...")
+        menu_bar.Append(tools, "&Tools")
         self.frame.SetMenuBar(menu_bar)
 
         # event set for menus
         self.Bind(wx.EVT_MENU, self.on_menu_open, menu_open)
         self.Bind(wx.EVT_MENU, self.on_menu_save, menu_save)
         self.Bind(wx.EVT_MENU, self.on_menu_load_default, menu_load_default)
+        self.Bind(wx.EVT_MENU, self.on_menu_watch_start, menu_watch_start)
+        self.Bind(wx.EVT_MENU, self.on_menu_watch_stop, menu_watch_stop)
+        self.Bind(wx.EVT_MENU, self.on_menu_job_script, menu_job_script)
+        self.Bind(wx.EVT_MENU, self.on_menu_log_summary, menu_log_summary)
 
     def logging(self, message):
         log_string = (''.join(message)).rstrip()
-        self.text_ctrl_log.write(log_string + '\n')
+        self.log_sink.write(log_string + '\n')
 
     def file_load(self, file: Union[str, Path]):
         """
@@ -353,6 +640,8 @@ class GauprepApp(wx.App):
 
         self.text_ctrl_cpu_cores.SetValue(setdata.get('Link0', 'cpu_cores'))
         self.text_ctrl_memory.SetValue(setdata.get('Link0', 'memory'))
+        self.checkbox_auto_resources.SetValue(setdata.getboolean('Link0', 'auto', fallback=False))
+        self.choice_node_profile.SetStringSelection(setdata.get('Link0', 'node_profile', fallback=''))
 
         self.choice_method.SetStringSelection(setdata.get('Model', 'method'))
         self.choice_basis.SetStringSelection(setdata.get('Model', 'basis'))
@@ -377,6 +666,14 @@ class GauprepApp(wx.App):
         self.text_ctrl_opt_calcfc.SetValue(setdata.get('Opt', 'calcfc'))
         self.choice_opt_algorithm.SetStringSelection(setdata.get('Opt', 'algorithm'))
         self.text_ctrl_opt_modredundant.SetValue(setdata.get('Opt', 'modredundant'))
+        self.checkbox_opt_split_scan.SetValue(setdata.getboolean('Opt', 'split_scan', fallback=False))
+        self.choice_opt_preopt_method.SetStringSelection(setdata.get('Opt', 'preopt_method', fallback='none'))
+        self.choice_opt_preopt_basis.SetStringSelection(setdata.get('Opt', 'preopt_basis', fallback='')
+                                                        or PREOPT_SAME_BASIS)
+        self.choice_opt_preopt_basis_h_ecp.SetStringSelection(setdata.get('Opt', 'preopt_basis_h_ecp', fallback='')
+                                                              or PREOPT_SAME_BASIS)
+        self.choice_opt_preopt_convergence.SetStringSelection(setdata.get('Opt', 'preopt_convergence',
+                                                                          fallback='loose'))
 
         self.radio_box_irc_algorithm.SetStringSelection(setdata.get('IRC', 'algorithm'))
         self.radio_box_irc_direction.SetStringSelection(setdata.get('IRC', 'direction'))
@@ -385,6 +682,8 @@ class GauprepApp(wx.App):
         self.text_ctrl_irc_maxcyc.SetValue(setdata.get('IRC', 'maxcyc'))
         self.text_ctrl_irc_calcfc_predictor.SetValue(setdata.get('IRC', 'calcfc_predictor'))
         self.text_ctrl_irc_calcfc_corrector.SetValue(setdata.get('IRC', 'calcfc_corrector'))
+        self.checkbox_irc_split.SetValue(setdata.getboolean('IRC', 'split', fallback=False))
+        self.radio_box_irc_split_fc.SetStringSelection(setdata.get('IRC', 'split_fc', fallback='calc'))
 
         self.radio_box_nbo_version.SetStringSelection(setdata.get('NBO', 'version'))
         self.checkbox_nbo_save.SetValue(setdata.getboolean('NBO', 'save_in_chk'))
@@ -395,15 +694,17 @@ class GauprepApp(wx.App):
 
         self.logging('Settings were loaded from file: ' + str(Path(file).absolute()))
 
-    def file_save(self, file: Union[str, Path]):
+    def get_settings_from_controls(self) -> configparser.ConfigParser:
         """
-        save config file from controls
+        Settings of the controls (same as sset files).
         """
         setdata = configparser.ConfigParser()
 
         setdata.add_section('Link0')
         setdata.set('Link0', 'cpu_cores', self.text_ctrl_cpu_cores.GetValue())
         setdata.set('Link0', 'memory', self.text_ctrl_memory.GetValue())
+        setdata.set('Link0', 'auto', str(self.checkbox_auto_resources.GetValue()))
+        setdata.set('Link0', 'node_profile', self.choice_node_profile.GetStringSelection())
 
         setdata.add_section('Model')
         setdata.set('Model', 'method', self.choice_method.GetStringSelection())
@@ -432,6 +733,11 @@ class GauprepApp(wx.App):
         setdata.set('Opt', 'calcfc', self.text_ctrl_opt_calcfc.GetValue())
         setdata.set('Opt', 'algorithm', self.choice_opt_algorithm.GetStringSelection())
         setdata.set('Opt', 'modredundant', self.text_ctrl_opt_modredundant.GetValue())
+        setdata.set('Opt', 'split_scan', str(self.checkbox_opt_split_scan.GetValue()))
+        setdata.set('Opt', 'preopt_method', self.choice_opt_preopt_method.GetStringSelection())
+        setdata.set('Opt', 'preopt_basis', self.get_preopt_basis(self.choice_opt_preopt_basis))
+        setdata.set('Opt', 'preopt_basis_h_ecp', self.get_preopt_basis(self.choice_opt_preopt_basis_h_ecp))
+        setdata.set('Opt', 'preopt_convergence', self.choice_opt_preopt_convergence.GetStringSelection())
 
         setdata.add_section('IRC')
         setdata.set('IRC', 'algorithm', self.radio_box_irc_algorithm.GetStringSelection())
@@ -441,6 +747,8 @@ class GauprepApp(wx.App):
         setdata.set('IRC', 'maxcyc',  self.text_ctrl_irc_maxcyc.GetValue())
         setdata.set('IRC', 'calcfc_predictor', self.text_ctrl_irc_calcfc_predictor.GetValue())
         setdata.set('IRC', 'calcfc_corrector', self.text_ctrl_irc_calcfc_corrector.GetValue())
+        setdata.set('IRC', 'split', str(self.checkbox_irc_split.GetValue()))
+        setdata.set('IRC', 'split_fc', self.radio_box_irc_split_fc.GetStringSelection())
 
         setdata.add_section('NBO')
         setdata.set('NBO', 'version', self.radio_box_nbo_version.GetStringSelection())
@@ -450,7 +758,13 @@ class GauprepApp(wx.App):
 
         setdata.add_section('ANY')
         setdata.set('ANY', 'job_input', self.text_ctrl_any_job_input.GetValue().strip())
+        return setdata
 
+    def file_save(self, file: Union[str, Path]):
+        """
+        save config file from controls
+        """
+        setdata = self.get_settings_from_controls()
         with open(file, 'w') as f:
             setdata.write(f)
 
@@ -502,28 +816,42 @@ class GauprepApp(wx.App):
         self.text_ctrl_series_title.SetValue('${FILENAME} ${GEN}')
 
     def reset_batch_settings(self):
-        self.text_ctrl_batch_file_list.SetValue('')
+        self.list_ctrl_batch_file_list.clear()
         self.text_ctrl_batch_prefix.SetValue('')
         self.text_ctrl_batch_suffix.SetValue('')
         self.text_ctrl_batch_title.SetValue('${FILENAME} ${GEN}')
+        self.text_ctrl_batch_include.SetValue('')
+        self.text_ctrl_batch_exclude.SetValue('')
         self.checkbox_batch_overwrite.SetValue(True)
+        self.checkbox_batch_irc_endpoints.SetValue(False)
+        self.checkbox_batch_restart.SetValue(False)
+        self.checkbox_batch_dedup.SetValue(False)
+        self.choice_batch_restart_geometry.SetSelection(0)
+        self.choice_batch_output_sink.SetSelection(0)
+        self.text_ctrl_batch_output_root.SetValue('')
+        self.choice_batch_shard.SetSelection(0)
+        self.text_ctrl_batch_sweep.SetValue('')
 
     def clean_up_batch_file_list(self):
         """
         check batch file list and remove non-existing files and duplicated files
         """
-        # list with split lines
-        file_list = (self.text_ctrl_batch_file_list.GetValue()).split('\n')
-
-        new_file_list = []
-        for file in file_list:
-            if (file not in new_file_list) and os.path.exists(file):
-                new_file_list.append(file)
+        file_list = self.list_ctrl_batch_file_list.file_list
+        new_file_list = batch_file_list.clean_up_file_list(file_list)
 
         # Reload control
-        self.text_ctrl_batch_file_list.SetValue('\n'.join(new_file_list))
+        self.list_ctrl_batch_file_list.set_file_list(new_file_list)
 
     def output(self, job_type):
+        # node profile for auto resources is checked once before the jobs
+        if self.checkbox_auto_resources.GetValue():
+            try:
+                resources.get_node_resources(self.choice_node_profile.GetStringSelection())
+            except ValueError as e:
+                self.logging(e.args)
+                return
+        self.resource_warning_logged = False
+
         if self.notebook_general.GetSelection() == 0:  # single job
             self.output_single(job_type=job_type)
         elif self.notebook_general.GetSelection() == 1:  # batch
@@ -559,10 +887,18 @@ class GauprepApp(wx.App):
         output_name = output_name.replace('${NAME}', name)  # NAMEの置き換え
         output_file = output_dir / output_name
 
-        # Overwrite check
-        if output_file.exists():
+        # Overwrite check (all files of the job, e.g. scan jobs)
+        try:
+            existing_files = [f for f in get_job_files(gid, output_file) if f.exists()]
+        except ValueError as e:
+            self.logging(e.args)
+            return
+        if len(existing_files) > 0:
+            shown_files = [str(f) for f in existing_files[:10]]
+            if len(existing_files) > 10:
+                shown_files.append('... ({:} files)'.format(len(existing_files)))
             msgbox = wx.MessageDialog(None,
-                                      'Following file already exists. Overwrite?\n' + str(output_file),
+                                      'Following file already exists. Overwrite?\n' + '\n'.join(shown_files),
                                       'Overwrite?', style=wx.YES_NO)
             if msgbox.ShowModal() == wx.ID_YES:
                 msgbox.Destroy()
@@ -571,60 +907,277 @@ class GauprepApp(wx.App):
                 self.logging('Canceled.\n')
                 return
 
-        gid.output_file(output_file)
-        self.logging('Generated file: ' + str(output_file))
+        try:
+            written = write_jobs(gid, output_file)
+        except ValueError as e:
+            self.logging(e.args)
+            return
+        for (written_file, _) in written:
+            self.logging('Generated file: ' + str(written_file))
+
+    def get_batch_output_layout(self) -> Optional[output_layout.OutputLayout]:
+        """
+        Layout under the output root (None for output next to the source files).
+        """
+        root = self.text_ctrl_batch_output_root.GetValue().strip()
+        if root == '':
+            return None
+        return output_layout.OutputLayout(root, self.choice_batch_shard.GetStringSelection(),
+                                          source_root=self.list_ctrl_batch_file_list.get_source_root())
+
+    def get_batch_output_file(self, file: Union[str, Path], number: int = 1,
+                              layout: Optional[output_layout.OutputLayout] = None) -> Path:
+        """
+        number: position in the batch list (from 1) for sharding by number
+        layout: None for the layout from controls
+        """
+        file = Path(file)
+        name = file.stem
+        prefix = self.text_ctrl_batch_prefix.GetValue().strip()
+        suffix = self.text_ctrl_batch_suffix.GetValue().strip()
+        output_file_name = prefix + name + suffix + '.gjf'
+        output_file_name = output_file_name.replace('${NAME}', name)
+        if layout is None:
+            layout = self.get_batch_output_layout()
+        if layout is not None:
+            return layout.get_output_file(file, output_file_name, number)
+        output_dir = file.parent
+        return output_dir / output_file_name
 
     def output_batch(self, job_type):
-        file_list = [x.strip() for x in self.text_ctrl_batch_file_list.GetValue().split('\n')]  # split lines + strip()
+        batch_list = self.list_ctrl_batch_file_list
+        file_list = [x.strip() for x in batch_list.file_list]
         file_list = [x for x in file_list if x != '']  # remove blank lines
 
-        count = 0
-        for file in file_list:
+        # IRC endpoints: optimization jobs for the last points of both directions of IRC log files
+        irc_endpoints = self.checkbox_batch_irc_endpoints.GetValue()
+        if irc_endpoints:
+            if job_type.upper() not in ['OPT', 'OPT+FREQ', 'TS']:
+                self.logging('IRC endpoints can be used only for Opt jobs.\n')
+                return
+            if job_type.upper() == 'TS':
+                self.logging('IRC endpoints are optimized with Opt+Freq.')
+                job_type = 'Opt+Freq'
+
+        # restart: jobs from the last (or the lowest energy) geometry of log files not terminated normally
+        restart_mode = self.checkbox_batch_restart.GetValue()
+        if restart_mode:
+            if irc_endpoints:
+                self.logging('IRC endpoints and restart cannot be used at the same time.\n')
+                return
+            if job_type.upper() not in ['OPT', 'OPT+FREQ', 'TS']:
+                self.logging('Restart can be used only for Opt jobs.\n')
+                return
 
-            file = Path(file)
-            if not file.exists():
-                self.logging('File: ' + str(file) + ' does not exist.\n')
-                continue
+        # sweep: jobs for all combinations of levels of theory in [Sweep] section of the sset file
+        combinations = [()]
+        sweep_file = self.text_ctrl_batch_sweep.GetValue().strip()
+        if sweep_file != '':
+            try:
+                combinations = sweep.get_combinations(sweep.read_sweep(settings.read_settings(sweep_file)))
+            except (OSError, ValueError, configparser.Error) as e:
+                self.logging(e.args)
+                return
+            self.logging(str(len(combinations)) + ' combinations of ' + sweep_file)
 
-            # output names
-            name = file.stem
-            prefix = self.text_ctrl_batch_prefix.GetValue().strip()
-            suffix = self.text_ctrl_batch_suffix.GetValue().strip()
-            output_file_name = prefix + name + suffix + '.gjf'
-            output_file_name = output_file_name.replace('${NAME}', name)
-            output_dir = file.parent
-            output_file = output_dir / output_file_name
-
-            # title
-            title = self.text_ctrl_batch_title.GetValue()
-            title = title.replace('${NAME}', name)
-
-            # get from controls
-            charge, mult, structure = structure_reader.read_single_file(file)
-            gid = self.generate_gaussian_input_data_object(title=title, charge=charge, multiplicity=mult,
-                                                           structure=structure, job_type=job_type)
-
-            # Overwrite check
-            if output_file.exists() and self.checkbox_batch_overwrite.GetValue():
-                msgbox = wx.MessageDialog(None,
-                                          'Following file already exists. Overwrite?\n' + str(output_file),
-                                          'Overwrite?', style=wx.YES_NO)
-                if msgbox.ShowModal() == wx.ID_YES:
-                    msgbox.Destroy()
+        existing_files = []
+        for file_string in file_list:
+            if not os.path.exists(file_string):
+                self.logging('File: ' + file_string + ' does not exist.\n')
+                batch_list.set_result(file_string, 'not found')
+                continue
+            existing_files.append(file_string)
+
+        restart_data = dict()  # file string > RestartData
+        if restart_mode:
+            log_files = [x for x in existing_files if Path(x).suffix.lstrip('.').lower() in ['log', 'out']]
+            geometry = self.choice_batch_restart_geometry.GetStringSelection()
+            for data in restart.read_restart_data_list(log_files, geometry=geometry):
+                restart_data[data.file] = data
+
+        # pre-pass: output files and conflicts for all files at once
+        layout = self.get_batch_output_layout()
+        numbers = {file_string: i + 1 for (i, file_string) in enumerate(file_list)}  # for sharding by number
+        jobs = []  # (input file string, output file, IRC direction or None)
+        for file_string in existing_files:
+            output_file = self.get_batch_output_file(file_string, numbers[file_string], layout)
+            if restart_mode:
+                data = restart_data.get(file_string)
+                if data is None:
+                    self.logging('Skipped (not a log file): ' + file_string)
+                    batch_list.set_result(file_string, 'skipped')
+                elif data.state == 'normal':
+                    batch_list.set_result(file_string, 'normal termination')
+                elif data.structure is None:
+                    self.logging('Failed: ' + file_string + ' ' + data.message)
+                    batch_list.set_result(file_string, 'failed')
                 else:
-                    msgbox.Destroy()
+                    jobs.append((file_string, output_file, None))
+            elif irc_endpoints and Path(file_string).suffix.lstrip('.').lower() in ['log', 'out']:
+                for (direction, suffix) in IRC_ENDPOINT_SUFFIXES.items():
+                    jobs.append((file_string, output_file.with_name(output_file.stem + suffix + output_file.suffix),
+                                 direction))
+            else:
+                jobs.append((file_string, output_file, None))
+
+        setdata = self.get_settings_from_controls()  # the controls are read once for all jobs
+        # settings of the jobs without the structure (for duplicates and files of split jobs)
+        template = self.generate_gaussian_input_data_object(title='', charge=0, multiplicity=1,
+                                                            structure=['H 0.0 0.0 0.0\n'], job_type=job_type,
+                                                            setdata=setdata)
+
+        # duplicates: one job for the same structure, charge and multiplicity (IRC endpoints are not checked)
+        aliases = dict()  # alias file string > original file string
+        original_jobs = dict()  # original file string > output file
+        if self.checkbox_batch_dedup.GetValue():
+            files = [file_string for (file_string, _, direction) in jobs if direction is None]
+            structures = {file_string: (data.charge, data.multi, data.structure)
+                          for (file_string, data) in restart_data.items() if data.structure is not None}
+            try:
+                keys = dedup.get_file_keys(files, dedup.get_settings_hash(template), structures)
+            except ImportError:
+                self.logging('numpy is required to skip duplicates.\n')
+                return
+            aliases = dedup.find_duplicates(files, keys)
+            for (alias, original) in aliases.items():
+                self.logging('Duplicate: ' + alias + ' (same as ' + original + ')')
+                batch_list.set_result(alias, 'duplicate')
+            originals = set(aliases.values())
+            original_jobs = {file_string: str(output_file) for (file_string, output_file, _) in jobs
+                             if file_string in originals}
+            jobs = [job for job in jobs if job[0] not in aliases]
+        # (input file string, output file, IRC direction or None, sweep combination), a file's combinations in a row
+        jobs = [(file_string, sweep.get_sweep_output_file(output_file, combination) if combination else output_file,
+                 direction, combination)
+                for (file_string, output_file, direction) in jobs for combination in combinations]
+
+        # archive or multi-job file is written in the common directory of the output files
+        sink_type = self.choice_batch_output_sink.GetStringSelection()
+        sink_dir = None
+        if len(jobs) > 0:
+            sink_dir = Path(os.path.commonpath([str(output_file.absolute().parent) for (_, output_file, _, _) in jobs]))
+
+        # files written for an output file (e.g. scan jobs), which do not depend on the structure
+        def job_files(output_file):
+            return get_job_files(template, output_file)
+
+        skip_indices = set()
+        if self.checkbox_batch_overwrite.GetValue():
+            output_files = [output_file for (_, output_file, _, _) in jobs]
+            try:
+                # duplicated names only for an archive or multi-job file (existing files are not overwritten)
+                conflicts = output_check.find_conflicts(output_files, job_files, check_existing=sink_type == 'files')
+            except ValueError as e:
+                self.logging(e.args)
+                return
+            if len(conflicts) > 0:
+                labels = []
+                for i in conflicts:
+                    files = job_files(output_files[i])
+                    if len(files) == 1:
+                        labels.append(str(files[0]))
+                    else:
+                        labels.append('{:} ... {:} ({:} files)'.format(str(files[0]), files[-1].name, len(files)))
+                dialog = ConflictDialog(self.frame, labels)
+                result = dialog.ShowModal()
+                actions = dialog.get_actions()
+                dialog.Destroy()
+                if result != wx.ID_OK:
                     self.logging('Canceled.\n')
+                    return
+                rename_indices = [i for (i, action) in zip(conflicts, actions) if action == ConflictDialog.RENAME]
+                skip_indices = {i for (i, action) in zip(conflicts, actions) if action == ConflictDialog.SKIP}
+                for (i, renamed_file) in output_check.resolve_renames(output_files, rename_indices,
+                                                                      job_files).items():
+                    jobs[i] = (jobs[i][0], renamed_file) + jobs[i][2:]
+
+        cost_report = CostReport() if self.checkbox_batch_cost_report.GetValue() else None
+        count = 0
+        irc_endpoint_cache = (None, dict())  # (file string, endpoints), both directions are read at once
+        gid_cache = (None, None)  # ((file string, direction), GaussianInputData or None), for sweep combinations
+        written_files = dict()  # file string > files written for it (shown in the file list)
+        sink = self.open_output_sink(sink_type, sink_dir, config.OUTPUT_SINK_STEM)
+        if sink is None:
+            return
+        with sink:
+            for (i, (file_string, output_file, direction, combination)) in enumerate(jobs):
+                if i in skip_indices:
+                    self.logging('Skipped: ' + str(output_file))
+                    batch_list.set_result(file_string, 'skipped')
                     continue
 
-            gid.output_file(output_file)
-            self.logging('Generated file: ' + str(output_file))
-            count += 1
-
+                # the structure is read once for all combinations of the sweep
+                if gid_cache[0] != (file_string, direction):
+                    gid_cache = ((file_string, direction), None)
+                    file = Path(file_string)
+                    name = file.stem
+
+                    # title
+                    title = self.text_ctrl_batch_title.GetValue()
+                    title = title.replace('${NAME}', name)
+
+                    # get from controls
+                    if file_string in restart_data:
+                        data = restart_data[file_string]
+                        charge, mult, structure = data.charge, data.multi, data.structure
+                        self.logging('Restart from ' + data.get_status() + ': ' + file_string)
+                    elif direction is None:
+                        charge, mult, structure = structure_reader.read_single_file(file)
+                    else:
+                        if irc_endpoint_cache[0] != file_string:
+                            irc_endpoint_cache = (file_string, structure_reader.read_irc_endpoints(file))
+                        if direction not in irc_endpoint_cache[1]:
+                            self.logging('No IRC point (' + direction + '): ' + file_string)
+                            batch_list.set_result(file_string, 'no IRC point')
+                            continue
+                        charge, mult, structure = irc_endpoint_cache[1][direction]
+                    gid = self.generate_gaussian_input_data_object(title=title, charge=charge, multiplicity=mult,
+                                                                   structure=structure, job_type=job_type,
+                                                                   setdata=setdata)
+                    gid_cache = ((file_string, direction), gid)
+                elif gid_cache[1] is None:
+                    continue
+                gid = gid_cache[1]
+                charge, mult = gid.charge, gid.multiplicity
+                if combination:
+                    gid = sweep.apply_combination(gid, combination)
+                    self.assign_auto_resources(gid, setdata)  # for the level of the combination
+
+                try:
+                    written = write_jobs(gid, output_file, sink)
+                except ValueError as e:
+                    self.logging('Failed: ' + file_string + ' ' + str(e))
+                    batch_list.set_result(file_string, 'failed', charge, mult)
+                    continue
+                written_files.setdefault(file_string, []).extend(written_file for (written_file, _) in written)
+                batch_list.set_result(file_string, 'done', charge, mult, written_files[file_string])
+                for (written_file, written_gid) in written:
+                    self.logging('Generated file: ' + str(written_file))
+                    if cost_report is not None:
+                        cost_report.add(written_file, written_gid)
+                    if layout is not None:
+                        layout.add(file_string, numbers[file_string], written_file)
+                    count += 1
+            if sweep_file != '' and count > 0:
+                sink.write_text(sink_dir / config.SWEEP_INDEX_FILE, sweep.get_index_string(combinations))
+            if len(aliases) > 0:
+                sink.write_text(sink_dir / config.DUPLICATES_FILE, dedup.get_aliases_string(aliases, original_jobs))
+
+        batch_list.Refresh()
         self.logging('Total ' + str(count) + ' files were generated.')
+        if len(aliases) > 0:
+            self.logging(str(len(aliases)) + ' duplicates were skipped (' + config.DUPLICATES_FILE + ').')
+        if sink.file is not None:
+            self.logging('Output: ' + str(sink.file))
+        if layout is not None and count > 0:
+            self.output_manifest(layout)
+        if cost_report is not None and count > 0:
+            report_dir = Path(os.path.commonpath([str(Path(r['output_file']).parent) for r in cost_report.records]))
+            self.output_cost_report(cost_report, report_dir)
 
     def output_series(self, job_type):
         if self.text_ctrl_series_xyz_file.GetValue().strip() == '':
-            self.logging('xyz file is not given.\n')
+            self.logging('Structure file is not given.\n')
             return
         if not os.path.exists(self.text_ctrl_series_xyz_file.GetValue()):
             self.logging('File: ' + self.text_ctrl_series_xyz_file.GetValue() + ' does not exist.\n')
@@ -633,80 +1186,207 @@ class GauprepApp(wx.App):
         input_file = Path(self.text_ctrl_series_xyz_file.GetValue())
         name = input_file.stem
         output_dir = input_file.parent
-        structure_list = structure_reader.read_xyz(input_file)
-        number_digit = max(3, len(str(len(structure_list))))
+        # output root: files are spread over subdirectories (${NUMBER} is kept in the file names)
+        layout = None
+        if self.text_ctrl_series_output_root.GetValue().strip() != '':
+            layout = output_layout.OutputLayout(self.text_ctrl_series_output_root.GetValue().strip(),
+                                                self.choice_series_shard.GetStringSelection(), source_root=output_dir)
+            output_dir = layout.root
+        # charge/mult (sdf/mol2/pdb records have their own charge, see ensemble_reader.get_multiplicity)
+        try:
+            series_charge = int(self.text_ctrl_series_charge.GetValue().strip())
+            series_mult = int(self.text_ctrl_series_multiplicity.GetValue().strip())
+            number_digit = max(3, len(str(ensemble_reader.count_structure_records(input_file))))
+            # %oldchk chain (blank, 0 or 1: independent jobs)
+            chain_length = int(self.text_ctrl_series_chain_length.GetValue().strip() or '0')
+        except ValueError as e:
+            self.logging(e.args)
+            return
+        # records are read one by one (${NUMBER} is the record number in the file)
+        records = enumerate(ensemble_reader.iterate_structure_records(input_file, multiplicity=series_mult))
+
+        # conformer pruning (all structures are needed)
+        if self.checkbox_series_prune.GetValue():
+            try:
+                record_list = [record for (_, record) in records]
+                indices = self.prune_series_frames([(comment, structure)
+                                                    for (comment, _, _, structure) in record_list])
+            except Exception as e:
+                self.logging(e.args)
+                return
+            records = ((i, record_list[i]) for i in indices)
 
+        cost_report = CostReport() if self.checkbox_series_cost_report.GetValue() else None
+        setdata = self.get_settings_from_controls()  # the controls are read once for all records
         count = 0
-        for i, structure in enumerate(structure_list):
-            number = str(i + 1).zfill(number_digit)
-            # output names
-            prefix = self.text_ctrl_series_output_file_prefix.GetValue().strip()
-            suffix = self.text_ctrl_series_output_file_suffix.GetValue().strip()
-            output_file_name = prefix + number + suffix + '.gjf'
-            output_file_name = output_file_name.replace('${NAME}', name).replace('${NUMBER}', number)
-            output_file = output_dir / output_file_name
-            # titles
-            title = self.text_ctrl_series_title.GetValue()
-            title = title.replace('${NAME}', name).replace('${NUMBER}', number)
-            # charge/mult
-            charge = int(self.text_ctrl_series_charge.GetValue().strip())
-            mult = int(self.text_ctrl_series_multiplicity.GetValue().strip())
-            gid = self.generate_gaussian_input_data_object(title=title, charge=charge, multiplicity=mult,
-                                                           structure=structure, job_type=job_type)
-            gid.output_file(output_file)
-            self.logging('Generated file: ' + str(output_file))
-            count += 1
+        sink = self.open_output_sink(self.choice_series_output_sink.GetStringSelection(), output_dir, name + '_jobs')
+        if sink is None:
+            return
+        chain_writer = None
+        if chain_length > 1:
+            chain_writer = ChainWriter(chain_length, self.choice_series_chain_mode.GetStringSelection(), sink,
+                                       dependency_file=output_dir / (name + '_chains.csv'))
+        logged_files = set()
+        multiplicity_changes = dict()  # multiplicity other than the series value > [number of records, first ones]
+
+        def add_written(written):
+            nonlocal count
+            for (written_file, written_gid, number) in written:
+                if written_file not in logged_files:  # a Link1 chain file has several frames
+                    logged_files.add(written_file)
+                    self.logging('Generated file: ' + str(written_file))
+                    count += 1
+                if cost_report is not None:
+                    cost_report.add(written_file, written_gid)
+                if layout is not None:
+                    layout.add(input_file, number, written_file)
 
+        try:
+            for (i, (_, record_charge, record_mult, structure)) in records:
+                number = str(i + 1).zfill(number_digit)
+                # output names
+                prefix = self.text_ctrl_series_output_file_prefix.GetValue().strip()
+                suffix = self.text_ctrl_series_output_file_suffix.GetValue().strip()
+                output_file_name = prefix + number + suffix + '.gjf'
+                output_file_name = output_file_name.replace('${NAME}', name).replace('${NUMBER}', number)
+                if layout is not None:
+                    output_file = layout.get_output_file(input_file, output_file_name, i + 1)
+                else:
+                    output_file = output_dir / output_file_name
+                # titles
+                title = self.text_ctrl_series_title.GetValue()
+                title = title.replace('${NAME}', name).replace('${NUMBER}', number)
+                # charge/mult
+                charge = series_charge if record_charge is None else record_charge
+                mult = series_mult if record_mult is None else record_mult
+                if mult != series_mult:
+                    (n_records, examples) = multiplicity_changes.setdefault(mult, [0, []])
+                    multiplicity_changes[mult][0] = n_records + 1
+                    if len(examples) < 5:
+                        examples.append(i + 1)
+                # a bad record does not stop the other records
+                try:
+                    gid = self.generate_gaussian_input_data_object(title=title, charge=charge, multiplicity=mult,
+                                                                   structure=structure, job_type=job_type,
+                                                                   setdata=setdata)
+                    if chain_writer is not None:
+                        add_written(chain_writer.write(gid, output_file, i + 1))
+                    else:
+                        add_written((written_file, written_gid, i + 1)
+                                    for (written_file, written_gid) in write_jobs(gid, output_file, sink))
+                except (ValueError, IndexError) as e:
+                    self.logging('Failed: record ' + str(i + 1) + ' (' + output_file.name + ') ' + str(e))
+                    continue
+        except (ValueError, IndexError) as e:  # records after a broken one cannot be read
+            self.logging('Failed to read ' + input_file.name + ': ' + str(e))
+        finally:
+            if chain_writer is not None:
+                add_written(chain_writer.close())
+            sink.close()
+
+        # logged once for all records (from radicals or the parity of electrons, see ensemble_reader.get_multiplicity)
+        for (mult, (n_records, examples)) in sorted(multiplicity_changes.items()):
+            self.logging('Multiplicity ' + str(mult) + ' is used instead of ' + str(series_mult) + ' for ' +
+                         str(n_records) + ' records (record ' + ', '.join(str(n) for n in examples) +
+                         (', ...' if n_records > len(examples) else '') + ')')
         self.logging('Total ' + str(count) + ' files were generated.')
+        if sink.file is not None:
+            self.logging('Output: ' + str(sink.file))
+        if layout is not None and count > 0:
+            self.output_manifest(layout)
+        if cost_report is not None and count > 0:
+            self.output_cost_report(cost_report, output_dir)
+
+    def open_output_sink(self, sink_type: str, directory: Optional[Path], stem: str) -> Optional[output_sink.FileSink]:
+        """
+        Destination of output files (loose files, archive or multi-job file in the directory).
+        :return: None if canceled or failed
+        """
+        if directory is None:  # no output file
+            return output_sink.FileSink()
+        try:
+            sink_file = output_sink.get_sink_file(sink_type, directory, stem)
+            if sink_file is not None and sink_file.exists():
+                msgbox = wx.MessageDialog(None,
+                                          'Following file already exists. Overwrite?\n' + str(sink_file),
+                                          'Overwrite?', style=wx.YES_NO)
+                if msgbox.ShowModal() == wx.ID_YES:
+                    msgbox.Destroy()
+                else:
+                    msgbox.Destroy()
+                    self.logging('Canceled.\n')
+                    return None
+            return output_sink.open_output_sink(sink_type, directory, stem)
+        except (OSError, ValueError) as e:
+            self.logging(e.args)
+            return None
+
+    def output_manifest(self, layout: output_layout.OutputLayout):
+        try:
+            manifest_file = layout.write_manifest()
+        except OSError as e:
+            self.logging(e.args)
+        else:
+            self.logging('Manifest: ' + str(manifest_file))
+
+    def output_cost_report(self, cost_report: CostReport, report_dir: Path):
+        self.logging(cost_report.get_summary())
+        report_file = report_dir / config.COST_REPORT_FILE
+        try:
+            cost_report.write_csv(report_file)
+        except OSError as e:
+            self.logging(e.args)
+        else:
+            self.logging('Cost report: ' + str(report_file))
+
+    def prune_series_frames(self, frame_list):
+        try:
+            threshold = float(self.text_ctrl_series_prune_threshold.GetValue())
+        except ValueError:
+            raise ValueError('Threshold for pruning should be a number.')
+        energy_window_string = self.text_ctrl_series_prune_energy_window.GetValue().strip()
+        try:
+            energy_window = float(energy_window_string) if energy_window_string != '' else None
+        except ValueError:
+            raise ValueError('Energy window for pruning should be a number or blank.')
+
+        energies = [conformer.parse_xyz_comment_energy(comment) for (comment, _) in frame_list]
+        if any(e is None for e in energies):
+            self.logging('Energies are not found in comment lines. Energy window is not applied.')
+            energies = None
+        indices = conformer.prune_conformers([structure for (_, structure) in frame_list], energies,
+                                             threshold=threshold, energy_window=energy_window,
+                                             method=self.choice_series_prune_method.GetStringSelection())
+        self.logging('Pruning: {:} of {:} structures were kept.'.format(len(indices), len(frame_list)))
+        return indices
+
+    @staticmethod
+    def get_preopt_basis(choice: wx.Choice) -> str:
+        basis = choice.GetStringSelection()
+        return '' if basis == PREOPT_SAME_BASIS else basis
 
-    def generate_gaussian_input_data_object(self, title, charge, multiplicity, structure, job_type) -> GaussianInputData:
-
-        gid = GaussianInputData(charge, multiplicity, structure)
-        gid.job_type = job_type  # SP, Opt, Opt+Freq, TS, IRC, WFX, NBO, ANY
-        gid.title = title
-
-        # read from controls
-        gid.memory = self.text_ctrl_memory.GetValue()
-        gid.n_proc = self.text_ctrl_cpu_cores.GetValue()
-        gid.method = self.choice_method.GetStringSelection()  # functional name or HF, MP2
-        gid.basis = self.choice_basis.GetStringSelection()  # basis name
-        gid.basis_h_ecp = self.choice_basis_h_ecp.GetStringSelection()  # basis name
-        gid.ecp_for_3d = self.checkbox_ecp_for_3d.GetValue()  # True for apply ECP basis set to 3d metal row atoms
-        gid.nosymm = self.checkbox_nosymm.GetValue()  # True for add nosymm keyword
-        gid.guess_mix = self.checkbox_guessmix.GetValue()  # True for add guess=mix
-        gid.first_stable_check = self.checkbox_stableopt.GetValue()  # True for first stable=opt (multi job or sp)
-
-        gid.solvation = self.radio_box_solvation.GetStringSelection()  # none, PCM, CPCM, SMD
-        gid.solvent = self.choice_solvent.GetStringSelection()  # solvent name
-
-        gid.dispersion = self.radio_box_dispersion.GetStringSelection()  # none, GD3, GD3BJ, D2
-        gid.dispersion_external_param = self.checkbox_dispersion_ext.GetValue()  # True for read external files
-
-        gid.opt_convergence = self.choice_opt_convergence.GetStringSelection()  # loose, default, tight, verytight
-        gid.opt_maxcycle = self.text_ctrl_opt_maxcycle.GetValue()  # '',  int > 0
-        gid.opt_maxstep = self.text_ctrl_opt_maxstep.GetValue()  # '', int > 0
-        gid.opt_calcfc = self.text_ctrl_opt_calcfc.GetValue()  # '', 0 for calcfc, 1 for calcall, int > 1 for recalcfc
-        gid.opt_algorithm = self.choice_opt_algorithm.GetStringSelection()  # default, GDIIS, Newton
-        gid.opt_modredundant = self.text_ctrl_opt_modredundant.GetValue()  # modredundant sections
-
-        gid.irc_algorithm = self.radio_box_irc_algorithm.GetStringSelection()  # HPC, EulerPC, LQA
-        gid.irc_direction = self.radio_box_irc_direction.GetStringSelection()  # both, forward, reverse
-        gid.irc_maxpoints = self.text_ctrl_irc_maxpoints.GetValue()  # '', int > 0
-        gid.irc_stepsize = self.text_ctrl_irc_stepsize.GetValue()  # '', int > 0
-        gid.irc_maxcyc = self.text_ctrl_irc_maxcyc.GetValue()  # '', int > 0
-        gid.irc_calcfc_predictor = self.text_ctrl_irc_calcfc_predictor.GetValue()  # '', int > 0
-        gid.irc_calcfc_corrector = self.text_ctrl_irc_calcfc_corrector.GetValue()  # '', int > 0
-
-        gid.nbo_version = self.radio_box_nbo_version.GetStringSelection()
-        gid.nbo_save = self.checkbox_nbo_save.GetValue()
-        nbo_keywords = list(self.check_list_box_nbo_keywords.GetCheckedStrings())
-        nbo_keywords.extend(self.text_ctrl_nbo_additional_keywords.GetValue().strip().split())
-        gid.nbo_keywords = nbo_keywords
-
-        gid.any_job_input = self.text_ctrl_any_job_input.GetValue().strip()
+    def generate_gaussian_input_data_object(self, title, charge, multiplicity, structure, job_type,
+                                            setdata: Optional[configparser.ConfigParser] = None) -> GaussianInputData:
+        """
+        GaussianInputData from the controls (settings.generate_gaussian_input_data with the settings of the controls).
+        setdata: settings from get_settings_from_controls, given so that the controls are read once for many jobs
+        """
+        if setdata is None:
+            setdata = self.get_settings_from_controls()
+        gid = settings.generate_gaussian_input_data(setdata, title=title, charge=charge, multiplicity=multiplicity,
+                                                    structure=structure, job_type=job_type, auto_resources=False)
 
+        self.assign_auto_resources(gid, setdata)
         return gid
 
+    def assign_auto_resources(self, gid: GaussianInputData, setdata: configparser.ConfigParser):
+        """
+        %nprocshared and %mem from the number of basis functions (when auto is checked).
+        """
+        if not settings.assign_auto_resources(setdata, gid) and not self.resource_warning_logged:
+            self.logging('The number of basis functions is not known. cpu cores and memory are not changed.')
+            self.resource_warning_logged = True
+
     # Followings are event handlers
     def on_button_structure_file(self, event):
         dialog = wx.FileDialog(None, 'Select structure file',
@@ -727,8 +1407,9 @@ class GauprepApp(wx.App):
         self.set_title_auto()
 
     def on_button_series_xyz_file(self, event):
-        dialog = wx.FileDialog(None, 'Select xyz file',
-                               wildcard='xyz file (*.xyz)|All files (*.*)|*.*',
+        dialog = wx.FileDialog(None, 'Select structure file',
+                               wildcard='Structure files (*.xyz;*.sdf;*.mol;*.mol2;*.pdb;*.gjf;*.gjc;*.com)|*.xyz;'
+                                        '*.sdf;*.mol;*.mol2;*.pdb;*.gjf;*.gjc;*.com|All files (*.*)|*.*',
                                style=wx.FD_OPEN)
         if dialog.ShowModal() == wx.ID_OK:
             file = dialog.GetPath()
@@ -746,6 +1427,9 @@ class GauprepApp(wx.App):
     def on_button_batch_reset(self, event):
         self.reset_batch_settings()
 
+    def on_text_batch_output_name(self, event):
+        self.list_ctrl_batch_file_list.Refresh()
+
     def on_button_sp_output(self, event):
         if self.checkbox_sp_run_freq.GetValue():
             job_type = 'FREQ'
@@ -804,7 +1488,151 @@ class GauprepApp(wx.App):
     def on_menu_load_default(self, event):
         self.file_load(config.DEFAULT_SET_FILE)
 
+    def on_menu_watch_start(self, event):
+        if self.watcher is not None:
+            self.logging('Watch folder mode is already running.')
+            return
+        dialog = wx.DirDialog(None, 'Select directory to watch', style=wx.DD_DEFAULT_STYLE | wx.DD_DIR_MUST_EXIST)
+        if dialog.ShowModal() == wx.ID_OK:
+            directory = dialog.GetPath()
+            dialog.Destroy()
+        else:
+            dialog.Destroy()
+            return
+        dialog = wx.FileDialog(None, 'Select set file for generated jobs',
+                               wildcard='Set files (*.sset)|*.sset|All files (*.*)|*.*',
+                               style=wx.FD_OPEN)
+        if dialog.ShowModal() == wx.ID_OK:
+            settings_file = dialog.GetPath()
+            dialog.Destroy()
+        else:
+            dialog.Destroy()
+            return
+
+        # output names and title follow the batch settings
+        try:
+            self.watcher = FolderWatcher([directory], settings_file,
+                                         prefix=self.text_ctrl_batch_prefix.GetValue(),
+                                         suffix=self.text_ctrl_batch_suffix.GetValue(),
+                                         title=self.text_ctrl_batch_title.GetValue(),
+                                         logger=lambda message: wx.CallAfter(self.logging, message))
+        except Exception as e:
+            self.logging(e.args)
+            return
+        self.logging('Start watching: ' + directory + ' with settings: ' + settings_file)
+        self.watch_timer.Start(int(config.WATCH_INTERVAL * 1000))
+        self.on_watch_timer(None)
+
+    def on_menu_watch_stop(self, event):
+        if self.watcher is None:
+            return
+        self.watch_timer.Stop()
+        self.watcher = None
+        self.logging('Watch folder mode was stopped.')
+
+    def on_menu_job_script(self, event):
+        dialog = wx.FileDialog(None, 'Select cost report',
+                               wildcard='Cost report (*.csv)|*.csv|All files (*.*)|*.*',
+                               style=wx.FD_OPEN)
+        if dialog.ShowModal() == wx.ID_OK:
+            cost_report_file = dialog.GetPath()
+            dialog.Destroy()
+        else:
+            dialog.Destroy()
+            return
+        template_names = sorted(config.SCHEDULER_TEMPLATES)
+        dialog = wx.SingleChoiceDialog(None, 'Select scheduler', 'Job script', template_names)
+        if dialog.ShowModal() == wx.ID_OK:
+            template_name = dialog.GetStringSelection()
+            dialog.Destroy()
+        else:
+            dialog.Destroy()
+            return
+        if self.checkbox_irc_split.GetValue() and self.radio_box_irc_split_fc.GetStringSelection() == 'read':
+            self.logging('Warning: FC (split) of IRC is read. IRC jobs read the chk of the freq job, so that they run '
+                         'after it on the same node. Select calc to run the split IRC jobs at the same time.')
+        # jobs are packed in the node selected in Link0 settings
+        try:
+            summary = scheduler.make_job_script(cost_report_file, self.choice_node_profile.GetStringSelection(),
+                                                template_name)
+        except Exception as e:
+            self.logging(e.args)
+        else:
+            self.logging(summary)
+
+    def on_menu_log_summary(self, event):
+        batch_list = self.list_ctrl_batch_file_list
+        log_files = [f for f in batch_list.file_list if os.path.splitext(f)[1].lower() in ['.log', '.out']]
+        if len(log_files) == 0:
+            self.logging('No log file in the batch list.')
+            return
+        if self.log_summary_thread is not None:
+            self.logging('Log summary is running.')
+            return
+        self.logging('Summarizing ' + str(len(log_files)) + ' logs...')
+
+        # logs are read in a worker thread, and the result is processed in the GUI thread
+        def summarize():
+            try:
+                summaries = log_summary.summarize_logs(log_files, threads=True)
+            except Exception as e:
+                wx.CallAfter(self.on_log_summary_failed, e)
+            else:
+                wx.CallAfter(self.on_log_summary_done, log_files, summaries)
+
+        self.log_summary_thread = threading.Thread(target=summarize, daemon=True)
+        self.log_summary_thread.start()
+
+    def on_log_summary_failed(self, error):
+        self.log_summary_thread = None
+        self.logging(error.args)
+
+    def on_log_summary_done(self, log_files, summaries):
+        self.log_summary_thread = None
+        batch_list = self.list_ctrl_batch_file_list
+        summary_dir = Path(os.path.commonpath([str(Path(f).absolute().parent) for f in log_files]))
+        summary_file = summary_dir / config.LOG_SUMMARY_FILE
+        try:
+            log_summary.write_csv(summaries, summary_file.with_suffix('.csv'))
+            log_summary.write_json(summaries, summary_file.with_suffix('.json'))
+        except OSError as e:
+            self.logging(e.args)
+        else:
+            self.logging('Log summary: ' + str(summary_file.with_suffix('.csv')))
+
+        for summary in summaries:
+            batch_list.set_result(summary['file'], log_summary.get_status_string(summary),
+                                  summary['charge'], summary['multiplicity'])
+        # keep the selected logs (and other files) in the batch list
+        dialog = wx.SingleChoiceDialog(None, 'Select logs to keep in the batch list', 'Log summary',
+                                       list(log_summary.LOG_SELECTIONS))
+        if dialog.ShowModal() == wx.ID_OK:
+            selected = set(log_summary.select_logs(summaries, dialog.GetStringSelection()))
+            batch_list.set_file_list([f for f in batch_list.file_list if f not in log_files or f in selected])
+            self.logging('{:} of {:} logs are selected.'.format(len(selected), len(log_files)))
+        else:
+            batch_list.Refresh()
+        dialog.Destroy()
+
+    def on_watch_timer(self, event):
+        if self.watcher is None:
+            return
+        if self.watch_thread is not None and self.watch_thread.is_alive():
+            return  # the previous poll is not finished
+
+        # directories are scanned in a worker thread (the watcher logs through wx.CallAfter)
+        def poll(watcher):
+            try:
+                watcher.poll()
+            except Exception as e:
+                wx.CallAfter(self.logging, e.args)
+
+        self.watch_thread = threading.Thread(target=poll, args=(self.watcher,), daemon=True)
+        self.watch_thread.start()
+
     def on_exit(self, event):
+        self.watch_timer.Stop()
+        self.log_sink.flush()
         try:
             self.file_save(config.PREVIOUS_SET_FILE)
         finally:
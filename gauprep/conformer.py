@@ -0,0 +1,132 @@
+import re
+from typing import List, Optional
+
+# numpy is imported in functions, so that it is required only when pruning is used.
+
+HARTREE_TO_KCAL = 627.5094740631
+
+_ENERGY_KEYWORD_PATTERN = re.compile(r'energy\s*[:=]?\s*([-+]?\d+\.\d*(?:[eEdD][-+]?\d+)?)', re.IGNORECASE)
+_FLOAT_PATTERN = re.compile(r'^[-+]?\d+\.\d*(?:[eEdD][-+]?\d+)?$')
+
+
+def parse_xyz_comment_energy(comment: str) -> Optional[float]:
+    """
+    Energy (hartree) in a xyz comment line.
+    CREST style (the energy only) and xtb style (energy: -xx.xxx gnorm: ...) are supported.
+    :return: energy or None
+    """
+    match = _ENERGY_KEYWORD_PATTERN.search(comment)
+    if match:
+        return float(match.group(1).replace('D', 'E').replace('d', 'e'))
+    terms = comment.strip().split()
+    if len(terms) > 0 and _FLOAT_PATTERN.match(terms[0]):
+        return float(terms[0].replace('D', 'E').replace('d', 'e'))
+    return None
+
+
+def _get_coordinates(structure_list: List[List[str]], ignore_hydrogen: bool):
+    import numpy as np
+
+    atoms = [line.strip().split()[0].capitalize() for line in structure_list[0] if line.strip() != '']
+    if ignore_hydrogen and any(atom != 'H' for atom in atoms):
+        mask = [atom != 'H' for atom in atoms]
+    else:
+        mask = [True] * len(atoms)
+
+    coordinates = np.empty((len(structure_list), sum(mask), 3))
+    for (i, structure) in enumerate(structure_list):
+        lines = [line for line in structure if line.strip() != '']
+        if len(lines) != len(atoms):
+            raise ValueError('All structures should have the same atoms for pruning (frame {:}).'.format(i + 1))
+        xyz = [line.split()[1:4] for (line, m) in zip(lines, mask) if m]
+        coordinates[i] = np.array(xyz, dtype=float)
+    # centering
+    coordinates -= coordinates.mean(axis=1, keepdims=True)
+    return coordinates
+
+
+def _rmsd_to_references(x, references):
+    """
+    RMSD between x (N, 3) and each of references (K, N, 3) after optimal rotation (Kabsch). All centered.
+    """
+    import numpy as np
+
+    h = np.einsum('ni,knj->kij', x, references)  # covariance matrices (K, 3, 3)
+    u, s, vt = np.linalg.svd(h)
+    # correct for reflection
+    d = np.sign(np.linalg.det(u) * np.linalg.det(vt))
+    s[:, 2] *= d
+    e0 = (x ** 2).sum() + (references ** 2).sum(axis=(1, 2))
+    msd = np.maximum(e0 - 2.0 * s.sum(axis=1), 0.0) / x.shape[0]
+    return np.sqrt(msd)
+
+
+def prune_conformers(structure_list: List[List[str]], energies: Optional[List[Optional[float]]] = None,
+                     threshold: float = 0.125, energy_window: Optional[float] = 6.0,
+                     method: str = 'rmsd', ignore_hydrogen: bool = True) -> List[int]:
+    """
+    Select unique low-energy conformers.
+    Frames are checked from the lowest energy (or in the given order when energies are not available),
+    and a frame is removed when it is similar to one of the frames already kept.
+    threshold: Angstrom. RMSD after alignment for 'rmsd' method,
+               RMS difference of sorted interatomic distances for 'fingerprint' method.
+    energy_window: kcal/mol from the lowest energy, None for no limit. Ignored when any energy is missing.
+    :return: indices of kept frames (sorted in the original order)
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        raise RuntimeError('numpy is required for conformer pruning.')
+
+    if method.lower() not in ['rmsd', 'fingerprint']:
+        raise ValueError('Pruning method should be rmsd or fingerprint.')
+    n_frames = len(structure_list)
+    if n_frames == 0:
+        return []
+
+    # energy window and order
+    order = np.arange(n_frames)
+    if energies is not None and len(energies) == n_frames and all(e is not None for e in energies):
+        energy_array = np.array(energies, dtype=float)
+        order = np.argsort(energy_array, kind='stable')
+        if energy_window is not None:
+            relative = (energy_array[order] - energy_array[order[0]]) * HARTREE_TO_KCAL
+            order = order[relative <= energy_window]
+
+    coordinates = _get_coordinates(structure_list, ignore_hydrogen)
+    n_atoms = coordinates.shape[1]
+
+    if method.lower() == 'fingerprint':
+        # sorted interatomic distances: invariant to rotation and atom relabelling
+        upper = np.triu_indices(n_atoms, k=1)
+
+        def fingerprint(x):
+            diff = x[:, None, :] - x[None, :, :]
+            return np.sort(np.sqrt((diff ** 2).sum(axis=2))[upper])
+    else:
+        # sorted distances from the centroid: RMS difference of them is a lower bound of RMSD,
+        # so that RMSD is calculated only for close candidates.
+        def fingerprint(x):
+            return np.sort(np.sqrt((x ** 2).sum(axis=1)))
+
+    kept = []
+    kept_fingerprints = None
+    n_kept = 0
+    for i in order:
+        fp = fingerprint(coordinates[i])
+        if kept_fingerprints is None:
+            kept_fingerprints = np.empty((len(order), fp.shape[0]))
+        if n_kept > 0:
+            fp_distance = np.sqrt(((kept_fingerprints[:n_kept] - fp) ** 2).mean(axis=1))
+            candidates = np.nonzero(fp_distance <= threshold)[0]
+            if len(candidates) > 0:
+                if method.lower() == 'fingerprint':
+                    continue
+                rmsd = _rmsd_to_references(coordinates[i], coordinates[[kept[c] for c in candidates]])
+                if (rmsd <= threshold).any():
+                    continue
+        kept_fingerprints[n_kept] = fp
+        kept.append(int(i))
+        n_kept += 1
+
+    return sorted(kept)
@@ -0,0 +1,161 @@
+import configparser
+import csv
+import re
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Union, List, Dict, Optional
+
+from gauprep.gbs_parser import GaussianBasisData, count_shell_functions
+from gauprep.gaussian_input import GaussianInputData, get_gbs_path
+from config import ATOM_LIST, BASIS_FUNCTIONS_FILE
+
+# formal scaling of methods with the number of basis functions (HF and DFT otherwise)
+METHOD_SCALING = {'MP2': 5, 'B2PLYP': 5, 'B2PLYPD3': 5, 'DSDPBEP86': 5, 'CCSD(T)': 7}
+DEFAULT_SCALING = 3
+
+# rough cost of each job relative to SP
+JOB_FACTORS = {'SP': 1.0, 'WFX': 1.0, 'NBO': 1.0, 'ANY': 1.0, 'FREQ': 4.0, 'OPT': 15.0, 'OPT+FREQ': 19.0,
+               'TS': 23.0, 'IRC': 64.0}
+
+_SHELLS_PATTERN = re.compile(r'(\d+)([a-zA-Z])')
+
+
+def _atom_number(symbol: str) -> int:
+    for (number, atom) in enumerate(ATOM_LIST):
+        if atom.upper() == symbol.upper():
+            return number
+    raise KeyError('Unknown element: ' + symbol)
+
+
+@lru_cache(maxsize=None)
+def _read_builtin_table() -> Dict[str, configparser.SectionProxy]:
+    table = configparser.ConfigParser()
+    table.read(Path(__file__).absolute().parent.parent / BASIS_FUNCTIONS_FILE)
+    return {section.lower(): table[section] for section in table.sections()}
+
+
+@lru_cache(maxsize=None)
+def _read_gbs(file: Path) -> GaussianBasisData:
+    return GaussianBasisData(file)
+
+
+@lru_cache(maxsize=None)
+def get_basis_function_count(basis_name: str, atom: str) -> int:
+    """
+    The number of contracted basis functions of the atom.
+    Basis sets in extbasis are counted from the gbs file (5D 7F), and built-in ones from the table.
+    """
+    atom = atom.capitalize()
+    gbs_file = get_gbs_path(basis_name)
+    if gbs_file is not None:
+        return _read_gbs(gbs_file).count_basis_functions(atom, spherical=True)
+
+    table = _read_builtin_table()
+    if basis_name.lower() not in table:
+        raise KeyError('The number of basis functions is not known for basis set: ' + basis_name)
+    section = table[basis_name.lower()]
+    spherical = section.getboolean('spherical', True)
+    atom_number = _atom_number(atom)
+    for (key, shells) in section.items():
+        if '-' not in key:
+            continue
+        first, last = key.split('-')
+        if _atom_number(first) <= atom_number <= _atom_number(last):
+            return sum(int(n) * count_shell_functions(shell, spherical)
+                       for (n, shell) in _SHELLS_PATTERN.findall(shells))
+    raise KeyError('The number of basis functions of ' + atom + ' is not known for basis set: ' + basis_name)
+
+
+def get_element_counts(structure: List[str]) -> Counter:
+    """
+    Count elements in Gaussian's structure data (ghost atoms are ignored).
+    """
+    counts = Counter()
+    for line in structure:
+        terms = line.strip().split()
+        if len(terms) == 0:
+            continue
+        symbol = re.split(r'[^A-Za-z0-9]', terms[0])[0]
+        if symbol.isdigit():
+            symbol = ATOM_LIST[int(symbol)]
+        symbol = symbol.rstrip('0123456789').capitalize()
+        if symbol.upper() == 'BQ' or symbol == '':
+            continue
+        counts[symbol] += 1
+    return counts
+
+
+def count_basis_functions(gid: GaussianInputData) -> int:
+    """
+    The number of basis functions of the job (basis for light atoms and basis_h_ecp for heavy atoms).
+    """
+    atom_num_ecp = 19 if gid.ecp_for_3d else 37
+    n_basis = 0
+    for (atom, n) in get_element_counts(gid.structure).items():
+        basis_name = gid.basis if _atom_number(atom) < atom_num_ecp else gid.basis_h_ecp
+        n_basis += n * get_basis_function_count(basis_name, atom)
+    return n_basis
+
+
+def get_method_scaling(method: str) -> int:
+    return METHOD_SCALING.get(method.upper(), DEFAULT_SCALING)
+
+
+def estimate_cost(gid: GaussianInputData, n_basis: Optional[int] = None) -> float:
+    """
+    Rough cost score: job factor * (N_basis / 100) ** (formal scaling of the method).
+    Only for comparison between jobs (no unit).
+    """
+    if n_basis is None:
+        n_basis = count_basis_functions(gid)
+    job_factor = JOB_FACTORS.get(gid.job_type.upper(), 1.0)
+    if gid.job_type.upper() == 'IRC' and gid.irc_direction.lower() != 'both':
+        job_factor /= 2.0
+    if gid.first_stable_check:
+        job_factor += 2.0
+    return job_factor * (n_basis / 100.0) ** get_method_scaling(gid.method)
+
+
+class CostReport:
+    """
+    Cost estimates of generated jobs for batch summary and csv output.
+    """
+    FIELDS = ['output_file', 'job_type', 'method', 'basis', 'basis_h_ecp', 'n_atoms', 'n_basis', 'cost']
+
+    def __init__(self):
+        self.records = []
+
+    def add(self, output_file: Union[str, Path], gid: GaussianInputData):
+        try:
+            n_basis = count_basis_functions(gid)
+            cost = estimate_cost(gid, n_basis)
+        except KeyError:
+            n_basis = None
+            cost = None
+        self.records.append({'output_file': str(output_file), 'job_type': gid.job_type, 'method': gid.method,
+                             'basis': gid.basis, 'basis_h_ecp': gid.basis_h_ecp,
+                             'n_atoms': sum(get_element_counts(gid.structure).values()),
+                             'n_basis': n_basis, 'cost': cost})
+
+    def get_summary(self) -> str:
+        valid = [r for r in self.records if r['n_basis'] is not None]
+        if len(valid) == 0:
+            return 'Cost estimate: not available.'
+        n_basis = [r['n_basis'] for r in valid]
+        total_cost = sum(r['cost'] for r in valid)
+        summary = 'Cost estimate: {:} jobs, N_basis {:}-{:}, total cost {:.3g}'.format(
+            len(valid), min(n_basis), max(n_basis), total_cost)
+        if len(valid) < len(self.records):
+            summary += ' ({:} jobs not estimated)'.format(len(self.records) - len(valid))
+        return summary
+
+    def write_csv(self, file: Union[str, Path]):
+        with Path(file).open(mode='w', encoding='utf-8', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=self.FIELDS)
+            writer.writeheader()
+            for record in self.records:
+                row = dict(record)
+                if row['cost'] is not None:
+                    row['cost'] = '{:.4g}'.format(row['cost'])
+                writer.writerow(row)
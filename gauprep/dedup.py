@@ -0,0 +1,155 @@
+"""
+Duplicate jobs in batch mode by canonical structure hashing.
+The key of a structure does not depend on its position, orientation and the order of the atoms.
+
+Headless usage (run in the gauprep directory):
+    python -m gauprep.dedup DIR_OR_FILE [DIR_OR_FILE ...]
+"""
+import argparse
+import csv
+import hashlib
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Tuple, Optional
+
+from gauprep import structure_reader, file_list
+from gauprep.gaussian_input import GaussianInputData
+from config import ATOM_LIST, DEDUP_DECIMALS, FILE_SCAN_THREADS
+
+# numpy is imported in functions, so that it is required only when duplicates are searched.
+
+# attributes of GaussianInputData which are not settings (structure, title and values set when the job is written)
+_NOT_SETTING_ATTRIBUTES = ['_charge', '_multiplicity', 'structure', '_title', 'file_stem', 'atoms_l', 'atoms_h',
+                           'gen_basis', 'pseudo_read']
+# proper rotations which keep the principal axes (enantiomers have different keys)
+_AXIS_SIGNS = [(1, 1, 1), (-1, -1, 1), (-1, 1, -1), (1, -1, -1)]
+
+
+def get_settings_hash(gid: GaussianInputData) -> str:
+    """
+    Hash of the settings of the job (other than the structure, charge, multiplicity and title).
+    """
+    values = sorted((key, repr(value)) for (key, value) in vars(gid).items() if key not in _NOT_SETTING_ATTRIBUTES)
+    return hashlib.sha1(repr(values).encode('utf-8')).hexdigest()
+
+
+_ATOMIC_NUMBERS = {symbol.upper(): z for (z, symbol) in enumerate(ATOM_LIST)}
+
+
+def _get_atomic_number(term: str) -> int:
+    # e.g. C, c, C-Bq, C(Fragment=1), 6
+    if term.isdigit():
+        return int(term)
+    return _ATOMIC_NUMBERS[term.split('(')[0].split('-')[0].upper()]
+
+
+def get_structure_key(structure: List[str], charge: int, multiplicity: int, settings_hash: str = '',
+                      decimals: int = DEDUP_DECIMALS) -> str:
+    """
+    Canonical key of the structure: the coordinates are centered, aligned to the principal axes and rounded,
+    and the atoms are sorted. The sign of the axes is chosen as the smallest of the proper rotations.
+    Structures with (nearly) degenerate principal axes (e.g. linear or symmetric top molecules) may get different keys
+    for the same structure, which are then not found as duplicates.
+    """
+    import numpy as np
+
+    lines = [line.split() for line in structure if line.strip() != '']
+    numbers = np.array([_get_atomic_number(terms[0]) for terms in lines], dtype=np.int64)
+    # the last three terms are the coordinates (e.g. C 0 x y z with the freeze flag)
+    coordinates = np.array([terms[-3:] for terms in lines], dtype=float).reshape(-1, 3)
+    coordinates -= coordinates.mean(axis=0)
+    _, axes = np.linalg.eigh(coordinates.T @ coordinates)
+    if np.linalg.det(axes) < 0.0:
+        axes[:, 2] *= -1.0
+    aligned = np.rint(coordinates @ axes * 10 ** decimals).astype(np.int64)
+
+    canonical = None
+    for signs in _AXIS_SIGNS:
+        rows = np.column_stack((numbers, aligned * signs))
+        rows = rows[np.lexsort(rows.T[::-1])]  # sorted by atomic number, x, y, z
+        data = rows.tobytes()
+        if canonical is None or data < canonical:
+            canonical = data
+    header = '{:} {:} {:} {:}\n'.format(charge, multiplicity, decimals, settings_hash)
+    return hashlib.sha1(header.encode('utf-8') + canonical).hexdigest()
+
+
+def get_file_keys(files: List[str], settings_hash: str = '',
+                  structures: Optional[Dict[str, Tuple[int, int, List[str]]]] = None,
+                  max_workers: int = FILE_SCAN_THREADS) -> List[Optional[str]]:
+    """
+    get_structure_key for many files in parallel (same order as files). None for files which cannot be read.
+    structures: (charge, multi, structure) already read (e.g. for restart), other files are read by read_single_file.
+    """
+    import numpy  # raise ImportError before the threads
+
+    def get_key(file):
+        try:
+            if structures is not None and file in structures:
+                charge, multi, structure = structures[file]
+            else:
+                charge, multi, structure = structure_reader.read_single_file(file)
+            return get_structure_key(structure, charge, multi, settings_hash)
+        except (OSError, ValueError, IndexError, KeyError):
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(get_key, files))
+
+
+def find_duplicates(files: List[str], keys: List[Optional[str]]) -> Dict[str, str]:
+    """
+    :return: alias > the first file of the same key (files without key are not duplicates)
+    """
+    first_files = dict()
+    aliases = dict()
+    for (file, key) in zip(files, keys):
+        if key is None:
+            continue
+        if key in first_files:
+            if first_files[key] != file:
+                aliases[file] = first_files[key]
+        else:
+            first_files[key] = file
+    return aliases
+
+
+def get_aliases_string(aliases: Dict[str, str], jobs: Optional[Dict[str, str]] = None) -> str:
+    """
+    List of the duplicates (csv).
+    jobs: original > its job file
+    """
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(['alias', 'original', 'job'])
+    for (alias, original) in aliases.items():
+        writer.writerow([alias, original, jobs.get(original, '') if jobs is not None else ''])
+    return f.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find duplicate structures (the same geometry, charge and '
+                                                 'multiplicity) in structure files.')
+    parser.add_argument('paths', nargs='+', help='structure files or directories')
+    parser.add_argument('-o', '--output', default=None, help='csv file of the aliases (default: standard output)')
+    args = parser.parse_args()
+
+    files = []
+    for path in args.paths:
+        if Path(path).is_dir():
+            files.extend(file_list.walk_structure_files(path))
+        else:
+            files.append(str(path))
+    files = file_list.unique_file_list(files)
+    aliases = find_duplicates(files, get_file_keys(files))
+    if args.output is None:
+        sys.stdout.write(get_aliases_string(aliases))
+    else:
+        with Path(args.output).open(mode='w', encoding='utf-8', newline='') as f:
+            f.write(get_aliases_string(aliases))
+
+
+if __name__ == '__main__':
+    main()
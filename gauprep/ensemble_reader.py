@@ -0,0 +1,317 @@
+"""
+Streaming readers of multi-record structure files (SDF/MOL, MOL2, PDB, xyz and Link1 Gaussian input) for series mode.
+Records are read one by one, so that memory use does not depend on the number of records.
+"""
+import re
+from pathlib import Path
+from typing import Union, Tuple, List, Dict, Iterator, Optional, TextIO
+
+from gauprep import structure_reader
+from gauprep.conformer import HARTREE_TO_KCAL
+from config import ATOM_LIST
+
+ENSEMBLE_FILE_TYPES = {'sdf': 'sdf', 'sd': 'sdf', 'mol': 'sdf', 'mol2': 'mol2', 'pdb': 'pdb', 'ent': 'pdb',
+                       'xyz': 'xyz', 'gjf': 'gjf', 'gjc': 'gjf', 'com': 'gjf'}
+
+# (comment, charge, multi, structure data), charge and multi are None if the file does not have them (xyz)
+StructureRecord = Tuple[str, Optional[int], Optional[int], List[str]]
+
+_ATOMIC_NUMBERS = {symbol.lower(): z for (z, symbol) in enumerate(ATOM_LIST)}
+# charge field of V2000 atom block (4 is doublet radical)
+_SDF_CHARGE_CODES = {1: 3, 2: 2, 3: 1, 5: -1, 6: -2, 7: -3}
+# number of unpaired electrons of radical values (1: singlet, 2: doublet, 3: triplet)
+_RADICAL_ELECTRONS = {1: 0, 2: 1, 3: 2}
+# units of SDF energy data items by the words of their names (hartree per unit), kcal/mol if no unit is found
+# as RDKit and Open Babel write (MacroModel mmod properties are kJ/mol)
+_SDF_ENERGY_UNITS = [({'hartree', 'eh', 'au', 'a.u.'}, 'hartree', 1.0),
+                     ({'kj', 'mmod'}, 'kJ/mol', 1.0 / (HARTREE_TO_KCAL * 4.184)),
+                     ({'ev'}, 'eV', 1.0 / 27.211386245988),
+                     ({'kcal'}, 'kcal/mol', 1.0 / HARTREE_TO_KCAL)]
+_WORD_PATTERN = re.compile(r'[a-z.]+')
+
+
+def get_file_type(file: Union[str, Path]) -> str:
+    """
+    :return: sdf, mol2, pdb, xyz or gjf
+    """
+    suffix = Path(file).suffix.lstrip('.').lower()
+    if suffix not in ENSEMBLE_FILE_TYPES:
+        raise ValueError('Unsupported file type for series mode: ' + Path(file).name)
+    return ENSEMBLE_FILE_TYPES[suffix]
+
+
+def get_multiplicity(symbols: List[str], charge: int, unpaired: Optional[int] = None, multiplicity: int = 1) -> int:
+    """
+    Spin multiplicity of a record.
+    unpaired: number of unpaired electrons given by the file (radicals), None if not given.
+    Otherwise multiplicity (e.g. of the series settings) is used if it matches the parity of the number of electrons,
+    and the lowest multiplicity (1 or 2) if not.
+    """
+    if unpaired is not None:
+        return unpaired + 1
+    n_electrons = sum(_ATOMIC_NUMBERS.get(symbol.lower(), 0) for symbol in symbols) - charge
+    if (n_electrons + multiplicity) % 2 == 1:
+        return multiplicity
+    return 1 + n_electrons % 2
+
+
+def _format_atom_line(symbol: str, x: str, y: str, z: str) -> str:
+    return symbol.capitalize().ljust(10, ' ') + ' ' + x.rjust(12, ' ') + ' ' + \
+        y.rjust(12, ' ') + ' ' + z.rjust(12, ' ') + '\n'
+
+
+def get_sdf_energy_unit(item_name: str) -> Tuple[str, float]:
+    """
+    Unit of SDF energy data item from its name, e.g. <Energy (kcal/mol)>, <E_hartree>, <r_mmod_Potential_Energy>.
+    :return: (unit, hartree per unit)
+    """
+    words = set(_WORD_PATTERN.findall(item_name.lower()))
+    for (unit_words, unit, factor) in _SDF_ENERGY_UNITS:
+        if words & unit_words:
+            return unit, factor
+    return 'kcal/mol', 1.0 / HARTREE_TO_KCAL
+
+
+def _get_comment(title: str, energy: Optional[Tuple[str, str]]) -> str:
+    """
+    Comment of a record.
+    energy: (data item name, value) of SDF, which is written in hartree as in xtb comment lines,
+    so that it is found for conformer pruning (the value and unit in the file follow it).
+    """
+    comment = title.strip()
+    if energy is not None:
+        (item_name, value) = energy
+        unit, factor = get_sdf_energy_unit(item_name)
+        try:
+            comment += ' energy: {:.10f} hartree ({:} {:})'.format(float(value) * factor, value, unit)
+        except ValueError:
+            pass  # not a number
+    return comment.strip() + '\n'
+
+
+def _read_sdf_record(f: TextIO, multiplicity: int) -> Optional[StructureRecord]:
+    """
+    Read one record (molfile and data items until $$$$) of SDF file.
+    :return: None at the end of file
+    """
+    title = f.readline()
+    f.readline()  # program line
+    f.readline()  # comment line
+    counts = f.readline()
+    if counts.strip() == '':
+        return None
+
+    symbols = []
+    structure = []
+    atom_charges: Dict[int, int] = dict()
+    radicals: Dict[int, int] = dict()
+    property_found = False  # M  CHG / M  RAD lines supersede the atom block
+    if 'V3000' in counts:
+        line = f.readline()
+        while line and not line.startswith('M  END'):
+            if line.startswith('M  V30 BEGIN ATOM'):
+                line = f.readline()
+                while line and not line.startswith('M  V30 END ATOM'):
+                    terms = line.split()
+                    index = len(symbols) + 1
+                    symbols.append(terms[3])
+                    structure.append(_format_atom_line(terms[3], terms[4], terms[5], terms[6]))
+                    for term in terms[8:]:
+                        if term.startswith('CHG='):
+                            atom_charges[index] = int(term[4:])
+                        elif term.startswith('RAD='):
+                            radicals[index] = int(term[4:])
+                    line = f.readline()
+            line = f.readline()
+    else:
+        for i in range(int(counts[0:3])):
+            terms = f.readline().split()
+            symbols.append(terms[3])
+            structure.append(_format_atom_line(terms[3], terms[0], terms[1], terms[2]))
+            charge_code = int(terms[5]) if len(terms) > 5 else 0
+            if charge_code in _SDF_CHARGE_CODES:
+                atom_charges[i + 1] = _SDF_CHARGE_CODES[charge_code]
+            elif charge_code == 4:
+                radicals[i + 1] = 2
+        line = f.readline()
+        while line and not line.startswith('M  END') and not line.startswith('$$$$'):
+            if line.startswith('M  CHG') or line.startswith('M  RAD'):
+                if not property_found:
+                    atom_charges.clear()
+                    radicals.clear()
+                    property_found = True
+                values = [int(x) for x in line[6:].split()[1:]]
+                target = atom_charges if line.startswith('M  CHG') else radicals
+                for (atom, value) in zip(values[0::2], values[1::2]):
+                    target[atom] = value
+            line = f.readline()
+
+    # data items (energy is used for the comment)
+    energy = None
+    while line and not line.startswith('$$$$'):
+        if line.startswith('>') and 'energy' in line.lower():
+            value = f.readline().strip()
+            if value != '':
+                energy = (line.strip(), value.split()[0])
+        line = f.readline()
+
+    charge = sum(atom_charges.values())
+    unpaired = sum(_RADICAL_ELECTRONS.get(x, 0) for x in radicals.values()) if radicals else None
+    multi = get_multiplicity(symbols, charge, unpaired, multiplicity)
+    return _get_comment(title, energy), charge, multi, structure
+
+
+def iterate_sdf_records(file: Union[str, Path], multiplicity: int = 1) -> Iterator[StructureRecord]:
+    """
+    Records of SDF (or MOL) file, V2000 and V3000.
+    Charge is the sum of formal charges, multiplicity is from radicals (see get_multiplicity).
+    """
+    with Path(file).open(mode='r', encoding='utf-8', errors='replace') as f:
+        while True:
+            record = _read_sdf_record(f, multiplicity)
+            if record is None:
+                return
+            yield record
+
+
+def iterate_mol2_records(file: Union[str, Path], multiplicity: int = 1) -> Iterator[StructureRecord]:
+    """
+    Records (@<TRIPOS>MOLECULE) of MOL2 file.
+    Charge is the sum of formal charges in @<TRIPOS>UNITY_ATOM_ATTR, or the rounded sum of partial charges.
+    """
+    record = None
+
+    def get_record():
+        symbols = [symbol for (symbol, _) in record['atoms']]
+        if record['formal_charges']:
+            charge = sum(record['formal_charges'])
+        elif record['charge_type'] != 'NO_CHARGES':
+            charge = round(sum(partial for (_, partial) in record['atoms']))
+        else:
+            charge = 0
+        multi = get_multiplicity(symbols, charge, multiplicity=multiplicity)
+        return _get_comment(record['title'], None), charge, multi, record['structure']
+
+    with Path(file).open(mode='r', encoding='utf-8', errors='replace') as f:
+        section = ''
+        for line in f:
+            if line.startswith('@<TRIPOS>'):
+                section = line.strip()[9:]
+                if section == 'MOLECULE':
+                    if record is not None:
+                        yield get_record()
+                    title = f.readline()
+                    f.readline()  # counts
+                    f.readline()  # molecule type
+                    charge_type = f.readline().strip()
+                    record = {'title': title, 'charge_type': charge_type, 'atoms': [], 'structure': [],
+                              'formal_charges': []}
+                continue
+            if record is None or line.strip() == '' or line.startswith('#'):
+                continue
+            if section == 'ATOM':
+                terms = line.split()
+                symbol = terms[5].split('.')[0]
+                if symbol.upper() in ['LP', 'DU']:  # lone pairs and dummy atoms
+                    continue
+                partial = float(terms[8]) if len(terms) > 8 else 0.0
+                record['atoms'].append((symbol, partial))
+                record['structure'].append(_format_atom_line(symbol, terms[2], terms[3], terms[4]))
+            elif section == 'UNITY_ATOM_ATTR':
+                terms = line.split()
+                if len(terms) == 2 and terms[0].lower() == 'charge':
+                    record['formal_charges'].append(int(terms[1]))
+        if record is not None:
+            yield get_record()
+
+
+def _parse_pdb_charge(field: str) -> int:
+    """
+    Charge field of PDB atom line (e.g. 1+, 2-)
+    """
+    field = field.strip()
+    if field == '':
+        return 0
+    if field[-1] in '+-':
+        field = field[-1] + field[:-1]
+    return int(field)
+
+
+def iterate_pdb_records(file: Union[str, Path], multiplicity: int = 1) -> Iterator[StructureRecord]:
+    """
+    Models (MODEL/ENDMDL) of PDB file. A file without MODEL is one record.
+    Charge is the sum of the charge fields of ATOM/HETATM lines. Only the first alternate location is read.
+    """
+    def get_record():
+        charge = sum(charges)
+        multi = get_multiplicity(symbols, charge, multiplicity=multiplicity)
+        return _get_comment(title, None), charge, multi, structure
+
+    title = 'MODEL 1'
+    symbols = []
+    charges = []
+    structure = []
+    with Path(file).open(mode='r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            record_name = line[0:6].strip()
+            if record_name == 'MODEL':
+                title = 'MODEL ' + line[6:].strip()
+            elif record_name in ['ATOM', 'HETATM']:
+                if line[16] not in ' A1':
+                    continue
+                symbol = line[76:78].strip()
+                if symbol == '':
+                    symbol = ''.join(x for x in line[12:14] if x.isalpha())
+                symbols.append(symbol)
+                charges.append(_parse_pdb_charge(line[78:80]))
+                structure.append(_format_atom_line(symbol, line[30:38].strip(), line[38:46].strip(),
+                                                   line[46:54].strip()))
+            elif record_name in ['ENDMDL', 'END'] and len(structure) > 0:
+                yield get_record()
+                symbols, charges, structure = [], [], []
+        if len(structure) > 0:
+            yield get_record()
+
+
+def iterate_structure_records(file: Union[str, Path], multiplicity: int = 1) -> Iterator[StructureRecord]:
+    """
+    Records of SDF/MOL, MOL2, PDB, xyz or Gaussian input file (by the extension).
+    multiplicity: used for records which have the same parity of the number of electrons (see get_multiplicity)
+    xyz frames do not have charge and multiplicity (None). Gaussian input records are the job sections (--Link1--)
+    which have the geometry, with their charge and multiplicity.
+    """
+    file_type = get_file_type(file)
+    if file_type == 'sdf':
+        return iterate_sdf_records(file, multiplicity)
+    elif file_type == 'mol2':
+        return iterate_mol2_records(file, multiplicity)
+    elif file_type == 'pdb':
+        return iterate_pdb_records(file, multiplicity)
+    elif file_type == 'gjf':
+        return (('\n', charge, multi, structure)
+                for (charge, multi, structure) in structure_reader.iterate_gaussian_input_jobs(file))
+    return ((comment, None, None, structure) for (comment, structure) in structure_reader.iterate_xyz_frames(file))
+
+
+def count_structure_records(file: Union[str, Path]) -> int:
+    """
+    Number of records without parsing them (for the number of digits of ${NUMBER}).
+    """
+    file_type = get_file_type(file)
+    if file_type == 'xyz':
+        return sum(1 for _ in structure_reader.iterate_xyz_frames(file))
+    elif file_type == 'gjf':
+        return sum(1 for _ in structure_reader.iterate_gaussian_input_jobs(file))
+    marker = {'sdf': b'$$$$', 'mol2': b'@<TRIPOS>MOLECULE', 'pdb': b'ENDMDL'}[file_type]
+    count = 0
+    has_atoms = False
+    with Path(file).open(mode='rb') as f:
+        for line in f:
+            if line.startswith(marker):
+                count += 1
+            elif not has_atoms and line.strip() != b'':
+                has_atoms = True
+    # single record without the terminator (MOL file, PDB without MODEL)
+    if count == 0 and has_atoms:
+        return 1
+    return count
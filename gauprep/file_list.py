@@ -0,0 +1,141 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Union, Optional, List, Iterable, Tuple
+
+from config import STRUCTURE_FILE_EXTENSIONS, FILE_SCAN_THREADS
+
+
+def _split_patterns(patterns: Optional[Union[str, Iterable[str]]]) -> List[str]:
+    """
+    Accept None, a space/semicolon separated string, or an iterable of glob patterns.
+    """
+    if patterns is None:
+        return []
+    if isinstance(patterns, str):
+        patterns = patterns.replace(';', ' ').split()
+    return [p.strip() for p in patterns if p.strip() != '']
+
+
+def _match_any(name: str, patterns: List[str]) -> bool:
+    for pattern in patterns:
+        if fnmatch(name, pattern):
+            return True
+    return False
+
+
+def is_structure_file(name: str, extensions: Optional[Iterable[str]] = None) -> bool:
+    if extensions is None:
+        extensions = STRUCTURE_FILE_EXTENSIONS
+    ext = os.path.splitext(name)[1].lstrip('.').lower()
+    return ext in extensions
+
+
+def _scan_dir(directory: str, include: List[str], exclude: List[str], extensions: Optional[Iterable[str]]):
+    """
+    Scan one directory (not recursive).
+    :return: (files: List[str], sub_directories: List[str])
+    """
+    files = []
+    sub_dirs = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                # DirEntry caches the file type from readdir, so no extra stat is issued on most platforms.
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _match_any(entry.name, exclude):
+                            sub_dirs.append(entry.path)
+                        continue
+                    if not entry.is_file():
+                        continue
+                except OSError:
+                    continue
+                if not is_structure_file(entry.name, extensions):
+                    continue
+                if include and not _match_any(entry.name, include):
+                    continue
+                if exclude and _match_any(entry.name, exclude):
+                    continue
+                files.append(entry.path)
+    except OSError:
+        pass
+    files.sort()
+    sub_dirs.sort()
+    return files, sub_dirs
+
+
+def scan_structure_directory(directory: Union[str, Path],
+                             extensions: Optional[Iterable[str]] = None) -> Tuple[List[str], List[str]]:
+    """
+    Structure files and sub directories of one directory (not recursive, e.g. for a cache of directories).
+    :return: (files, sub_directories), sorted
+    """
+    return _scan_dir(str(directory), [], [], extensions)
+
+
+def walk_structure_files(directory: Union[str, Path],
+                         include: Optional[Union[str, Iterable[str]]] = None,
+                         exclude: Optional[Union[str, Iterable[str]]] = None,
+                         max_workers: int = FILE_SCAN_THREADS,
+                         extensions: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Recursively list structure files under the directory with os.scandir.
+    Directories of the same depth are scanned in parallel.
+    include/exclude: glob patterns matched against file names (exclude is also applied to directory names).
+    extensions: None for STRUCTURE_FILE_EXTENSIONS
+    :return: sorted list of file paths (sorted per directory, parent directory first)
+    """
+    include = _split_patterns(include)
+    exclude = _split_patterns(exclude)
+
+    result = []
+    current_level = [str(directory)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while current_level:
+            next_level = []
+            scanned = executor.map(lambda d: _scan_dir(d, include, exclude, extensions), current_level)
+            for files, sub_dirs in scanned:
+                result.extend(files)
+                next_level.extend(sub_dirs)
+            current_level = next_level
+    return result
+
+
+def expand_file_list(file_list: Iterable[Union[str, Path]],
+                     include: Optional[Union[str, Iterable[str]]] = None,
+                     exclude: Optional[Union[str, Iterable[str]]] = None,
+                     extensions: Optional[Iterable[str]] = None) -> List[str]:
+    """
+    Expand directories in the file list to structure files in them (recursive).
+    Files given directly are kept as they are (e.g. .sset files), only directories are filtered by extensions.
+    extensions: None for STRUCTURE_FILE_EXTENSIONS (e.g. with sset for setting files in dropped directories)
+    :return: file list without duplicates (order is kept)
+    """
+    expanded_list = []
+    for file in file_list:
+        file = str(file)
+        if os.path.isdir(file):
+            expanded_list.extend(walk_structure_files(file, include=include, exclude=exclude, extensions=extensions))
+        else:
+            expanded_list.append(file)
+    return unique_file_list(expanded_list)
+
+
+def unique_file_list(file_list: Iterable[Union[str, Path]]) -> List[str]:
+    """
+    Remove blank entries and duplicates keeping the first occurrence.
+    """
+    return list(dict.fromkeys(str(f).strip() for f in file_list if str(f).strip() != ''))
+
+
+def clean_up_file_list(file_list: Iterable[Union[str, Path]], max_workers: int = FILE_SCAN_THREADS) -> List[str]:
+    """
+    Remove blank entries, duplicates and non-existing files. Existence is checked in parallel.
+    """
+    file_list = unique_file_list(file_list)
+    chunks = [file_list[i:i + 1024] for i in range(0, len(file_list), 1024)]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        checked = executor.map(lambda chunk: [f for f in chunk if os.path.exists(f)], chunks)
+        return [f for chunk in checked for f in chunk]
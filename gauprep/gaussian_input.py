@@ -1,10 +1,13 @@
 import configparser
+import copy
 from decimal import Decimal
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional, Union, Tuple, List
 
 from gauprep.gbs_parser import GaussianBasisData
-from config import EXTERNAL_BASIS_DIR, DEFAULT_ROUTE_KEYWORDS, D3ZERO_PARAM_FILE, D3BJ_PARAM_FILE, ATOM_LIST
+from config import EXTERNAL_BASIS_DIR, DEFAULT_ROUTE_KEYWORDS, D3ZERO_PARAM_FILE, D3BJ_PARAM_FILE, ATOM_LIST, \
+    SEMIEMPIRICAL_METHODS
 
 
 def get_gbs_path(name: str) -> Optional[Path]:
@@ -16,6 +19,10 @@ def get_gbs_path(name: str) -> Optional[Path]:
     return None
 
 
+def is_semiempirical(method: str) -> bool:
+    return method.strip().upper() in [m.upper() for m in SEMIEMPIRICAL_METHODS]
+
+
 def get_gen_basis_string(atoms: List[str], basis_name: str) -> str:
     basis_string = ' '.join(atoms) + ' 0\n'
     basis_string += basis_name + '\n'
@@ -29,6 +36,89 @@ def get_gen_ecp_string(atoms: List[str], ecp_name: str) -> str:
     return ecp_string
 
 
+@lru_cache(maxsize=None)
+def get_gen_ecp_block(basis: str, basis_h_ecp: str, atoms_l: Tuple[str, ...],
+                      atoms_h: Tuple[str, ...]) -> Tuple[bool, bool, Optional[str]]:
+    """
+    Gen/ECP block for the basis sets and the light and heavy atoms (assembled once for each combination).
+    :return: (gen_basis, pseudo_read, Gen/ECP string or None)
+    """
+    # Check external basis set file. None if not found.
+    ext_basis_file = get_gbs_path(basis)
+    ext_basis_h_file = get_gbs_path(basis_h_ecp)
+
+    # Following 3 cases: not necessary to use gen
+    # 1. only light atoms, no external file
+    # 2. only heavy atoms, no external file
+    # 3. light atoms and heavy atoms with the same basis set, no external file
+    if (len(atoms_h) == 0 and ext_basis_file is None) \
+            or (len(atoms_l) == 0 and ext_basis_h_file is None) \
+            or (basis == basis_h_ecp and ext_basis_file is None):
+        return False, False, None
+
+    # Followings are when Gen is required.
+    # case: only light atoms (external file)
+    if len(atoms_h) == 0:
+        gbs = GaussianBasisData(ext_basis_file)
+        basis_string = gbs.get_basis(atoms_l)
+        ecp_string = gbs.get_ecp(atoms_l)
+        if ecp_string == '':
+            return True, False, basis_string
+        else:
+            return True, True, basis_string + '\n' + ecp_string
+
+    # case: only heavy atoms (external file)
+    if len(atoms_l) == 0:
+        gbs = GaussianBasisData(ext_basis_h_file)
+        basis_string = gbs.get_basis(atoms_h)
+        ecp_string = gbs.get_ecp(atoms_h)
+        if ecp_string == '':
+            return True, False, basis_string
+        else:
+            return True, True, basis_string + '\n' + ecp_string
+
+    # light and heavy atoms; further classification based on external file exists or not.
+    # both light and heavy atoms with built-in (but different basis set)
+    if (ext_basis_file is None) and (ext_basis_h_file is None):
+        # It is assumed that built-in set for heavy atoms is ecp-based.
+        basis_string = get_gen_basis_string(atoms_l, basis) \
+                       + get_gen_basis_string(atoms_h, basis_h_ecp)
+        ecp_string = get_gen_ecp_string(atoms_h, basis_h_ecp)
+        return True, True, basis_string + '\n' + ecp_string
+
+    # both light and heavy atoms call external file
+    if (ext_basis_file is not None) and (ext_basis_h_file is not None):
+        gbs_l = GaussianBasisData(ext_basis_file)
+        gbs_h = GaussianBasisData(ext_basis_h_file)
+        basis_string = gbs_l.get_basis(atoms_l) + gbs_h.get_basis(atoms_h)
+        ecp_string = gbs_l.get_ecp(atoms_l) + gbs_h.get_ecp(atoms_h)
+        if ecp_string == '':
+            return True, False, basis_string
+        else:
+            return True, True, basis_string + '\n' + ecp_string
+
+    # light atoms built-in, heavy atoms external file
+    if (ext_basis_file is None) and (ext_basis_h_file is not None):
+        gbs_h = GaussianBasisData(ext_basis_h_file)
+        basis_string = get_gen_basis_string(atoms_l, basis)
+        basis_string += gbs_h.get_basis(atoms_h)
+        ecp_string = gbs_h.get_ecp(atoms_h)
+        if ecp_string == '':
+            return True, False, basis_string
+        else:
+            return True, True, basis_string + '\n' + ecp_string
+
+    # light atoms external file, heavy atoms built-in
+    if (ext_basis_file is not None) and (ext_basis_h_file is None):
+        gbs_l = GaussianBasisData(ext_basis_file)
+        basis_string = get_gen_basis_string(atoms_h, basis_h_ecp)
+        basis_string += gbs_l.get_basis(atoms_l)
+        ecp_string = get_gen_ecp_string(atoms_h, basis_h_ecp)
+        ecp_string += gbs_l.get_ecp(atoms_l)
+        # It is assumed that built-in set for heavy atoms is ecp-based.
+        return True, True, basis_string + '\n' + ecp_string
+
+
 def get_atom_list(structure_data: List[str], n_h: int) -> Tuple[List[str], List[str]]:
     """
     Return light atom list and heavy atom list from Gaussian's structure data
@@ -187,6 +277,13 @@ class GaussianInputData:
         self.opt_calcfc = ''  # '', 0 for calcfc, 1 for calcall, int > 1 for recalcfc
         self.opt_algorithm = 'default'  # default, GDIIS, Newton
         self.opt_modredundant = ''
+        self.opt_split_scan = False  # True for separate jobs for each scan point (gauprep.job_writer)
+
+        # pre-optimization at a lower level (Link1 job before Opt, Opt+Freq and TS)
+        self.preopt_method = 'none'  # none, or method name (e.g. PM6, B3LYP)
+        self.preopt_basis = ''  # '' for the same as basis (ignored for semi-empirical methods)
+        self.preopt_basis_h_ecp = ''  # '' for the same as basis_h_ecp
+        self.preopt_convergence = 'loose'  # loose, default, tight, verytight
 
         self.irc_direction = 'both'  # both, forward, reverse
         self.irc_algorithm = 'lqa'  # hpc, eulerpc, lqa
@@ -195,6 +292,9 @@ class GaussianInputData:
         self.irc_maxcyc = ''  # '', int > 0
         self.irc_calcfc_predictor = ''  # '', int > 0
         self.irc_calcfc_corrector = ''  # '', int > 0
+        self.irc_read_fc = False  # True for rcfc (read force constants from chk) instead of calcfc
+        self.irc_split = False  # True for TS freq job and forward/reverse IRC jobs for both (gauprep.job_writer)
+        self.irc_split_fc = 'calc'  # read: rcfc from the freq job's chk, calc: calcfc in each IRC job
 
         self.nbo_version = 'Gaussian'  # Gaussian, 6, 7.  call nbo, nbo6, nbo7
         self.nbo_keywords = []  # keyword list for nboread sections
@@ -205,6 +305,9 @@ class GaussianInputData:
         self.first_stable_check = False
         self.guess_mix = False
 
+        self.old_chk = ''  # '' or chk file name for %oldchk (guess=read)
+        self.old_chk_geom = False  # True for geom=allcheck from old_chk (no title, charge and structure)
+
     @property
     def charge(self):
         return self._charge
@@ -475,6 +578,15 @@ class GaussianInputData:
                 self._irc_calcfc_corrector = value
 
     def output_file(self, file: Union[Path, str]):
+        file = Path(file)
+        output_string = self.get_output_string(file)
+        with file.open(mode='w', encoding='utf-8', newline='\n') as f:
+            f.write(output_string)
+
+    def get_output_string(self, file: Union[Path, str]) -> str:
+        """
+        Contents of the job file (file name is used for %chk and ${FILENAME}, the file is not written).
+        """
         file = Path(file)
         self.file_stem = file.stem
 
@@ -489,38 +601,76 @@ class GaussianInputData:
 
         # For other jobs
         else:
-            # in case stable=opt job
-            if self.first_stable_check:
-                output_data.extend(self._get_output_block(job_type='SP', read_prev=read_prev, stableopt=True))
+            # in case pre-optimization at lower level
+            read_guess = True
+            if self.job_type.upper() in ['OPT', 'OPT+FREQ', 'TS'] and self.preopt_method.lower() != 'none':
+                output_data.extend(self._get_preopt_block())
+                read_prev = True
+                # wavefunction of semi-empirical methods cannot be used as guess
+                read_guess = not is_semiempirical(self.preopt_method)
+
+            # in case stable=opt job (already done for the old chk)
+            if self.first_stable_check and not self.old_chk:
+                output_data.extend(self._get_output_block(job_type='SP', read_prev=read_prev, stableopt=True,
+                                                          read_guess=read_guess))
                 read_prev = True
+                read_guess = True
 
             # in case OPT+FREQ job with iop D3 parameter settings >> OPT Link1 FREQ 2 step job.
             if self.job_type.upper() in ['OPT+FREQ', 'TS'] and \
                     self.dispersion.lower() != 'none' and \
                     self.dispersion_external_param:
-                output_data.extend(self._get_output_block(job_type='OPT', read_prev=read_prev, stableopt=False))
+                output_data.extend(self._get_output_block(job_type='OPT', read_prev=read_prev, stableopt=False,
+                                                          read_guess=read_guess))
                 read_prev = True
+                read_guess = True
                 output_data.extend(self._get_output_block(job_type='FREQ', read_prev=read_prev, stableopt=False))
 
             # for other cases
             else:
                 output_data.extend(self._get_output_block(job_type=self.job_type.upper(),
-                                                          read_prev=read_prev, stableopt=False))
-
-        with file.open(mode='w', encoding='utf-8', newline='\n') as f:
-            f.writelines(output_data)
-
-    def _get_output_block(self, job_type: str, read_prev: bool, stableopt: bool) -> List[str]:
+                                                          read_prev=read_prev, stableopt=False,
+                                                          read_guess=read_guess))
+
+        return ''.join(output_data)
+
+    def _get_preopt_block(self) -> List[str]:
+        """
+        Optimization block at the pre-optimization level (the first block of the job).
+        """
+        # title is fixed for the target level (${GEN})
+        self._get_gen_ecp_string()
+        title = self._get_title_string()
+
+        preopt = copy.copy(self)
+        preopt.title = title
+        preopt.method = self.preopt_method
+        preopt.basis = self.preopt_basis or self.basis
+        preopt.basis_h_ecp = self.preopt_basis_h_ecp or self.basis_h_ecp
+        preopt.opt_convergence = self.preopt_convergence
+        if is_semiempirical(self.preopt_method):
+            preopt.dispersion = 'none'
+            preopt.old_chk = ''
+            preopt.guess_mix = False  # guess=mix is set at the target level
+        # TS pre-optimization is Opt=TS without FREQ
+        job_type = 'OPTTS' if self.job_type.upper() == 'TS' else 'OPT'
+        return preopt._get_output_block(job_type=job_type, read_prev=False, stableopt=False)
+
+    def _get_output_block(self, job_type: str, read_prev: bool, stableopt: bool,
+                          read_guess: bool = True) -> List[str]:
         gen_basis_ecp_string = self._get_gen_ecp_string()  # This should be run to check gen pseudo=read
 
         output_block = []
         if read_prev:
             output_block.append('--Link1--\n')
         output_block.append(self._get_link0_string())
+        if self.old_chk and not read_prev:
+            output_block.append('%oldchk=' + self.old_chk + '\n')
         output_block.append('%chk=' + self.file_stem + '.chk\n')
-        output_block.append(self._get_route_string(job_type=job_type, read_prev=read_prev, stableopt=stableopt))
+        output_block.append(self._get_route_string(job_type=job_type, read_prev=read_prev, stableopt=stableopt,
+                                                   read_guess=read_guess))
         output_block.append('\n')
-        if not read_prev:
+        if not read_prev and not (self.old_chk and self.old_chk_geom):
             output_block.append(self._get_title_string())
             output_block.append('\n')
             output_block.append('{:} {:}\n'.format(self.charge, self.multiplicity))
@@ -590,7 +740,7 @@ class GaussianInputData:
 
             return title_string.rstrip() + '\n'
 
-    def _get_route_string(self, job_type: str, read_prev: bool, stableopt: bool) -> str:
+    def _get_route_string(self, job_type: str, read_prev: bool, stableopt: bool, read_guess: bool = True) -> str:
         route_terms = ['#P']
 
         # Job terms
@@ -623,6 +773,8 @@ class GaussianInputData:
             route_terms.append(self._get_optts_term())
             if self.opt_calcfc != '1':
                 route_terms.append('FREQ=noraman')
+        elif job_type.upper() == 'OPTTS':
+            route_terms.append(self._get_optts_term())
         elif job_type.upper() == 'IRC':
             route_terms.append(self._get_irc_term())
 
@@ -630,7 +782,7 @@ class GaussianInputData:
             prefix = 'U'
         elif stableopt:
             prefix = 'U'
-        elif read_prev and self.first_stable_check:
+        elif (read_prev or self.old_chk) and self.first_stable_check:
             prefix = 'U'
         else:
             prefix = ''
@@ -649,7 +801,16 @@ class GaussianInputData:
 
         # read checkpoint for read prev
         if read_prev:
-            route_terms.extend(['guess=read', 'geom=allcheck'])
+            if read_guess:
+                route_terms.append('guess=read')
+            elif self.guess_mix:
+                route_terms.append('guess=mix')
+            route_terms.append('geom=allcheck')
+        # read old chk
+        elif self.old_chk:
+            route_terms.append('guess=read')
+            if self.old_chk_geom:
+                route_terms.append('geom=allcheck')
         # guess=mix
         elif self.guess_mix:
             route_terms.append('guess=mix')
@@ -668,6 +829,8 @@ class GaussianInputData:
 
     def _get_method_term(self, prefix='') -> str:
         method_terms = [prefix + self.method]
+        if is_semiempirical(self.method):
+            return ' '.join(method_terms)
         if self.gen_basis:
             method_terms.append('Gen')
             if self.pseudo_read:
@@ -752,7 +915,10 @@ class GaussianInputData:
         if self.irc_maxcyc != '' and self.irc_algorithm.lower() not in ['lqa']:
             irc_options.append('maxcyc=' + self.irc_maxcyc)
 
-        irc_options.append('calcfc')
+        if self.irc_read_fc:
+            irc_options.append('rcfc')
+        else:
+            irc_options.append('calcfc')
 
         # case LQA (calcfc only for predictor)
         if self.irc_algorithm.lower() in ['lqa']:
@@ -798,89 +964,12 @@ class GaussianInputData:
         atom_num_ecp = 19 if self.ecp_for_3d else 37
         self.atoms_l, self.atoms_h = get_atom_list(self.structure, atom_num_ecp)
 
-        # Check external basis set file. None if not found.
-        ext_basis_file = get_gbs_path(self.basis)
-        ext_basis_h_file = get_gbs_path(self.basis_h_ecp)
-
-        # Following 3 cases: not necessary to use gen
-        # 1. only light atoms, no external file
-        # 2. only heavy atoms, no external file
-        # 3. light atoms and heavy atoms with the same basis set, no external file
-        if (len(self.atoms_h) == 0 and ext_basis_file is None) \
-                or (len(self.atoms_l) == 0 and ext_basis_h_file is None) \
-                or (self.basis == self.basis_h_ecp and ext_basis_file is None):
+        # semi-empirical methods: no basis set
+        if is_semiempirical(self.method):
             self.gen_basis = False
             self.pseudo_read = False
             return None
 
-        self.gen_basis = True
-
-        # Followings are when Gen is required.
-        # case: only light atoms (external file)
-        if len(self.atoms_h) == 0:
-            gbs = GaussianBasisData(ext_basis_file)
-            basis_string = gbs.get_basis(self.atoms_l)
-            ecp_string = gbs.get_ecp(self.atoms_l)
-            if ecp_string == '':
-                self.pseudo_read = False
-                return basis_string
-            else:
-                self.pseudo_read = True
-                return basis_string + '\n' + ecp_string
-
-        # case: only heavy atoms (external file)
-        if len(self.atoms_l) == 0:
-            gbs = GaussianBasisData(ext_basis_h_file)
-            basis_string = gbs.get_basis(self.atoms_h)
-            ecp_string = gbs.get_ecp(self.atoms_h)
-            if ecp_string == '':
-                self.pseudo_read = False
-                return basis_string
-            else:
-                self.pseudo_read = True
-                return basis_string + '\n' + ecp_string
-
-        # light and heavy atoms; further classification based on external file exists or not.
-        # both light and heavy atoms with built-in (but different basis set)
-        if (ext_basis_file is None) and (ext_basis_h_file is None):
-            self.pseudo_read = True  # It is assumed that built-in set for heavy atoms is ecp-based.
-            basis_string = get_gen_basis_string(self.atoms_l, self.basis) \
-                           + get_gen_basis_string(self.atoms_h, self.basis_h_ecp)
-            ecp_string = get_gen_ecp_string(self.atoms_h, self.basis_h_ecp)
-            return basis_string + '\n' + ecp_string
-
-        # both light and heavy atoms call external file
-        if (ext_basis_file is not None) and (ext_basis_h_file is not None):
-            gbs_l = GaussianBasisData(ext_basis_file)
-            gbs_h = GaussianBasisData(ext_basis_h_file)
-            basis_string = gbs_l.get_basis(self.atoms_l) + gbs_h.get_basis(self.atoms_h)
-            ecp_string = gbs_l.get_ecp(self.atoms_l) + gbs_h.get_ecp(self.atoms_h)
-            if ecp_string == '':
-                self.pseudo_read = False
-                return basis_string
-            else:
-                self.pseudo_read = True
-                return basis_string + '\n' + ecp_string
-
-        # light atoms built-in, heavy atoms external file
-        if (ext_basis_file is None) and (ext_basis_h_file is not None):
-            gbs_h = GaussianBasisData(ext_basis_h_file)
-            basis_string = get_gen_basis_string(self.atoms_l, self.basis)
-            basis_string += gbs_h.get_basis(self.atoms_h)
-            ecp_string = gbs_h.get_ecp(self.atoms_h)
-            if ecp_string == '':
-                self.pseudo_read = False
-                return basis_string
-            else:
-                self.pseudo_read = True
-                return basis_string + '\n' + ecp_string
-
-        # light atoms external file, heavy atoms built-in
-        if (ext_basis_file is not None) and (ext_basis_h_file is None):
-            gbs_l = GaussianBasisData(ext_basis_file)
-            basis_string = get_gen_basis_string(self.atoms_h, self.basis_h_ecp)
-            basis_string += gbs_l.get_basis(self.atoms_l)
-            ecp_string = get_gen_ecp_string(self.atoms_h, self.basis_h_ecp)
-            ecp_string += gbs_l.get_ecp(self.atoms_l)
-            self.pseudo_read = True  # It is assumed that built-in set for heavy atoms is ecp-based.
-            return basis_string + '\n' + ecp_string
+        self.gen_basis, self.pseudo_read, gen_ecp_string = get_gen_ecp_block(self.basis, self.basis_h_ecp,
+                                                                             tuple(self.atoms_l), tuple(self.atoms_h))
+        return gen_ecp_string
@@ -1,8 +1,25 @@
 from pathlib import Path
-from typing import Union
+from typing import Union, List
 
 from config import ATOM_LIST
 
+# number of basis functions for each shell type: (pure, cartesian)
+SHELL_FUNCTIONS = {'S': (1, 1), 'P': (3, 3), 'SP': (4, 4), 'L': (4, 4), 'D': (5, 6), 'F': (7, 10),
+                   'G': (9, 15), 'H': (11, 21), 'I': (13, 28)}
+
+
+def count_shell_functions(shell: str, spherical: bool = True) -> int:
+    pure, cartesian = SHELL_FUNCTIONS[shell.upper()]
+    if shell.upper() in ['S', 'P', 'SP', 'L']:
+        return pure
+    return pure if spherical else cartesian
+
+
+def _is_shell_line(line: str) -> bool:
+    # e.g. S    3   1.00
+    data = line.strip().split()
+    return len(data) == 3 and data[0].upper() in SHELL_FUNCTIONS and data[1].isdigit()
+
 
 def _is_start_line(line: str) -> bool:
     data = line.strip().split()
@@ -106,3 +123,13 @@ class GaussianBasisData:
             if temp is not None:
                 ecp_string += temp
         return ecp_string
+
+    def get_shells(self, atom: str) -> List[str]:
+        """
+        Contracted shell types of the atom, e.g. ['S', 'S', 'P', 'D']
+        """
+        lines = self._get_basis(atom).splitlines()[1:]  # skip atom_name 0
+        return [line.strip().split()[0].upper() for line in lines if _is_shell_line(line)]
+
+    def count_basis_functions(self, atom: str, spherical: bool = True) -> int:
+        return sum(count_shell_functions(shell, spherical) for shell in self.get_shells(atom))
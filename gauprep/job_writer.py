@@ -0,0 +1,176 @@
+import copy
+import csv
+import io
+import os
+from pathlib import Path
+from typing import Union, List, Tuple, Optional
+
+from gauprep import scan
+from gauprep.gaussian_input import GaussianInputData
+from gauprep.output_sink import FileSink
+
+IRC_SPLIT_FC_OPTIONS = ['read', 'calc']
+SERIES_CHAIN_MODES = ['link1', 'jobs']
+
+
+def get_irc_split_jobs(gid: GaussianInputData, file: Union[str, Path]) -> List[Tuple[Path, GaussianInputData]]:
+    """
+    IRC (both directions) as a TS freq job (file_ts_freq.gjf) and forward/reverse IRC jobs (file_irc_fwd.gjf,
+    file_irc_rev.gjf).
+    irc_split_fc = read: IRC jobs read geometry and force constants from a copy of the freq job's chk (%oldchk),
+    so they should be run after the freq job. calc: IRC jobs calculate force constants and can be run at once.
+    """
+    file = Path(file)
+    if gid.irc_split_fc not in IRC_SPLIT_FC_OPTIONS:
+        raise ValueError('Force constants for split IRC should be read or calc.')
+
+    freq_file = file.with_name(file.stem + '_ts_freq' + file.suffix)
+    freq_gid = copy.copy(gid)
+    freq_gid.job_type = 'FREQ'
+    jobs = [(freq_file, freq_gid)]
+
+    for (direction, name) in [('forward', '_irc_fwd'), ('reverse', '_irc_rev')]:
+        irc_gid = copy.copy(gid)
+        irc_gid.irc_direction = direction
+        if gid.irc_split_fc == 'read':
+            irc_gid.irc_read_fc = True
+            irc_gid.old_chk = freq_file.stem + '.chk'
+            irc_gid.old_chk_geom = True
+        jobs.append((file.with_name(file.stem + name + file.suffix), irc_gid))
+    return jobs
+
+
+def is_split_job(gid: GaussianInputData) -> bool:
+    """
+    True if the job is written as several files (scan or IRC split into jobs).
+    """
+    if gid.opt_split_scan and gid.job_type.upper() in ['OPT', 'OPT+FREQ'] and scan.has_scan(gid.opt_modredundant):
+        return True
+    return gid.irc_split and gid.job_type.upper() == 'IRC' and gid.irc_direction.lower() == 'both'
+
+
+def get_job_files(gid: GaussianInputData, file: Union[str, Path]) -> List[Path]:
+    """
+    Files which write_jobs writes for the job (e.g. to check existing files before writing).
+    """
+    file = Path(file)
+    if gid.opt_split_scan and gid.job_type.upper() in ['OPT', 'OPT+FREQ'] and scan.has_scan(gid.opt_modredundant):
+        return scan.get_scan_job_files(gid, file)
+    if gid.irc_split and gid.job_type.upper() == 'IRC' and gid.irc_direction.lower() == 'both':
+        return [job_file for (job_file, _) in get_irc_split_jobs(gid, file)]
+    return [file]
+
+
+def write_jobs(gid: GaussianInputData, file: Union[str, Path],
+               sink: Optional[FileSink] = None) -> List[Tuple[Path, GaussianInputData]]:
+    """
+    Write the job to file. Some options split the job into several files (e.g. a scan into separate jobs).
+    sink: destination of the files (archive or multi-job file, see output_sink), None for loose files
+    :return: list of (written file, GaussianInputData of the file)
+    """
+    file = Path(file)
+    if sink is None:
+        sink = FileSink()
+    if gid.opt_split_scan and gid.job_type.upper() in ['OPT', 'OPT+FREQ'] and scan.has_scan(gid.opt_modredundant):
+        return scan.output_scan_jobs(gid, file, sink)
+
+    if gid.irc_split and gid.job_type.upper() == 'IRC' and gid.irc_direction.lower() == 'both':
+        jobs = get_irc_split_jobs(gid, file)
+        for (job_file, job_gid) in jobs:
+            sink.write_job(job_file, job_gid)
+        return jobs
+
+    sink.write_job(file, gid)
+    return [(file, gid)]
+
+
+class ChainWriter:
+    """
+    Jobs of consecutive series frames chained by %oldchk: each job starts from the wavefunction of the previous
+    frame (guess=read). A chain has up to chain_length frames and a new chain starts with its own guess.
+    mode = link1: a chain is written as one file (first frame's name + _chain) joined by --Link1--.
+    mode = jobs: frames are separate jobs, which should be run after the previous one in the chain
+    (dependency file: chain, position, file, depends_on).
+    """
+    def __init__(self, chain_length: int, mode: str, sink: Optional[FileSink] = None,
+                 dependency_file: Optional[Union[str, Path]] = None):
+        if chain_length < 1:
+            raise ValueError('Chain length should be a positive integer.')
+        if mode not in SERIES_CHAIN_MODES:
+            raise ValueError('Chain mode should be link1 or jobs.')
+        self.chain_length = chain_length
+        self.mode = mode
+        self.sink = FileSink() if sink is None else sink
+        self.dependency_file = dependency_file
+        self.n_chains = 0
+        self.chain = []  # (file, gid, text, frame number) of the current chain
+        self.chain_key = None  # frames of a chain have the same charge, multiplicity and atoms
+        self.dependencies = io.StringIO()
+        self.dependency_writer = csv.writer(self.dependencies)
+        self.dependency_writer.writerow(['chain', 'position', 'file', 'depends_on'])
+
+    def write(self, gid: GaussianInputData, file: Union[str, Path],
+              number: int = 0) -> List[Tuple[Path, GaussianInputData, int]]:
+        """
+        Add the frame to the chain.
+        number: frame number (returned with the written files, e.g. for the manifest)
+        :return: list of (written file, GaussianInputData, frame number),
+        link1 files are written when the chain is completed
+        """
+        file = Path(file)
+        if is_split_job(gid):
+            raise ValueError('Chained jobs cannot be split into several jobs.')
+        key = (gid.charge, gid.multiplicity, tuple(line.split()[0] for line in gid.structure if line.strip()))
+        new_chain = len(self.chain) >= self.chain_length or key != self.chain_key
+
+        gid = copy.copy(gid)
+        if not new_chain:
+            previous_file = self.chain[-1][0]
+            if self.mode == 'link1':  # all sections run in the same directory
+                gid.old_chk = previous_file.stem + '.chk'
+            else:
+                gid.old_chk = os.path.relpath(str(previous_file.with_suffix('.chk')), str(file.parent))
+            gid.old_chk_geom = False
+        try:
+            text = gid.get_output_string(file)
+        except ValueError:
+            # the next frame cannot read the wavefunction of this frame, so that it starts a new chain
+            self.chain_key = None
+            raise
+
+        written = self.flush() if new_chain else []
+        self.chain_key = key
+        self.chain.append((file, gid, text, number))
+        if self.mode == 'jobs':
+            self.sink.write_job_text(file, text)
+            depends_on = self.chain[-2][0].name if len(self.chain) > 1 else ''
+            self.dependency_writer.writerow([self.n_chains + 1, len(self.chain), file.name, depends_on])
+            written.append((file, gid, number))
+        return written
+
+    def flush(self) -> List[Tuple[Path, GaussianInputData, int]]:
+        """
+        Finish the current chain.
+        :return: written files (link1)
+        """
+        written = []
+        if len(self.chain) == 0:
+            return written
+        if self.mode == 'link1':
+            first_file = self.chain[0][0]
+            chain_file = first_file.with_name(first_file.stem + '_chain' + first_file.suffix)
+            self.sink.write_job_text(chain_file, '--Link1--\n'.join(text for (_, _, text, _) in self.chain))
+            written = [(chain_file, gid, number) for (_, gid, _, number) in self.chain]
+        self.n_chains += 1
+        self.chain = []
+        return written
+
+    def close(self) -> List[Tuple[Path, GaussianInputData, int]]:
+        """
+        Finish the last chain and write the dependency file (jobs).
+        :return: written files (link1)
+        """
+        written = self.flush()
+        if self.mode == 'jobs' and self.dependency_file is not None:
+            self.sink.write_text(self.dependency_file, self.dependencies.getvalue())
+        return written
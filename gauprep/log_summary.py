@@ -0,0 +1,204 @@
+"""
+Summary of Gaussian log files (energy, termination, imaginary frequencies, thermochemistry, steps).
+
+Headless usage (run in the gauprep directory):
+    python -m gauprep.log_summary [--json] [--select "normal termination"] DIR_OR_LOG [DIR_OR_LOG ...]
+"""
+import argparse
+import csv
+import json
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Union, List, Dict, Optional, Callable
+
+from gauprep import file_list
+from gauprep.restart import classify_tail, TAIL_SIZE
+from config import LOG_SUMMARY_FILE, LOG_SUMMARY_PROCESSES
+
+FIELDS = ['file', 'state', 'reason', 'charge', 'multiplicity', 'n_atoms', 'scf_method', 'scf_energy', 'opt_steps',
+          'stationary', 'n_imag', 'lowest_freq', 'zpe_correction', 'h_correction', 'g_correction', 'e_zpe', 'h', 'g']
+
+# files fewer than this are read in the current process
+MIN_FILES_FOR_PROCESSES = 16
+
+# one pass for markers which appear many times
+_MARKER_PATTERN = re.compile(rb'SCF Done:\s+E\((\S+)\)\s+=\s+(-?\d+\.\d+)|Step number\s+(\d+)|(Stationary point found)')
+_CHARGE_PATTERN = re.compile(rb'Charge =\s*(-?\d+)\s+Multiplicity =\s*(\d+)')
+_NATOMS_PATTERN = re.compile(rb'NAtoms=\s*(\d+)')
+_FREQUENCY_PATTERN = re.compile(rb'Frequencies --([^\n]*)')
+_THERMO_PATTERNS = {
+    'zpe_correction': re.compile(rb'Zero-point correction=\s*(-?\d+\.\d+)'),
+    'h_correction': re.compile(rb'Thermal correction to Enthalpy=\s*(-?\d+\.\d+)'),
+    'g_correction': re.compile(rb'Thermal correction to Gibbs Free Energy=\s*(-?\d+\.\d+)'),
+    'e_zpe': re.compile(rb'Sum of electronic and zero-point Energies=\s*(-?\d+\.\d+)'),
+    'h': re.compile(rb'Sum of electronic and thermal Enthalpies=\s*(-?\d+\.\d+)'),
+    'g': re.compile(rb'Sum of electronic and thermal Free Energies=\s*(-?\d+\.\d+)'),
+}
+THERMO_BLOCK_SIZE = 4096
+
+
+def _read_summary(data, summary: Dict):
+    """
+    Fill summary from the log data (mmap or bytes).
+    """
+    summary['state'], summary['reason'] = classify_tail(data[max(0, len(data) - TAIL_SIZE):])
+
+    match = _CHARGE_PATTERN.search(data)
+    if match:
+        summary['charge'] = int(match.group(1))
+        summary['multiplicity'] = int(match.group(2))
+    match = _NATOMS_PATTERN.search(data)
+    if match:
+        summary['n_atoms'] = int(match.group(1))
+
+    opt_steps = 0
+    stationary = 0
+    for match in _MARKER_PATTERN.finditer(data):
+        if match.group(2) is not None:
+            summary['scf_method'] = match.group(1).decode()
+            summary['scf_energy'] = float(match.group(2))
+        elif match.group(3) is not None:
+            opt_steps += 1
+        else:
+            stationary += 1
+    summary['opt_steps'] = opt_steps
+    summary['stationary'] = stationary > 0
+
+    # the last frequency calculation
+    start = data.rfind(b'Harmonic frequencies')
+    if start >= 0:
+        end = data.find(b'Thermochemistry', start)
+        if end < 0:
+            end = len(data)
+        frequencies = []
+        for match in _FREQUENCY_PATTERN.finditer(data, start, end):
+            frequencies.extend(float(x) for x in match.group(1).split())
+        if len(frequencies) > 0:
+            summary['n_imag'] = sum(1 for x in frequencies if x < 0.0)
+            summary['lowest_freq'] = min(frequencies)
+
+    # the last thermochemistry
+    start = data.rfind(b'Zero-point correction=')
+    if start >= 0:
+        block = data[start:start + THERMO_BLOCK_SIZE]
+        for (key, pattern) in _THERMO_PATTERNS.items():
+            match = pattern.search(block)
+            if match:
+                summary[key] = float(match.group(1))
+
+
+def summarize_log(file: Union[str, Path]) -> Dict:
+    """
+    Summary of Gaussian log file. The file is mapped to memory and searched by regular expressions on bytes.
+    Values not found in the log are None. state is 'failed' if the file cannot be read.
+    """
+    summary = {key: None for key in FIELDS}
+    summary['file'] = str(file)
+    try:
+        with Path(file).open(mode='rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                summary['state'], summary['reason'] = 'unfinished', ''
+                return summary
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                _read_summary(data, summary)
+    except (OSError, ValueError) as e:
+        summary['state'], summary['reason'] = 'failed', str(e)
+    return summary
+
+
+def summarize_logs(files: List[Union[str, Path]], processes: Optional[int] = LOG_SUMMARY_PROCESSES,
+                   threads: bool = False) -> List[Dict]:
+    """
+    summarize_log for many files in parallel processes (same order as files).
+    processes: None for the number of CPUs, 1 for the current process only.
+    threads: threads instead of processes, e.g. for the GUI (worker processes would import its entry module again)
+    """
+    if processes == 1 or len(files) < MIN_FILES_FOR_PROCESSES:
+        return [summarize_log(file) for file in files]
+    n_workers = processes or os.cpu_count() or 1
+    if threads:
+        with ThreadPoolExecutor(max_workers=n_workers) as executor:
+            return list(executor.map(summarize_log, [str(file) for file in files]))
+    chunksize = max(1, len(files) // (n_workers * 8))
+    with ProcessPoolExecutor(max_workers=n_workers) as executor:
+        return list(executor.map(summarize_log, [str(file) for file in files], chunksize=chunksize))
+
+
+# selections of logs for batch mode
+LOG_SELECTIONS: Dict[str, Callable[[Dict], bool]] = {
+    'all': lambda s: True,
+    'normal termination': lambda s: s['state'] == 'normal',
+    'normal, no imaginary freq.': lambda s: s['state'] == 'normal' and s['n_imag'] == 0,
+    'normal, 1 imaginary freq.': lambda s: s['state'] == 'normal' and s['n_imag'] == 1,
+    'not normal termination': lambda s: s['state'] != 'normal',
+}
+
+
+def select_logs(summaries: List[Dict], selection: str) -> List[str]:
+    if selection not in LOG_SELECTIONS:
+        raise ValueError('Unknown selection: ' + selection)
+    return [s['file'] for s in summaries if LOG_SELECTIONS[selection](s)]
+
+
+def get_status_string(summary: Dict) -> str:
+    """
+    Short status for the batch file list (e.g. normal, NImag=1).
+    """
+    status = summary['state']
+    if summary['reason']:
+        status += ' (' + summary['reason'] + ')'
+    if summary['n_imag'] is not None:
+        status += ', NImag=' + str(summary['n_imag'])
+    return status
+
+
+def write_csv(summaries: List[Dict], file: Union[str, Path]):
+    with Path(file).open(mode='w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
+
+
+def write_json(summaries: List[Dict], file: Union[str, Path]):
+    with Path(file).open(mode='w', encoding='utf-8') as f:
+        json.dump(summaries, f, indent=1)
+
+
+def collect_log_files(paths: List[Union[str, Path]]) -> List[str]:
+    """
+    Log files in paths (directories are searched recursively).
+    """
+    files = []
+    for path in paths:
+        if Path(path).is_dir():
+            files.extend(file_list.walk_structure_files(path, extensions=['log', 'out']))
+        else:
+            files.append(str(path))
+    return file_list.unique_file_list(files)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Summarize Gaussian log files.')
+    parser.add_argument('paths', nargs='+', help='log files or directories')
+    parser.add_argument('-o', '--output', default=LOG_SUMMARY_FILE, help='output file name without extension')
+    parser.add_argument('--json', action='store_true', help='write json file in addition to csv file')
+    parser.add_argument('--select', default=None, choices=list(LOG_SELECTIONS),
+                        help='print the selected log files (e.g. for batch mode)')
+    parser.add_argument('-j', '--processes', type=int, default=LOG_SUMMARY_PROCESSES,
+                        help='number of processes (default: number of CPUs)')
+    args = parser.parse_args()
+
+    summaries = summarize_logs(collect_log_files(args.paths), processes=args.processes)
+    write_csv(summaries, args.output + '.csv')
+    if args.json:
+        write_json(summaries, args.output + '.json')
+    if args.select is not None:
+        for file in select_logs(summaries, args.select):
+            print(file)
+
+
+if __name__ == '__main__':
+    main()
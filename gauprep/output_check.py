@@ -0,0 +1,97 @@
+import os
+from pathlib import Path
+from typing import Union, List, Dict, Set, Iterable, Callable, Optional
+
+
+def _name_key(name: str) -> str:
+    # case-insensitive on Windows
+    return os.path.normcase(name)
+
+
+def list_existing_names(directories: Iterable[Union[str, Path]]) -> Dict[Path, Set[str]]:
+    """
+    Scan each directory once and return the names of its entries.
+    :return: dict directory > set of (normcased) names
+    """
+    existing = dict()
+    for directory in directories:
+        directory = Path(directory)
+        if directory in existing:
+            continue
+        names = set()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    names.add(_name_key(entry.name))
+        except OSError:
+            pass
+        existing[directory] = names
+    return existing
+
+
+def _get_job_files(file: Path, job_files: Optional[Callable[[Path], List[Path]]]) -> List[Path]:
+    return [file] if job_files is None else [Path(f) for f in job_files(file)]
+
+
+def find_conflicts(output_files: List[Union[str, Path]],
+                   job_files: Optional[Callable[[Path], List[Path]]] = None,
+                   check_existing: bool = True) -> List[int]:
+    """
+    Find output files which already exist or are duplicated in the list (the second and later ones).
+    Each output directory is scanned only once.
+    job_files: files written for an output file (e.g. scan jobs), None for the output file only
+    check_existing: False for duplicates only (e.g. members of an archive)
+    :return: indices of conflicting output files
+    """
+    output_files = [Path(f) for f in output_files]
+    files = [_get_job_files(f, job_files) for f in output_files]
+    if check_existing:
+        existing = list_existing_names(f.parent for job in files for f in job)
+    else:
+        existing = {f.parent: set() for job in files for f in job}
+
+    conflicts = []
+    planned = set()
+    for (i, job) in enumerate(files):
+        keys = [(f.parent, _name_key(f.name)) for f in job]
+        if any(name in existing[directory] or (directory, name) in planned for (directory, name) in keys):
+            conflicts.append(i)
+        planned.update(keys)
+    return conflicts
+
+
+def get_free_name(file: Union[str, Path], taken_names: Set[str],
+                  job_files: Optional[Callable[[Path], List[Path]]] = None) -> Path:
+    """
+    Return file_1.gjf, file_2.gjf, ... which is not in taken_names (normcased names in the same directory).
+    job_files: files written for an output file, all of them should not be in taken_names
+    The returned name (and its job files) is added to taken_names.
+    """
+    file = Path(file)
+    n = 1
+    while True:
+        candidate = file.with_name('{:}_{:}{:}'.format(file.stem, n, file.suffix))
+        names = [_name_key(f.name) for f in _get_job_files(candidate, job_files)]
+        if not any(name in taken_names for name in names):
+            taken_names.update(names)
+            return candidate
+        n += 1
+
+
+def resolve_renames(output_files: List[Union[str, Path]], rename_indices: Iterable[int],
+                    job_files: Optional[Callable[[Path], List[Path]]] = None) -> Dict[int, Path]:
+    """
+    Give new names to the output files of rename_indices, avoiding existing files and the other output files.
+    job_files: files written for an output file (e.g. scan jobs), None for the output file only
+    :return: dict index > renamed output file
+    """
+    output_files = [Path(f) for f in output_files]
+    existing = list_existing_names(f.parent for f in output_files)
+    for file in output_files:
+        existing[file.parent].update(_name_key(f.name) for f in _get_job_files(file, job_files))
+
+    renamed = dict()
+    for i in rename_indices:
+        file = output_files[i]
+        renamed[i] = get_free_name(file, existing[file.parent], job_files)
+    return renamed
@@ -0,0 +1,73 @@
+"""
+Output files under an output root directory, spread over subdirectories (shards), and the manifest of them.
+"""
+import csv
+import hashlib
+import os
+from pathlib import Path
+from typing import Union, Optional
+
+from config import SHARD_SIZE, SHARD_HASH_LENGTH, MANIFEST_FILE
+
+# none: all files in the root, number: SHARD_SIZE jobs per directory (000, 001, ...),
+# hash: prefix of the hash of the file name (SHARD_HASH_LENGTH hex digits), mirror: directories of the sources
+SHARD_POLICIES = ['none', 'number', 'hash', 'mirror']
+
+
+class OutputLayout:
+    """
+    Output files under the root. File names (${NAME}, ${NUMBER} are already replaced) are kept,
+    only the directory is decided by the shard policy.
+    A relative root is relative to source_root (common directory of the sources).
+    """
+    def __init__(self, root: Union[str, Path], policy: str = 'none', source_root: Optional[Union[str, Path]] = None,
+                 shard_size: int = SHARD_SIZE):
+        if policy not in SHARD_POLICIES:
+            raise ValueError('Shard policy should be one of ' + ', '.join(SHARD_POLICIES) + '.')
+        if shard_size < 1:
+            raise ValueError('Shard size should be a positive integer.')
+        self.root = Path(root)
+        if not self.root.is_absolute() and source_root:
+            self.root = Path(source_root) / self.root
+        self.policy = policy
+        self.source_root = source_root  # common directory of the sources (for mirror)
+        self.shard_size = shard_size
+        self.records = []  # (source, number, job file)
+
+    def get_shard(self, source: Union[str, Path], file_name: str, number: int) -> str:
+        """
+        Subdirectory for the file ('' for the root).
+        number: job number (from 1) for the number policy
+        """
+        if self.policy == 'number':
+            return str((number - 1) // self.shard_size).zfill(3)
+        elif self.policy == 'hash':
+            return hashlib.sha1(file_name.encode('utf-8')).hexdigest()[:SHARD_HASH_LENGTH]
+        elif self.policy == 'mirror' and self.source_root:
+            try:
+                shard = os.path.relpath(os.path.dirname(os.path.abspath(str(source))), str(self.source_root))
+            except ValueError:  # on another drive
+                return ''
+            return '' if shard == '.' or shard.startswith('..') else shard
+        return ''
+
+    def get_output_file(self, source: Union[str, Path], file_name: str, number: int) -> Path:
+        return self.root / self.get_shard(source, file_name, number) / file_name
+
+    def add(self, source: Union[str, Path], number: int, job_file: Union[str, Path]):
+        self.records.append((str(source), number, str(job_file)))
+
+    def write_manifest(self) -> Path:
+        """
+        Write the manifest (source, number, job file relative to the root) in the root.
+        :return: manifest file
+        """
+        manifest_file = self.root / MANIFEST_FILE
+        self.root.mkdir(parents=True, exist_ok=True)
+        with manifest_file.open(mode='w', encoding='utf-8', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['source', 'number', 'job'])
+            for (source, number, job_file) in self.records:
+                job = os.path.relpath(job_file, str(self.root)).replace(os.sep, '/')
+                writer.writerow([source, number, job])
+        return manifest_file
@@ -0,0 +1,142 @@
+"""
+Destinations of generated job files: loose files, an archive (tar, tar.gz, zip) or one multi-job file (--Link1--).
+Jobs are written one by one, so that memory use does not depend on the number of jobs.
+"""
+import csv
+import io
+import os
+import tarfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Union, Optional
+
+from gauprep.gaussian_input import GaussianInputData
+
+OUTPUT_SINKS = ['files', 'tar', 'tar.gz', 'zip', 'link1']
+SINK_EXTENSIONS = {'tar': '.tar', 'tar.gz': '.tar.gz', 'zip': '.zip', 'link1': '.gjf'}
+
+
+class FileSink:
+    """
+    Loose files (default). Files are written where they are given.
+    """
+    file: Optional[Path] = None  # archive or multi-job file
+
+    def write_job(self, file: Union[str, Path], gid: GaussianInputData):
+        self.write_job_text(file, gid.get_output_string(file))
+
+    def write_job_text(self, file: Union[str, Path], text: str):
+        """
+        Job file of which contents are already generated (e.g. a chain of jobs).
+        """
+        self.write_text(file, text)
+
+    def write_text(self, file: Union[str, Path], text: str):
+        file = Path(file)
+        file.parent.mkdir(parents=True, exist_ok=True)  # e.g. shards of output root
+        with file.open(mode='w', encoding='utf-8', newline='\n') as f:
+            f.write(text)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class ArchiveSink(FileSink):
+    """
+    Members of a tar, tar.gz or zip archive. Member names are relative to the base directory.
+    Other files (e.g. index of scan jobs) are also written in the archive.
+    """
+    def __init__(self, file: Union[str, Path], base_dir: Union[str, Path], archive_format: str):
+        self.file = Path(file)
+        self.base_dir = Path(base_dir)
+        self.archive_format = archive_format
+        if archive_format == 'zip':
+            self.archive = zipfile.ZipFile(self.file, mode='w', compression=zipfile.ZIP_DEFLATED)
+        elif archive_format in ['tar', 'tar.gz']:
+            self.archive = tarfile.open(self.file, mode='w:gz' if archive_format == 'tar.gz' else 'w')
+        else:
+            raise ValueError('Archive format should be tar, tar.gz or zip.')
+
+    def get_member_name(self, file: Union[str, Path]) -> str:
+        name = os.path.relpath(str(file), str(self.base_dir))
+        if name.startswith('..'):
+            name = Path(file).name
+        return name.replace(os.sep, '/')
+
+    def write_text(self, file: Union[str, Path], text: str):
+        data = text.encode('utf-8')
+        name = self.get_member_name(file)
+        if self.archive_format == 'zip':
+            self.archive.writestr(name, data)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            info.mode = 0o644
+            self.archive.addfile(info, io.BytesIO(data))
+
+    def close(self):
+        self.archive.close()
+
+
+class Link1Sink(FileSink):
+    """
+    Jobs joined by --Link1-- in one file (they run one after another in one Gaussian run).
+    The index file (file_index.csv) has the job number, the name of the job and its first line.
+    Other files (e.g. index of scan jobs) are written as loose files.
+    """
+    def __init__(self, file: Union[str, Path]):
+        self.file = Path(file)
+        self.index_file = self.file.with_name(self.file.stem + '_index.csv')
+        self.n_jobs = 0
+        self.n_lines = 0
+        self.f = self.file.open(mode='w', encoding='utf-8', newline='\n')
+        self.f_index = self.index_file.open(mode='w', encoding='utf-8', newline='')
+        self.index_writer = csv.writer(self.f_index)
+        self.index_writer.writerow(['job', 'file', 'line'])
+
+    def write_job_text(self, file: Union[str, Path], text: str):
+        if self.n_jobs > 0:
+            self.f.write('--Link1--\n')
+            self.n_lines += 1
+        self.n_jobs += 1
+        self.index_writer.writerow([self.n_jobs, Path(file).name, self.n_lines + 1])
+        self.f.write(text)
+        self.n_lines += text.count('\n')
+
+    def close(self):
+        self.f.close()
+        self.f_index.close()
+
+
+def get_sink_file(sink_type: str, directory: Union[str, Path], stem: str) -> Optional[Path]:
+    """
+    Archive or multi-job file of the sink (None for loose files).
+    """
+    if sink_type not in OUTPUT_SINKS:
+        raise ValueError('Output should be one of ' + ', '.join(OUTPUT_SINKS) + '.')
+    if sink_type == 'files':
+        return None
+    return Path(directory) / (stem + SINK_EXTENSIONS[sink_type])
+
+
+def open_output_sink(sink_type: str, directory: Union[str, Path], stem: str) -> FileSink:
+    """
+    sink_type: files, tar, tar.gz, zip or link1
+    directory: where the archive or multi-job file is written (also the base of member names)
+    stem: name of the archive or multi-job file without extension
+    """
+    file = get_sink_file(sink_type, directory, stem)
+    if file is None:
+        return FileSink()
+    file.parent.mkdir(parents=True, exist_ok=True)
+    if sink_type == 'link1':
+        return Link1Sink(file)
+    return ArchiveSink(file, directory, sink_type)
@@ -0,0 +1,85 @@
+import configparser
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Tuple, Optional
+
+from gauprep.cost import count_basis_functions, get_method_scaling
+from gauprep.gaussian_input import GaussianInputData
+from config import NODE_PROFILE_FILE
+
+# memory in words (8 bytes) besides the base memory for cores: factor * N_basis ** power, for the method scaling
+MEMORY_WORDS = {3: (100, 2), 5: (10, 3), 7: (40, 3)}
+# jobs with second derivatives (CPHF) need more memory
+HESSIAN_JOBS = ['FREQ', 'OPT+FREQ', 'TS', 'IRC']
+HESSIAN_MEMORY_FACTOR = 3.0
+# ratio of the node memory which can be used for %mem (Gaussian uses memory more than %mem)
+MAX_MEMORY_RATIO = 0.9
+
+
+@lru_cache(maxsize=None)
+def _read_node_profiles() -> configparser.ConfigParser:
+    profiles = configparser.ConfigParser()
+    profiles.read(Path(__file__).absolute().parent.parent / NODE_PROFILE_FILE)
+    return profiles
+
+
+def get_node_profile_names() -> List[str]:
+    return _read_node_profiles().sections()
+
+
+def _get_node_profile(profile_name: str) -> configparser.SectionProxy:
+    profiles = _read_node_profiles()
+    if profile_name.strip() == '':
+        raise ValueError('Node profile is not selected.')
+    if not profiles.has_section(profile_name):
+        raise ValueError('Node profile: ' + profile_name + ' is not found.')
+    return profiles[profile_name]
+
+
+def get_node_resources(profile_name: str) -> Tuple[int, float]:
+    """
+    :return: (cores, memory in GB) of the node
+    """
+    profile = _get_node_profile(profile_name)
+    return profile.getint('cores'), profile.getfloat('memory')
+
+
+def estimate_resources(n_basis: int, method: str, job_type: str, profile_name: str) -> Tuple[int, int]:
+    """
+    The number of cores and memory (GB) for the job on the node of the profile.
+    :return: (cores, memory in GB)
+    """
+    profile = _get_node_profile(profile_name)
+    max_cores = profile.getint('cores')
+    max_memory = profile.getfloat('memory') * MAX_MEMORY_RATIO
+    min_cores = profile.getint('min_cores', 1)
+
+    cores = math.ceil(n_basis / profile.getfloat('basis_per_core'))
+    cores = math.ceil(cores / min_cores) * min_cores
+    cores = max(min_cores, min(cores, max_cores))
+
+    factor, power = MEMORY_WORDS[get_method_scaling(method)]
+    words = factor * float(n_basis) ** power
+    if job_type.upper() in HESSIAN_JOBS:
+        words *= HESSIAN_MEMORY_FACTOR
+    memory = cores * profile.getfloat('memory_per_core') + words * 8 / 1e9
+    memory = max(1, min(math.ceil(memory), math.floor(max_memory)))
+
+    return cores, memory
+
+
+def assign_resources(gid: GaussianInputData, profile_name: str) -> Optional[Tuple[int, int]]:
+    """
+    Set n_proc and memory of the GaussianInputData from the number of basis functions.
+    When the number of basis functions is not known, the settings are not changed and None is returned.
+    :return: (cores, memory in GB) or None
+    """
+    try:
+        n_basis = count_basis_functions(gid)
+    except KeyError:
+        return None
+    cores, memory = estimate_resources(n_basis, gid.method, gid.job_type, profile_name)
+    gid.n_proc = str(cores)
+    gid.memory = '{:}GB'.format(memory)
+    return cores, memory
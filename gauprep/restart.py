@@ -0,0 +1,117 @@
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Union, List, Tuple, Optional
+
+from gauprep import structure_reader
+from config import FILE_SCAN_THREADS
+
+TAIL_SIZE = 8192
+RESTART_GEOMETRIES = ['last', 'lowest']
+
+_ERROR_LINK_PATTERN = re.compile(rb'Error termination via Lnk1e in \S*?(l\d+)\.exe')
+_ERROR_REQUEST_PATTERN = re.compile(rb'Error termination request processed by link (\d+)')
+
+
+def get_termination_state(file: Union[str, Path], tail_size: int = TAIL_SIZE) -> Tuple[str, str]:
+    """
+    Termination of Gaussian log file from its tail.
+    :return: (state: normal, error or unfinished, reason: e.g. maxcycle, l9999, l502 or '')
+    unfinished is for jobs killed by walltime limit (or still running).
+    """
+    with Path(file).open(mode='rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - tail_size))
+        tail = f.read()
+    return classify_tail(tail)
+
+
+def classify_tail(tail: bytes) -> Tuple[str, str]:
+    """
+    Termination state from the tail bytes of Gaussian log file (see get_termination_state).
+    """
+    # the last job step decides the state (for Link1 jobs)
+    last_normal = tail.rfind(b'Normal termination')
+    last_error = tail.rfind(b'Error termination')
+    if last_error < 0 and last_normal < 0:
+        return 'unfinished', ''
+    if last_normal > last_error:
+        # a Link1 step can be started after the normal termination of the previous step
+        if b'Link1:' in tail[last_normal:]:
+            return 'unfinished', ''
+        return 'normal', ''
+
+    if b'Number of steps exceeded' in tail:
+        return 'error', 'maxcycle'
+    match = _ERROR_LINK_PATTERN.search(tail, last_error)
+    if match:
+        return 'error', match.group(1).decode()
+    match = _ERROR_REQUEST_PATTERN.search(tail, last_error)
+    if match:
+        return 'error', 'l' + match.group(1).decode()
+    return 'error', ''
+
+
+class RestartData:
+    """
+    Termination state and the geometry for restart of a log file.
+    """
+    def __init__(self, file: str, state: str, reason: str, charge: int = 0, multi: int = 1,
+                 structure: Optional[List[str]] = None, energy: Optional[float] = None, message: str = ''):
+        self.file = file
+        self.state = state
+        self.reason = reason
+        self.charge = charge
+        self.multi = multi
+        self.structure = structure
+        self.energy = energy
+        self.message = message
+
+    def get_status(self) -> str:
+        if self.reason != '':
+            return self.state + ' (' + self.reason + ')'
+        return self.state
+
+
+def read_restart_data(file: Union[str, Path], geometry: str = 'last') -> RestartData:
+    """
+    Read the geometry for restart from the log file which is not terminated normally.
+    geometry: last or lowest (the lowest SCF energy)
+    """
+    if geometry not in RESTART_GEOMETRIES:
+        raise ValueError('Geometry for restart should be last or lowest.')
+    file_string = str(file)
+    state, reason = get_termination_state(file)
+    if state == 'normal':
+        return RestartData(file_string, state, reason)
+
+    charge, multi, index = structure_reader.index_log_geometries(file)
+    if len(index) == 0:
+        return RestartData(file_string, state, reason, message='no geometry')
+    offset, energy = index[-1]
+    if geometry == 'lowest':
+        with_energy = [x for x in index if x[1] is not None]
+        if len(with_energy) > 0:
+            offset, energy = min(with_energy, key=lambda x: x[1])
+    structure = structure_reader.read_orientation_block(file, offset)
+    return RestartData(file_string, state, reason, charge, multi, structure, energy)
+
+
+def read_restart_data_list(files: List[Union[str, Path]], geometry: str = 'last',
+                           max_workers: int = FILE_SCAN_THREADS) -> List[RestartData]:
+    """
+    read_restart_data for many log files in parallel (same order as files).
+    Files which cannot be read are returned with state 'failed'.
+    """
+    def read(file):
+        try:
+            return read_restart_data(file, geometry)
+        except (OSError, ValueError, IndexError) as e:
+            return RestartData(str(file), 'failed', '', message=str(e))
+
+    if geometry not in RESTART_GEOMETRIES:
+        raise ValueError('Geometry for restart should be last or lowest.')
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(read, files))
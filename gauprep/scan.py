@@ -0,0 +1,284 @@
+import copy
+import csv
+import io
+import math
+from pathlib import Path
+from typing import Union, List, Tuple, Set, Optional
+
+from gauprep.gaussian_input import GaussianInputData
+from gauprep.output_sink import FileSink
+
+# covalent radii (Angstrom) to find bonded fragments, others: DEFAULT_COVALENT_RADIUS
+COVALENT_RADII = {'H': 0.31, 'He': 0.28, 'Li': 1.28, 'Be': 0.96, 'B': 0.84, 'C': 0.76, 'N': 0.71, 'O': 0.66,
+                  'F': 0.57, 'Ne': 0.58, 'Na': 1.66, 'Mg': 1.41, 'Al': 1.21, 'Si': 1.11, 'P': 1.07, 'S': 1.05,
+                  'Cl': 1.02, 'Ar': 1.06, 'K': 2.03, 'Ca': 1.76, 'Sc': 1.70, 'Ti': 1.60, 'V': 1.53, 'Cr': 1.39,
+                  'Mn': 1.39, 'Fe': 1.32, 'Co': 1.26, 'Ni': 1.24, 'Cu': 1.32, 'Zn': 1.22, 'Ga': 1.22, 'Ge': 1.20,
+                  'As': 1.19, 'Se': 1.20, 'Br': 1.20, 'Kr': 1.16, 'Rb': 2.20, 'Sr': 1.95, 'Y': 1.90, 'Zr': 1.75,
+                  'Nb': 1.64, 'Mo': 1.54, 'Tc': 1.47, 'Ru': 1.46, 'Rh': 1.42, 'Pd': 1.39, 'Ag': 1.45, 'Cd': 1.44,
+                  'In': 1.42, 'Sn': 1.39, 'Sb': 1.39, 'Te': 1.38, 'I': 1.39, 'Xe': 1.40, 'Cs': 2.44, 'Ba': 2.15,
+                  'La': 2.07, 'Hf': 1.75, 'Ta': 1.70, 'W': 1.62, 'Re': 1.51, 'Os': 1.44, 'Ir': 1.41, 'Pt': 1.36,
+                  'Au': 1.36, 'Hg': 1.32, 'Tl': 1.45, 'Pb': 1.46, 'Bi': 1.48}
+DEFAULT_COVALENT_RADIUS = 1.50
+BOND_TOLERANCE = 1.2  # bonded if distance < (r1 + r2) * BOND_TOLERANCE
+
+# number of atoms for each coordinate type in modredundant
+COORDINATE_ATOMS = {'B': 2, 'A': 3, 'D': 4}
+
+
+# vector utilities
+def _sub(a, b):
+    return [a[0] - b[0], a[1] - b[1], a[2] - b[2]]
+
+
+def _add(a, b):
+    return [a[0] + b[0], a[1] + b[1], a[2] + b[2]]
+
+
+def _scale(a, s):
+    return [a[0] * s, a[1] * s, a[2] * s]
+
+
+def _dot(a, b):
+    return a[0] * b[0] + a[1] * b[1] + a[2] * b[2]
+
+
+def _cross(a, b):
+    return [a[1] * b[2] - a[2] * b[1], a[2] * b[0] - a[0] * b[2], a[0] * b[1] - a[1] * b[0]]
+
+
+def _norm(a):
+    return math.sqrt(_dot(a, a))
+
+
+def _rotate(point, origin, axis, angle):
+    """
+    Rotate the point around the axis (unit vector) through origin by angle (radian), Rodrigues' formula
+    """
+    v = _sub(point, origin)
+    cos_t = math.cos(angle)
+    sin_t = math.sin(angle)
+    rotated = _add(_add(_scale(v, cos_t), _scale(_cross(axis, v), sin_t)),
+                   _scale(axis, _dot(axis, v) * (1 - cos_t)))
+    return _add(origin, rotated)
+
+
+def parse_structure(structure: List[str]) -> Tuple[List[str], List[List[float]]]:
+    """
+    Atom symbols and cartesian coordinates (the last 3 columns) from Gaussian's structure data.
+    """
+    symbols = []
+    coordinates = []
+    for line in structure:
+        terms = line.strip().split()
+        if len(terms) == 0:
+            continue
+        try:
+            coordinates.append([float(x) for x in terms[-3:]])
+        except ValueError:
+            raise ValueError('Scan jobs can be made only for cartesian coordinates.')
+        symbols.append(terms[0].split('(')[0].split('-')[0].rstrip('0123456789').capitalize())
+    return symbols, coordinates
+
+
+def format_structure(structure: List[str], coordinates: List[List[float]]) -> List[str]:
+    """
+    Replace coordinates in the structure data keeping the atom labels (and freeze codes).
+    """
+    new_structure = []
+    i = 0
+    for line in structure:
+        terms = line.strip().split()
+        if len(terms) == 0:
+            continue
+        label = ' '.join(terms[:-3])
+        x, y, z = coordinates[i]
+        new_structure.append(label.ljust(10, ' ') + ' ' + '{:.8f}'.format(x).rjust(14, ' ') + ' ' +
+                             '{:.8f}'.format(y).rjust(14, ' ') + ' ' + '{:.8f}'.format(z).rjust(14, ' ') + '\n')
+        i += 1
+    return new_structure
+
+
+def measure(coordinates: List[List[float]], atoms: List[int]) -> float:
+    """
+    Bond length (Angstrom), angle or dihedral angle (degree). atoms: 0-based indices
+    """
+    p = [coordinates[i] for i in atoms]
+    if len(atoms) == 2:
+        return _norm(_sub(p[1], p[0]))
+    elif len(atoms) == 3:
+        v1 = _sub(p[0], p[1])
+        v2 = _sub(p[2], p[1])
+        cos_t = _dot(v1, v2) / (_norm(v1) * _norm(v2))
+        return math.degrees(math.acos(max(-1.0, min(1.0, cos_t))))
+    else:
+        b1 = _sub(p[1], p[0])
+        b2 = _sub(p[2], p[1])
+        b3 = _sub(p[3], p[2])
+        n1 = _cross(b1, b2)
+        n2 = _cross(b2, b3)
+        m = _cross(n1, _scale(b2, 1.0 / _norm(b2)))
+        return math.degrees(math.atan2(_dot(m, n2), _dot(n1, n2)))
+
+
+def _get_bonds(symbols: List[str], coordinates: List[List[float]]) -> List[Set[int]]:
+    neighbors = [set() for _ in symbols]
+    radii = [COVALENT_RADII.get(s, DEFAULT_COVALENT_RADIUS) for s in symbols]
+    for i in range(len(symbols)):
+        for j in range(i + 1, len(symbols)):
+            if _norm(_sub(coordinates[i], coordinates[j])) < (radii[i] + radii[j]) * BOND_TOLERANCE:
+                neighbors[i].add(j)
+                neighbors[j].add(i)
+    return neighbors
+
+
+def get_moving_fragment(symbols: List[str], coordinates: List[List[float]], pivot: int, start: int,
+                        fixed: List[int]) -> Set[int]:
+    """
+    Atoms connected to start without passing the pivot-start bond.
+    If the fragment contains any fixed atom (ring), only the start atom is moved.
+    """
+    neighbors = _get_bonds(symbols, coordinates)
+    fragment = {start}
+    stack = [start]
+    while stack:
+        i = stack.pop()
+        for j in neighbors[i]:
+            if (i == start and j == pivot) or j in fragment:
+                continue
+            fragment.add(j)
+            stack.append(j)
+    if any(f in fragment for f in fixed):
+        return {start}
+    return fragment
+
+
+def set_coordinate(symbols: List[str], coordinates: List[List[float]], atoms: List[int],
+                   value: float) -> List[List[float]]:
+    """
+    Move the fragment on the side of the last atom(s) so that the coordinate becomes value.
+    """
+    new_coordinates = [list(c) for c in coordinates]
+    delta = value - measure(coordinates, atoms)
+    if len(atoms) == 2:
+        i, j = atoms
+        fragment = get_moving_fragment(symbols, coordinates, i, j, [i])
+        direction = _sub(coordinates[j], coordinates[i])
+        shift = _scale(direction, delta / _norm(direction))
+        for f in fragment:
+            new_coordinates[f] = _add(coordinates[f], shift)
+    elif len(atoms) == 3:
+        i, j, k = atoms
+        fragment = get_moving_fragment(symbols, coordinates, j, k, [i, j])
+        axis = _cross(_sub(coordinates[i], coordinates[j]), _sub(coordinates[k], coordinates[j]))
+        if _norm(axis) < 1e-8:
+            raise ValueError('Linear angle cannot be scanned in separate jobs.')
+        axis = _scale(axis, 1.0 / _norm(axis))
+        for f in fragment:
+            new_coordinates[f] = _rotate(coordinates[f], coordinates[j], axis, math.radians(delta))
+    else:
+        i, j, k, l = atoms
+        fragment = get_moving_fragment(symbols, coordinates, j, k, [i, j])
+        if fragment == {k}:
+            fragment = {l}  # ring: rotate only the last atom
+        axis = _sub(coordinates[k], coordinates[j])
+        axis = _scale(axis, 1.0 / _norm(axis))
+        for f in fragment:
+            new_coordinates[f] = _rotate(coordinates[f], coordinates[k], axis, -math.radians(delta))
+    return new_coordinates
+
+
+def parse_scan_line(modredundant: str) -> Tuple[int, str, List[int], int, float]:
+    """
+    Find the scan line (e.g. B 1 2 S 10 0.1) in modredundant input.
+    :return: (line index, coordinate type, 0-based atom indices, number of steps, step size)
+    """
+    scan = None
+    for (n, line) in enumerate(modredundant.splitlines()):
+        terms = line.strip().split()
+        if len(terms) == 0 or terms[0].upper() not in COORDINATE_ATOMS:
+            continue
+        n_atoms = COORDINATE_ATOMS[terms[0].upper()]
+        if len(terms) >= n_atoms + 4 and terms[n_atoms + 1].upper() == 'S':
+            if scan is not None:
+                raise ValueError('Only one scan coordinate can be split into separate jobs.')
+            atoms = [int(x) - 1 for x in terms[1:n_atoms + 1]]
+            scan = (n, terms[0].upper(), atoms, int(terms[n_atoms + 2]), float(terms[n_atoms + 3]))
+    if scan is None:
+        raise ValueError('Scan coordinate (S) is not found in modredundant input.')
+    return scan
+
+
+def has_scan(modredundant: str) -> bool:
+    try:
+        parse_scan_line(modredundant)
+    except ValueError:
+        return False
+    return True
+
+
+def expand_scan(gid: GaussianInputData) -> List[Tuple[float, GaussianInputData]]:
+    """
+    Independent constrained optimization jobs for each scan point (the initial value and n steps).
+    The coordinate is set to each value in the structure and frozen.
+    :return: list of (value, GaussianInputData)
+    """
+    line_index, coordinate_type, atoms, n_steps, step = parse_scan_line(gid.opt_modredundant)
+    symbols, coordinates = parse_structure(gid.structure)
+    if max(atoms) >= len(symbols):
+        raise ValueError('Atom number in modredundant input is out of range.')
+    initial_value = measure(coordinates, atoms)
+
+    lines = gid.opt_modredundant.splitlines()
+    freeze_line = ' '.join([coordinate_type] + [str(a + 1) for a in atoms] + ['F'])
+
+    jobs = []
+    for k in range(n_steps + 1):
+        value = initial_value + step * k
+        if coordinate_type == 'D':
+            value = (value + 180.0) % 360.0 - 180.0
+        new_gid = copy.copy(gid)
+        new_gid.structure = format_structure(gid.structure, set_coordinate(symbols, coordinates, atoms, value))
+        new_gid.opt_modredundant = '\n'.join(lines[:line_index] + [freeze_line] + lines[line_index + 1:])
+        jobs.append((value, new_gid))
+    return jobs
+
+
+def get_scan_job_files(gid: GaussianInputData, file: Union[str, Path]) -> List[Path]:
+    """
+    Files written by output_scan_jobs: scan jobs (file_scan01.gjf, ...) and the index file (file_scan.csv).
+    """
+    file = Path(file)
+    _, _, _, n_steps, _ = parse_scan_line(gid.opt_modredundant)
+    digit = max(2, len(str(n_steps + 1)))
+    files = [file.with_name('{:}_scan{:}{:}'.format(file.stem, str(k + 1).zfill(digit), file.suffix))
+             for k in range(n_steps + 1)]
+    files.append(file.with_name(file.stem + '_scan.csv'))
+    return files
+
+
+def output_scan_jobs(gid: GaussianInputData, file: Union[str, Path],
+                     sink: Optional[FileSink] = None) -> List[Tuple[Path, GaussianInputData]]:
+    """
+    Write scan jobs as file_scan01.gjf, ... and the index file (file_scan.csv: job number, file, value).
+    sink: destination of the files (see output_sink), None for loose files
+    :return: list of (written job file, GaussianInputData)
+    """
+    file = Path(file)
+    if sink is None:
+        sink = FileSink()
+    jobs = expand_scan(gid)
+    files = get_scan_job_files(gid, file)
+    _, coordinate_type, atoms, _, _ = parse_scan_line(gid.opt_modredundant)
+    coordinate = ' '.join([coordinate_type] + [str(a + 1) for a in atoms])
+
+    written = []
+    index = io.StringIO()
+    writer = csv.writer(index)
+    writer.writerow(['job', 'file', 'coordinate', 'value'])
+    for (k, (value, job_gid)) in enumerate(jobs):
+        job_file = files[k]
+        sink.write_job(job_file, job_gid)
+        writer.writerow([k + 1, job_file.name, coordinate, '{:.6f}'.format(value)])
+        written.append((job_file, job_gid))
+    sink.write_text(files[-1], index.getvalue())
+    return written
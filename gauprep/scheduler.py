@@ -0,0 +1,298 @@
+"""
+Bundle generated jobs into node-sized sets and write an array job script.
+
+Headless usage (run in the gauprep directory):
+    python -m gauprep.scheduler gauprep_cost.csv --profile 40cores_160GB --template slurm --dry-run
+"""
+import argparse
+import csv
+import math
+import os
+import re
+from pathlib import Path
+from string import Template
+from typing import Union, List, Dict, Optional, Tuple
+
+from gauprep.resources import get_node_resources
+from config import SCHEDULER_TEMPLATES, BUNDLE_FILE, SCHEDULER_SCRIPT
+
+# Gaussian defaults when %nprocshared/%mem are not given
+DEFAULT_CORES = 1
+DEFAULT_MEMORY = 0.8  # GB
+
+_MEMORY_UNITS = {'KB': 1e-6, 'MB': 1e-3, 'GB': 1.0, 'TB': 1e3, 'KW': 8e-6, 'MW': 8e-3, 'GW': 8.0, 'TW': 8e3}
+
+
+def parse_memory(value: str) -> float:
+    """
+    Gaussian memory string (e.g. 16GB, 800MB, 100MW, words if no unit) to GB
+    """
+    match = re.match(r'^\s*(\d+(?:\.\d*)?)\s*([KMGT][BW])?\s*$', value, re.IGNORECASE)
+    if not match:
+        raise ValueError('Invalid memory: ' + value)
+    if match.group(2) is None:
+        return float(match.group(1)) * 8e-9
+    return float(match.group(1)) * _MEMORY_UNITS[match.group(2).upper()]
+
+
+def read_link0(file: Union[str, Path]) -> Dict[str, str]:
+    """
+    Link0 commands of the first job in the gjf file.
+    :return: dict command (lower case, e.g. %mem) > value
+    """
+    link0 = dict()
+    with Path(file).open(mode='r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line.startswith('#'):
+                break
+            key, _, value = line.partition('=')
+            if key.startswith('%'):
+                link0[key.lower()] = value.strip()
+    return link0
+
+
+def read_link0_resources(file: Union[str, Path]) -> Tuple[int, float]:
+    """
+    %nprocshared and %mem of the first job in the gjf file.
+    :return: (cores, memory in GB)
+    """
+    link0 = read_link0(file)
+    value = link0.get('%nprocshared', link0.get('%nproc'))
+    cores = DEFAULT_CORES if value is None else int(value)
+    memory = DEFAULT_MEMORY if '%mem' not in link0 else parse_memory(link0['%mem'])
+    return cores, memory
+
+
+class Job:
+    """
+    chk, old_chk: absolute paths of %chk and %oldchk (relative to the job file, where the job is run)
+    """
+    def __init__(self, file: Union[str, Path], cores: int, memory: float, cost: float,
+                 chk: Optional[Path] = None, old_chk: Optional[Path] = None):
+        self.file = Path(file)
+        self.cores = cores
+        self.memory = memory
+        self.cost = cost
+        self.chk = chk
+        self.old_chk = old_chk
+
+
+class JobSequence:
+    """
+    Jobs run one after another (a job reads the chk of a previous job by %oldchk, e.g. split IRC or chained frames).
+    """
+    def __init__(self, jobs: List[Job]):
+        self.jobs = jobs
+        self.cores = max(job.cores for job in jobs)
+        self.memory = max(job.memory for job in jobs)
+        self.cost = sum(job.cost for job in jobs)
+
+
+class Bundle:
+    """
+    Job sequences run at the same time on one node.
+    """
+    def __init__(self):
+        self.sequences = []
+        self.cores = 0
+        self.memory = 0.0
+
+    def fits(self, sequence: JobSequence, node_cores: int, node_memory: float) -> bool:
+        return self.cores + sequence.cores <= node_cores and self.memory + sequence.memory <= node_memory
+
+    def add(self, sequence: JobSequence):
+        self.sequences.append(sequence)
+        self.cores += sequence.cores
+        self.memory += sequence.memory
+
+    @property
+    def jobs(self) -> List[Job]:
+        return [job for sequence in self.sequences for job in sequence.jobs]
+
+    @property
+    def cost(self) -> float:
+        # wall time of the bundle is determined by the most expensive sequence
+        return max(sequence.cost for sequence in self.sequences)
+
+
+def _get_chk_path(job_file: Path, chk: Optional[str]) -> Optional[Path]:
+    if chk is None or chk == '':
+        return None
+    return Path(os.path.normpath(str(job_file.parent / chk)))
+
+
+def read_jobs(cost_report_file: Union[str, Path]) -> List[Job]:
+    """
+    Jobs from the csv file of cost report. Cores and memory are read from each gjf file.
+    Relative paths in the csv file are from the directory of the csv file.
+    Jobs of which cost is not estimated are treated as the most expensive ones.
+    """
+    records = []
+    with Path(cost_report_file).open(mode='r', encoding='utf-8', newline='') as f:
+        for row in csv.DictReader(f):
+            cost = float(row['cost']) if row.get('cost') else None
+            records.append((row['output_file'], cost))
+
+    known_costs = [cost for (_, cost) in records if cost is not None]
+    max_cost = max(known_costs) if known_costs else 1.0
+    jobs = []
+    for (file, cost) in records:
+        file = Path(cost_report_file).absolute().parent / file  # relative paths are from the csv file
+        if not file.is_file():
+            raise ValueError('Job file: ' + str(file) + ' is not found. Job scripts are made for jobs written as '
+                             'files (not tar, tar.gz, zip or link1 output).')
+        link0 = read_link0(file)
+        cores, memory = read_link0_resources(file)
+        jobs.append(Job(file, cores, memory, max_cost if cost is None else cost,
+                        chk=_get_chk_path(file, link0.get('%chk')), old_chk=_get_chk_path(file, link0.get('%oldchk'))))
+    return jobs
+
+
+def get_job_sequences(jobs: List[Job]) -> List[JobSequence]:
+    """
+    Jobs which read the chk of another job in the list (%oldchk) are run after it in the same sequence.
+    Other jobs (e.g. %oldchk of a finished calculation) are sequences of one job.
+    """
+    chk_jobs = {job.chk: job for job in jobs if job.chk is not None}
+    parents = dict()  # job file > parent job
+    for job in jobs:
+        parent = chk_jobs.get(job.old_chk)
+        if parent is not None and parent is not job:
+            parents[job.file] = parent
+
+    def get_root(job):
+        visited = set()
+        while job.file in parents and job.file not in visited:  # cyclic %oldchk ends at a visited job
+            visited.add(job.file)
+            job = parents[job.file]
+        return job
+
+    groups = dict()  # root job file > jobs of the group (in the order of the list)
+    for job in jobs:
+        groups.setdefault(get_root(job).file, []).append(job)
+
+    sequences = []
+    for group in groups.values():
+        # parents first
+        depths = dict()
+        for job in group:
+            depth = 0
+            parent = job
+            while parent.file in parents and depth < len(group):
+                parent = parents[parent.file]
+                depth += 1
+            depths[job.file] = depth
+        sequences.append(JobSequence(sorted(group, key=lambda j: (depths[j.file], str(j.file)))))
+    return sequences
+
+
+def pack_jobs(jobs: List[Job], node_cores: int, node_memory: float) -> List[Bundle]:
+    """
+    First-fit decreasing by cost: expensive job sequences are put first, and sequences of similar cost share a node.
+    A sequence larger than the node gets its own bundle. Dependent jobs are in one sequence (see get_job_sequences).
+    """
+    bundles = []
+    for sequence in sorted(get_job_sequences(jobs), key=lambda q: (-q.cost, str(q.jobs[0].file))):
+        for bundle in bundles:
+            if bundle.fits(sequence, node_cores, node_memory):
+                bundle.add(sequence)
+                break
+        else:
+            bundle = Bundle()
+            bundle.add(sequence)
+            bundles.append(bundle)
+    return bundles
+
+
+def get_bundle_string(bundles: List[Bundle], work_dir: Path) -> str:
+    """
+    One line per bundle: job sequences separated by tabs, jobs of a sequence separated by |
+    (files are relative to work_dir and may have spaces).
+    """
+    lines = []
+    for bundle in bundles:
+        sequences = []
+        for sequence in bundle.sequences:
+            files = [Path(os.path.relpath(job.file, work_dir)).as_posix() for job in sequence.jobs]
+            for file in files:
+                if '\t' in file or '|' in file:
+                    raise ValueError('Job file name should not have tab or |: ' + file)
+            sequences.append('|'.join(files))
+        lines.append('\t'.join(sequences))
+    return '\n'.join(lines) + '\n'
+
+
+def get_script_string(template_name: str, n_bundles: int, node_cores: int, node_memory: float,
+                      work_dir: Path, job_name: str = 'gauprep') -> str:
+    if template_name not in SCHEDULER_TEMPLATES:
+        raise ValueError('Scheduler template should be one of ' + ', '.join(SCHEDULER_TEMPLATES))
+    template_file = Path(__file__).absolute().parent.parent / SCHEDULER_TEMPLATES[template_name]
+    template = Template(template_file.read_text(encoding='utf-8'))
+    # safe_substitute leaves shell variables in the template as they are.
+    return template.safe_substitute(JOB_NAME=job_name, N_BUNDLES=n_bundles, CORES=node_cores,
+                                    MEMORY=int(math.floor(node_memory)), WORK_DIR=work_dir.as_posix(),
+                                    BUNDLE_FILE=BUNDLE_FILE)
+
+
+def get_plan_summary(bundles: List[Bundle], node_cores: int, node_memory: float) -> str:
+    n_jobs = sum(len(bundle.jobs) for bundle in bundles)
+    n_dependent = sum(len(sequence.jobs) - 1 for bundle in bundles for sequence in bundle.sequences)
+    lines = ['{:} jobs in {:} bundles (node: {:} cores, {:g} GB)'.format(n_jobs, len(bundles), node_cores,
+                                                                       node_memory)]
+    if n_dependent > 0:
+        lines.append('{:} jobs read the chk of another job (%oldchk) and run after it.'.format(n_dependent))
+    for (i, bundle) in enumerate(bundles):
+        lines.append('{:>4}: {:>3} jobs, {:>3} cores, {:>6.1f} GB, cost {:.3g}'.format(
+            i + 1, len(bundle.jobs), bundle.cores, bundle.memory, bundle.cost))
+    return '\n'.join(lines)
+
+
+def make_job_script(cost_report_file: Union[str, Path], profile_name: str, template_name: str = 'slurm',
+                    work_dir: Optional[Union[str, Path]] = None, dry_run: bool = False) -> str:
+    """
+    Pack jobs in the cost report and write the bundle file and the array job script in work_dir
+    (default: common directory of the jobs). With dry_run, nothing is written.
+    :return: summary of the plan
+    """
+    node_cores, node_memory = get_node_resources(profile_name)
+    jobs = read_jobs(cost_report_file)
+    if len(jobs) == 0:
+        raise ValueError('No job is found in ' + str(cost_report_file))
+    for job in jobs:
+        if job.cores > node_cores or job.memory > node_memory:
+            raise ValueError('Job: ' + str(job.file) + ' does not fit in the node of ' + profile_name)
+    bundles = pack_jobs(jobs, node_cores, node_memory)
+
+    if work_dir is None:
+        work_dir = Path(os.path.commonpath([str(job.file.absolute().parent) for job in jobs]))
+    work_dir = Path(work_dir).absolute()
+    bundle_string = get_bundle_string(bundles, work_dir)
+    script_string = get_script_string(template_name, len(bundles), node_cores, node_memory, work_dir)
+    summary = get_plan_summary(bundles, node_cores, node_memory)
+
+    if dry_run:
+        return '\n'.join([summary, '--- ' + BUNDLE_FILE, bundle_string, '--- ' + SCHEDULER_SCRIPT, script_string])
+
+    with (work_dir / BUNDLE_FILE).open(mode='w', encoding='utf-8', newline='\n') as f:
+        f.write(bundle_string)
+    with (work_dir / SCHEDULER_SCRIPT).open(mode='w', encoding='utf-8', newline='\n') as f:
+        f.write(script_string)
+    return summary + '\nWritten: ' + str(work_dir / BUNDLE_FILE) + ', ' + str(work_dir / SCHEDULER_SCRIPT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bundle generated jobs and write an array job script.')
+    parser.add_argument('cost_report', help='csv file of cost report')
+    parser.add_argument('-p', '--profile', required=True, help='node profile name')
+    parser.add_argument('-t', '--template', default='slurm', choices=sorted(SCHEDULER_TEMPLATES),
+                        help='scheduler template')
+    parser.add_argument('-d', '--work-dir', default=None, help='directory for the script (default: common '
+                                                                 'directory of the jobs)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='print the plan and script without writing')
+    args = parser.parse_args()
+    print(make_job_script(args.cost_report, args.profile, args.template, args.work_dir, args.dry_run))
+
+
+if __name__ == '__main__':
+    main()
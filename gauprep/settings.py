@@ -0,0 +1,105 @@
+import configparser
+from pathlib import Path
+from typing import Union, List, Optional
+
+from gauprep.gaussian_input import GaussianInputData
+from gauprep.resources import assign_resources
+
+# order of the job tabs in the GUI (Job/selection in sset files)
+JOB_TABS = ['SP', 'Opt', 'IRC', 'WFX', 'NBO', 'ANY']
+
+
+def read_settings(file: Union[str, Path]) -> configparser.ConfigParser:
+    file = Path(file)
+    if not file.exists():
+        raise FileNotFoundError('Setting file: ' + str(file) + ' does not exist.')
+    setdata = configparser.ConfigParser()
+    setdata.read(file)
+    return setdata
+
+
+def get_job_type(setdata: configparser.ConfigParser) -> str:
+    """
+    Job type selected in the setting file (same as pushing the output button of the selected job tab).
+    """
+    tab = JOB_TABS[setdata.getint('Job', 'selection')]
+    if tab == 'SP':
+        return 'FREQ' if setdata.getboolean('SP', 'run_freq') else 'SP'
+    elif tab == 'Opt':
+        return setdata.get('Opt', 'job_type')
+    else:
+        return tab
+
+
+def generate_gaussian_input_data(setdata: configparser.ConfigParser, title: str, charge: int, multiplicity: int,
+                                 structure: List[str], job_type: Optional[str] = None,
+                                 auto_resources: bool = True) -> GaussianInputData:
+    """
+    GaussianInputData from sset settings (the GUI also uses this with the settings of the controls).
+    job_type: None for the job type selected in the settings.
+    auto_resources: False for not calling assign_auto_resources (e.g. when the level is changed afterwards)
+    """
+    if job_type is None:
+        job_type = get_job_type(setdata)
+
+    gid = GaussianInputData(charge, multiplicity, structure)
+    gid.job_type = job_type
+    gid.title = title
+
+    gid.memory = setdata.get('Link0', 'memory')
+    gid.n_proc = setdata.get('Link0', 'cpu_cores')
+
+    gid.method = setdata.get('Model', 'method')
+    gid.basis = setdata.get('Model', 'basis')
+    gid.basis_h_ecp = setdata.get('Model', 'basis_h_ecp')
+    gid.ecp_for_3d = setdata.getboolean('Model', 'ecp_for_3d')
+    gid.nosymm = setdata.getboolean('Model', 'nosymm')
+    gid.guess_mix = setdata.getboolean('Model', 'guessmix')
+    gid.first_stable_check = setdata.getboolean('Model', 'stableopt')
+    gid.solvation = setdata.get('Model', 'solvation')
+    gid.solvent = setdata.get('Model', 'solvent')
+    gid.dispersion = setdata.get('Model', 'dispersion')
+    gid.dispersion_external_param = setdata.getboolean('Model', 'dispersion_ext')
+
+    gid.opt_convergence = setdata.get('Opt', 'convergence')
+    gid.opt_maxcycle = setdata.get('Opt', 'maxcycle')
+    gid.opt_maxstep = setdata.get('Opt', 'maxstep')
+    gid.opt_calcfc = setdata.get('Opt', 'calcfc')
+    gid.opt_algorithm = setdata.get('Opt', 'algorithm')
+    gid.opt_modredundant = setdata.get('Opt', 'modredundant')
+    gid.opt_split_scan = setdata.getboolean('Opt', 'split_scan', fallback=False)
+    gid.preopt_method = setdata.get('Opt', 'preopt_method', fallback='none')
+    gid.preopt_basis = setdata.get('Opt', 'preopt_basis', fallback='')
+    gid.preopt_basis_h_ecp = setdata.get('Opt', 'preopt_basis_h_ecp', fallback='')
+    gid.preopt_convergence = setdata.get('Opt', 'preopt_convergence', fallback='loose')
+
+    gid.irc_algorithm = setdata.get('IRC', 'algorithm')
+    gid.irc_direction = setdata.get('IRC', 'direction')
+    gid.irc_maxpoints = setdata.get('IRC', 'maxpoints')
+    gid.irc_stepsize = setdata.get('IRC', 'stepsize')
+    gid.irc_maxcyc = setdata.get('IRC', 'maxcyc')
+    gid.irc_calcfc_predictor = setdata.get('IRC', 'calcfc_predictor')
+    gid.irc_calcfc_corrector = setdata.get('IRC', 'calcfc_corrector')
+    gid.irc_split = setdata.getboolean('IRC', 'split', fallback=False)
+    gid.irc_split_fc = setdata.get('IRC', 'split_fc', fallback='calc')
+
+    gid.nbo_version = setdata.get('NBO', 'version')
+    gid.nbo_save = setdata.getboolean('NBO', 'save_in_chk')
+    gid.nbo_keywords = setdata.get('NBO', 'keywords').split() + setdata.get('NBO', 'additional_keywords').split()
+
+    gid.any_job_input = setdata.get('ANY', 'job_input').strip()
+
+    if auto_resources:
+        assign_auto_resources(setdata, gid)
+
+    return gid
+
+
+def assign_auto_resources(setdata: configparser.ConfigParser, gid: GaussianInputData) -> bool:
+    """
+    %nprocshared and %mem from the number of basis functions when Link0/auto is set (see resources.assign_resources).
+    :return: False if the number of basis functions is not known (n_proc and memory are not changed)
+    """
+    if not setdata.getboolean('Link0', 'auto', fallback=False):
+        return True
+    return assign_resources(gid, setdata.get('Link0', 'node_profile')) is not None
@@ -1,8 +1,16 @@
+import re
 from pathlib import Path
-from typing import Union, Tuple, List
+from typing import Union, Tuple, List, Dict, Iterator, Optional, TextIO
 
 from config import ATOM_LIST
 
+IRC_READ_CHUNK_SIZE = 16 * 1024 * 1024
+_IRC_MARKER_PATTERN = re.compile(rb'orientation:|Point Number:|Multiplicity =|^ #', re.MULTILINE)
+_IRC_POINT_PATTERN = re.compile(rb'Point Number:\s*(\d+)\s+Path Number:\s*(\d+)')
+_GEOMETRY_MARKER_PATTERN = re.compile(rb'orientation:|SCF Done:|Multiplicity =')
+_SCF_ENERGY_PATTERN = re.compile(rb'SCF Done:\s+E\(\S+\)\s+=\s+(-?\d+\.\d+)')
+_GEOM_CHECK_PATTERN = re.compile(r'geom\s*[=(]\s*\(?\s*(?:\w+\s*,\s*)*\w*check', re.IGNORECASE)
+
 
 def read_gaussian_log(file: Union[str, Path]) -> Tuple[int, int, List[str]]:
     """
@@ -31,90 +39,301 @@ def read_gaussian_log(file: Union[str, Path]) -> Tuple[int, int, List[str]]:
         i = num_coord + 5
         while log_data[i] and ('------' not in log_data[i]):  # read until blank line or -----
             atom_coord = log_data[i].strip().split()
-            atom_label = ATOM_LIST[int(atom_coord[1])]
-            coord_x = atom_coord[3]
-            coord_y = atom_coord[4]
-            coord_z = atom_coord[5]
-            structure_data.append(atom_label.ljust(10, ' ') + ' ' + coord_x.rjust(12, ' ') + ' ' +
-                                  coord_y.rjust(12, ' ') + ' ' + coord_z.rjust(12, ' ') + '\n')
+            structure_data.append(_format_orientation_line(atom_coord))
             i = i + 1
 
     return charge, multi, structure_data
 
 
-def read_gaussian_input(file: Union[str, Path]) -> Tuple[int, int, List[str]]:
+def _format_orientation_line(atom_coord: List[str]) -> str:
     """
-    :return: (charge: int, multi: int, structure_data list<str>)
+    Structure data line from terms of orientation block line (center, atomic number, type, x, y, z)
     """
+    atom_label = ATOM_LIST[int(atom_coord[1])]
+    coord_x = atom_coord[3]
+    coord_y = atom_coord[4]
+    coord_z = atom_coord[5]
+    return atom_label.ljust(10, ' ') + ' ' + coord_x.rjust(12, ' ') + ' ' + \
+        coord_y.rjust(12, ' ') + ' ' + coord_z.rjust(12, ' ') + '\n'
 
-    input_data = []  # インプットの全データ
-    structure_data = []  # 電荷・多重度を含む構造データ
 
-    with Path(file).open(mode='r', encoding='utf-8') as f:  # inputファイルを開く
+def iterate_irc_points(file: Union[str, Path],
+                       chunk_size: int = IRC_READ_CHUNK_SIZE) -> Iterator[Tuple[str, int, int, int, List[str]]]:
+    """
+    Read IRC points of Gaussian log file in one pass.
+    The file is read by chunks and only the marker lines (orientation, Point Number, Multiplicity) are parsed,
+    so that memory usage does not depend on the file size.
+    The geometry of a point is the last orientation before its 'Point Number:' line.
+    Path 1 is forward (or reverse for IRC=reverse jobs) and path 2 is reverse. The route is that of the Link1 section
+    which has the points (route sections are printed as ' #' lines until -----).
+    :return: iterator of (direction: forward/reverse, point number, charge, multi, structure_data list<str>)
+    """
+    charge = 0
+    multi = 1
+    route = b''  # route of the current Link1 section
+    orientation = []
+
+    with Path(file).open(mode='rb') as f:
+        buffer = b''
+        eof = False
+        while not eof:
+            chunk = f.read(chunk_size)
+            eof = len(chunk) == 0
+            buffer += chunk
 
-        # 前処理
-        chk_void = False  # 直前の行が空であったかどうか
-        line = f.readline()
-        while line:
-            line = line.lstrip()  # 先頭の空白を削除。空行の場合は改行も消える。
-            if not line:  # 空行だった場合
-                if not chk_void:  # かつ直前は空行じゃない場合
-                    input_data.append("\n")  # 空行とする
-                    chk_void = True
+            pos = 0
+            for match in _IRC_MARKER_PATTERN.finditer(buffer):
+                if match.start() < pos:
+                    continue  # in the block already read
+                line_start = buffer.rfind(b'\n', 0, match.start()) + 1
+                if match.group() == b' #':
+                    # route section: continued lines start with a space, until -----
+                    block_end = buffer.find(b'\n -----', match.end())
+                    if block_end < 0:
+                        if not eof:
+                            pos = line_start
+                            break
+                        block_end = len(buffer)
+                    route = buffer[match.end():block_end].replace(b'\r', b'').replace(b'\n ', b'').lower()
+                    pos = block_end
+                elif match.group() == b'orientation:':
+                    # header, -----, 2 title lines, -----, coordinates, -----
+                    block_end = match.end()
+                    for _ in range(3):
+                        block_end = buffer.find(b'-----', block_end)
+                        if block_end < 0:
+                            break
+                        block_end = buffer.find(b'\n', block_end)
+                        if block_end < 0:
+                            break
+                    if block_end < 0:
+                        if not eof:
+                            pos = line_start  # incomplete block: read more
+                            break
+                        continue
+                    lines = buffer[match.end():block_end].split(b'\n')
+                    orientation = [line for line in lines[5:-1] if line.strip() != b'']
+                    pos = block_end
                 else:
-                    pass  # 直前も空行の場合は無視する
-            else:  # 空行じゃない場合
-                if line[0] != "!":  # コメント行は無視
-                    chk_void = False
-                    input_data.append(line)
-            line = f.readline()
-
-        # 構造データの抜き出し
-        state = 0
-        for data_line in input_data:
-            if state == 0:  # ルートセクション前
-                if data_line[0] == '#':
-                    state = 1
-            elif state == 1:  # ルートセクション中
-                if data_line == '\n':  # 空行が見つかったらstate=2（タイトルセクション）
-                    state = 2
-            elif state == 2:  # タイトルセクション中
-                if data_line == '\n':  # 空行が見つかったらstate=3（電荷・多重度と構造）
-                    state = 3
+                    line_end = buffer.find(b'\n', match.end())
+                    if line_end < 0:
+                        if not eof:
+                            pos = line_start
+                            break
+                        line_end = len(buffer)
+                    line = buffer[line_start:line_end]
+                    pos = line_end
+                    if match.group() == b'Multiplicity =':
+                        terms = line.split()
+                        charge = int(terms[2])
+                        multi = int(terms[5])
+                    else:
+                        point = _IRC_POINT_PATTERN.search(line)
+                        if point is None or len(orientation) == 0:
+                            continue
+                        if int(point.group(2)) == 1 and b'reverse' not in route:
+                            direction = 'forward'
+                        else:
+                            direction = 'reverse'
+                        structure_data = [_format_orientation_line(x.decode().split()) for x in orientation]
+                        yield direction, int(point.group(1)), charge, multi, structure_data
             else:
-                if data_line != '\n':
-                    if data_line[0:2].upper() != 'LP':  # ローンペアは無視
-                        structure_data.append(data_line)
-                else:
-                    break  # 構造のあとに空行がきたら終わり
-        # 構造データの抜き出しここまで-------------------------------------------
+                # all markers are processed: keep only the last (possibly incomplete) line
+                pos = max(pos, buffer.rfind(b'\n') + 1)
+            buffer = buffer[pos:]
 
-    charge, multi = [int(x.strip()) for x in structure_data[0].split()]
 
-    return charge, multi, structure_data[1:]
+def iterate_marker_lines(file: Union[str, Path], pattern: 're.Pattern',
+                         chunk_size: int = IRC_READ_CHUNK_SIZE) -> Iterator[Tuple[int, bytes]]:
+    """
+    Find lines including pattern by reading the file in chunks.
+    :return: iterator of (offset of the line start, line bytes without newline)
+    """
+    offset = 0  # file offset of the buffer start
+    with Path(file).open(mode='rb') as f:
+        buffer = b''
+        while True:
+            chunk = f.read(chunk_size)
+            eof = len(chunk) == 0
+            buffer += chunk
+            pos = 0
+            for match in pattern.finditer(buffer):
+                if match.start() < pos:
+                    continue  # another marker in the same line
+                line_start = buffer.rfind(b'\n', 0, match.start()) + 1
+                line_end = buffer.find(b'\n', match.end())
+                if line_end < 0:
+                    if not eof:
+                        break  # incomplete line: read more
+                    line_end = len(buffer)
+                yield offset + line_start, buffer[line_start:line_end].rstrip(b'\r')
+                pos = line_end
+            if eof:
+                break
+            # keep the last incomplete line (a marker may be split between chunks)
+            keep = buffer.rfind(b'\n') + 1
+            offset += keep
+            buffer = buffer[keep:]
 
 
-def read_xyz(file: Union[str, Path]) -> List[List[str]]:
+def index_log_geometries(file: Union[str, Path]) -> Tuple[int, int, List[Tuple[int, Optional[float]]]]:
     """
-    return list of structure data
+    Offsets of orientation blocks in Gaussian log file and the SCF energy of each geometry.
+    :return: (charge, multi, list of (offset, energy or None))
+    """
+    charge = 0
+    multi = 1
+    index = []
+    for (offset, line) in iterate_marker_lines(file, _GEOMETRY_MARKER_PATTERN):
+        if b'orientation:' in line:
+            index.append((offset, None))
+        elif b'SCF Done:' in line:
+            if len(index) > 0 and index[-1][1] is None:
+                energy = _SCF_ENERGY_PATTERN.search(line)
+                if energy:
+                    index[-1] = (index[-1][0], float(energy.group(1)))
+        else:
+            terms = line.split()
+            charge = int(terms[2])
+            multi = int(terms[5])
+    return charge, multi, index
+
+
+def read_orientation_block(file: Union[str, Path], offset: int) -> List[str]:
+    """
+    Read the orientation block (Input orientation: or Standard orientation:) at offset of Gaussian log file.
+    :return: structure_data list<str>
+    """
+    structure_data = []
+    with Path(file).open(mode='rb') as f:
+        f.seek(offset)
+        for _ in range(5):  # header, -----, 2 title lines, -----
+            f.readline()
+        for line in f:
+            if b'------' in line or line.strip() == b'':
+                break
+            structure_data.append(_format_orientation_line(line.decode().split()))
+    return structure_data
+
+
+def read_irc_endpoints(file: Union[str, Path]) -> Dict[str, Tuple[int, int, List[str]]]:
+    """
+    Last points of each direction of IRC log file.
+    :return: dict of direction (forward/reverse) > (charge: int, multi: int, structure_data list<str>)
+    """
+    endpoints = dict()
+    last_point_numbers = dict()
+    for (direction, point_number, charge, multi, structure_data) in iterate_irc_points(file):
+        if point_number >= last_point_numbers.get(direction, 0):
+            last_point_numbers[direction] = point_number
+            endpoints[direction] = (charge, multi, structure_data)
+    return endpoints
+
+
+def _iterate_input_lines(f: TextIO) -> Iterator[str]:
     """
+    Lines of Gaussian input file without leading spaces and comment lines (!).
+    Blank lines are returned as '\n', and consecutive blank lines as one.
+    """
+    chk_void = False  # 直前の行が空であったかどうか
+    for line in f:
+        line = line.lstrip()  # 先頭の空白を削除。空行の場合は改行も消える。
+        if not line:  # 空行だった場合
+            if not chk_void:  # かつ直前は空行じゃない場合
+                chk_void = True
+                yield '\n'
+        elif line[0] != '!':  # コメント行は無視
+            chk_void = False
+            yield line
+
 
+def iterate_gaussian_input_jobs(file: Union[str, Path]) -> Iterator[Tuple[int, int, List[str]]]:
+    """
+    Geometries of the job sections (separated by --Link1--) of Gaussian input file.
+    The file is read only until the geometry of the section is needed, so that Gen/ECP or modredundant blocks
+    after the last geometry are not read. Sections which read the geometry from the checkpoint
+    (geom=check, geom=allcheck) are skipped.
+    :return: iterator of (charge: int, multi: int, structure_data list<str>)
+    """
+    def get_job():
+        charge, multi = [int(x.strip()) for x in structure_data[0].split()]
+        return charge, multi, structure_data[1:]
+
+    with Path(file).open(mode='r', encoding='utf-8') as f:
+        state = 0  # 0: ルートセクション前, 1: ルート, 2: タイトル, 3: 電荷・多重度と構造, 4: 次のLink1まで読み飛ばし
+        route = ''
+        structure_data = []  # 電荷・多重度を含む構造データ
+        for line in _iterate_input_lines(f):
+            if line[0:9].lower() == '--link1--':
+                if state == 3 and len(structure_data) > 0:
+                    yield get_job()
+                state = 0
+                continue
+            if state == 0:
+                if line[0] == '#':
+                    state = 1
+                    route = line
+            elif state == 1:
+                if line == '\n':  # 空行が見つかったらタイトルセクション (構造をチェックポイントから読む場合は飛ばす)
+                    state = 4 if _GEOM_CHECK_PATTERN.search(route) else 2
+                else:
+                    route += line
+            elif state == 2:
+                if line == '\n':  # 空行が見つかったら電荷・多重度と構造
+                    state = 3
+                    structure_data = []
+            elif state == 3:
+                if line != '\n':
+                    if line[0:2].upper() != 'LP':  # ローンペアは無視
+                        structure_data.append(line)
+                else:  # 構造のあとに空行がきたら終わり
+                    yield get_job()
+                    state = 4
+        if state == 3 and len(structure_data) > 0:
+            yield get_job()
+
+
+def read_gaussian_input(file: Union[str, Path]) -> Tuple[int, int, List[str]]:
+    """
+    Geometry of the first job section which has it (reading stops at the end of the geometry).
+    :return: (charge: int, multi: int, structure_data list<str>)
+    """
+    jobs = iterate_gaussian_input_jobs(file)
+    try:
+        return next(jobs)
+    except StopIteration:
+        raise ValueError('Geometry is not found: ' + str(file))
+    finally:
+        jobs.close()
+
+
+def iterate_xyz_frames(file: Union[str, Path]) -> Iterator[Tuple[str, List[str]]]:
+    """
+    Frames of (multi) xyz file one by one.
+    :return: iterator of (comment line, structure data)
+    """
     with Path(file).open(mode='r') as f:
-        xyz_data = f.readlines()
+        for line in f:
+            if line.strip() == '':
+                continue
+            num_atoms = int(line.strip())
+            comment = f.readline()
+            structure_data = [f.readline() for _ in range(num_atoms)]
+            yield comment, [x for x in structure_data if x != '']
+
 
-    structure_data_list = []
+def read_xyz_frames(file: Union[str, Path]) -> List[Tuple[str, List[str]]]:
+    """
+    return list of (comment line, structure data)
+    """
+    return list(iterate_xyz_frames(file))
 
-    i = 0
-    while i < len(xyz_data):
-        if xyz_data[i].strip() == '':
-            i += 1
-            continue
-        num_atoms = int(xyz_data[i].strip())
-        structure_data = xyz_data[i+2:i+num_atoms+2]
-        structure_data_list.append(structure_data)
-        i += num_atoms + 2
 
-    return structure_data_list
+def read_xyz(file: Union[str, Path]) -> List[List[str]]:
+    """
+    return list of structure data
+    """
+    return [structure_data for (_, structure_data) in read_xyz_frames(file)]
 
 
 def read_single_file(file: Union[str, Path]) -> Tuple[int, int, List[str]]:
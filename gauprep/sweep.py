@@ -0,0 +1,164 @@
+"""
+Sweep of levels of theory: jobs for all combinations of method, basis sets, solvation and dispersion.
+
+The values are given in the [Sweep] section of a setting file (sset), separated by spaces or lines.
+* is all choices of the control (settings/*.dat), and other values should be one of the choices.
+Items not given are the same as the settings.
+    [Sweep]
+    method = B3LYP M062X wB97XD
+    basis = def2SVP def2TZVP
+    dispersion = none GD3BJ
+
+Headless usage (run in the gauprep directory):
+    python -m gauprep.sweep SETTINGS.sset STRUCTURE_FILE [STRUCTURE_FILE ...]
+"""
+import argparse
+import configparser
+import copy
+import csv
+import io
+import itertools
+import re
+from pathlib import Path
+from typing import Union, List, Dict, Tuple
+
+from gauprep import structure_reader, settings
+from gauprep.gaussian_input import GaussianInputData
+from gauprep.job_writer import write_jobs
+from gauprep.output_sink import FileSink
+from config import METHOD_FILE, BASIS_FILE, BASIS_H_ECP_file, SOLVENT_FILE, SWEEP_INDEX_FILE
+
+SWEEP_SECTION = 'Sweep'
+# attributes of GaussianInputData in the order of the combination labels
+SWEEP_KEYS = ['method', 'basis', 'basis_h_ecp', 'solvation', 'solvent', 'dispersion']
+SOLVATIONS = ['none', 'PCM', 'CPCM', 'SMD']
+DISPERSIONS = ['none', 'GD3', 'GD3BJ', 'D2']
+_CHOICE_FILES = {'method': METHOD_FILE, 'basis': BASIS_FILE, 'basis_h_ecp': BASIS_H_ECP_file, 'solvent': SOLVENT_FILE}
+
+# a combination: ((key, value), ...) in the order of SWEEP_KEYS
+Combination = Tuple[Tuple[str, str], ...]
+
+
+def read_choices(key: str) -> List[str]:
+    """
+    All choices of the control for the key (same as the GUI).
+    """
+    if key == 'solvation':
+        return list(SOLVATIONS)
+    elif key == 'dispersion':
+        return list(DISPERSIONS)
+    choices = []
+    with (Path(__file__).absolute().parent.parent / _CHOICE_FILES[key]).open(mode='r') as f:
+        for line in f:
+            if line.strip() == '':
+                break
+            choices.append(line.strip())
+    return choices
+
+
+def read_sweep(setdata: configparser.ConfigParser) -> Dict[str, List[str]]:
+    """
+    Values of the [Sweep] section (key > list of values, keys not given are not included).
+    Values are checked against the choices of the control (case-insensitive, the spelling of the choice is used).
+    """
+    if not setdata.has_section(SWEEP_SECTION):
+        raise ValueError('The setting file does not have [' + SWEEP_SECTION + '] section.')
+    sweep = dict()
+    for (key, value) in setdata.items(SWEEP_SECTION):
+        if key not in SWEEP_KEYS:
+            continue  # e.g. DEFAULT section
+        choices = read_choices(key)
+        spellings = {choice.lower(): choice for choice in choices}
+        values = []
+        for term in value.split():
+            if term == '*':
+                values.extend(choices)
+            elif term.lower() in spellings:
+                values.append(spellings[term.lower()])
+            else:
+                raise ValueError('Unknown value in [' + SWEEP_SECTION + '] section: ' + key + ' = ' + term +
+                                 ' (not in the choices of ' + key + ')')
+        if len(values) == 0:
+            continue
+        sweep[key] = list(dict.fromkeys(values))  # remove duplicates
+    if len(sweep) == 0:
+        raise ValueError('No value is given in [' + SWEEP_SECTION + '] section. Keys: ' + ', '.join(SWEEP_KEYS))
+    return sweep
+
+
+def get_combinations(sweep: Dict[str, List[str]]) -> List[Combination]:
+    """
+    All combinations (cross product) of the sweep values.
+    """
+    keys = [key for key in SWEEP_KEYS if key in sweep]
+    return [tuple(zip(keys, values)) for values in itertools.product(*(sweep[key] for key in keys))]
+
+
+def get_combination_label(combination: Combination) -> str:
+    """
+    Label for file names, e.g. B3LYP_6-31Gd-p_GD3BJ for B3LYP, 6-31G(d,p), GD3BJ.
+    """
+    return '_'.join(re.sub(r'[^\w+\-]', '', value.replace(',', '-')) for (_, value) in combination)
+
+
+def get_sweep_output_file(file: Union[str, Path], combination: Combination) -> Path:
+    file = Path(file)
+    return file.with_name(file.stem + '_' + get_combination_label(combination) + file.suffix)
+
+
+def apply_combination(gid: GaussianInputData, combination: Combination) -> GaussianInputData:
+    """
+    Copy of gid at the level of the combination (the structure is shared).
+    """
+    gid = copy.copy(gid)
+    for (key, value) in combination:
+        setattr(gid, key, value)
+    return gid
+
+
+def get_index_string(combinations: List[Combination]) -> str:
+    """
+    Index of the labels and values of the combinations (csv).
+    """
+    keys = [key for (key, _) in combinations[0]] if len(combinations) > 0 else []
+    f = io.StringIO()
+    writer = csv.writer(f)
+    writer.writerow(['label'] + keys)
+    for combination in combinations:
+        writer.writerow([get_combination_label(combination)] + [value for (_, value) in combination])
+    return f.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate Gaussian jobs for all combinations of [Sweep] section.')
+    parser.add_argument('settings', help='sset file with [Sweep] section')
+    parser.add_argument('files', nargs='+', help='structure files (jobs are written next to them)')
+    args = parser.parse_args()
+
+    setdata = settings.read_settings(args.settings)
+    combinations = get_combinations(read_sweep(setdata))
+    sink = FileSink()
+    count = 0
+    for file in args.files:
+        file = Path(file)
+        # the structure is read once for all combinations
+        charge, mult, structure = structure_reader.read_single_file(file)
+        gid = settings.generate_gaussian_input_data(setdata, title=file.stem, charge=charge, multiplicity=mult,
+                                                    structure=structure, auto_resources=False)
+        for combination in combinations:
+            output_file = get_sweep_output_file(file.with_suffix('.gjf'), combination)
+            try:
+                combined_gid = apply_combination(gid, combination)
+                settings.assign_auto_resources(setdata, combined_gid)  # for the level of the combination
+                written = write_jobs(combined_gid, output_file, sink)
+            except ValueError as e:
+                print('Failed: ' + output_file.name + ' ' + str(e))
+                continue
+            count += len(written)
+    if len(args.files) > 0:
+        sink.write_text(Path(args.files[0]).parent / SWEEP_INDEX_FILE, get_index_string(combinations))
+    print('Total ' + str(count) + ' files were generated.')
+
+
+if __name__ == '__main__':
+    main()
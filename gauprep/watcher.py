@@ -0,0 +1,228 @@
+"""
+Watch folders and generate Gaussian input files for new structure files.
+
+Headless usage (run in the gauprep directory):
+    python -m gauprep.watcher --settings settings/default.sset DIR [DIR ...]
+"""
+import argparse
+import json
+import os
+import time
+from pathlib import Path
+from typing import Union, List, Optional, Callable, Iterator, Tuple
+
+from gauprep import structure_reader, file_list
+from gauprep.job_writer import write_jobs
+from gauprep.settings import read_settings, generate_gaussian_input_data
+from config import WATCH_FILE_EXTENSIONS, WATCH_INTERVAL, WATCH_SETTLE_TIME, WATCH_STATE_FILE
+
+STATE_VERSION = 1
+# directories changed within this time (s) are listed again, for file systems with coarse mtime
+DIRECTORY_MTIME_MARGIN = 2.0
+
+
+def is_log_terminated(file: Union[str, Path], tail_size: int = 4096) -> Optional[bool]:
+    """
+    Check the tail of Gaussian log file.
+    :return: True for normal termination, False for error termination, None for running (or not finished)
+    """
+    with Path(file).open(mode='rb') as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        f.seek(max(0, size - tail_size))
+        tail = f.read()
+    if b'Normal termination' in tail:
+        return True
+    if b'Error termination' in tail:
+        return False
+    return None
+
+
+class FolderWatcher:
+    """
+    Poll directories and generate gjf files with a sset profile for structure files which are completely written.
+    A file is processed when its size and mtime have not changed for settle_time seconds
+    (and for log files, when the job is terminated normally).
+    Processed files are recorded in the state file with their size and mtime, so that they are not processed again.
+    A directory is listed again only when its mtime is changed (a file is added, removed or renamed),
+    and processed files in unchanged directories are not checked again.
+    """
+    def __init__(self, directories: List[Union[str, Path]], settings_file: Union[str, Path],
+                 state_file: Optional[Union[str, Path]] = None,
+                 prefix: str = '', suffix: str = '', title: str = '${FILENAME} ${GEN}',
+                 extensions: Optional[List[str]] = None, settle_time: float = WATCH_SETTLE_TIME,
+                 logger: Callable[[str], None] = print):
+
+        self.directories = [Path(d).absolute() for d in directories]
+        if len(self.directories) == 0:
+            raise ValueError('No directory to watch is given.')
+        for directory in self.directories:
+            if not directory.is_dir():
+                raise ValueError('Directory: ' + str(directory) + ' does not exist.')
+        self.settings_file = Path(settings_file).absolute()
+        self.setdata = read_settings(self.settings_file)
+        if state_file is None:
+            state_file = self.directories[0] / WATCH_STATE_FILE
+        self.state_file = Path(state_file).absolute()
+        self.prefix = prefix.strip()
+        self.suffix = suffix.strip()
+        self.title = title
+        self.extensions = WATCH_FILE_EXTENSIONS if extensions is None else extensions
+        self.settle_time = settle_time
+        self.logger = logger
+
+        self.state = dict()  # file > [size, mtime_ns, status]
+        self.pending = dict()  # file > ((size, mtime_ns), time when the signature was first seen)
+        self.directory_cache = dict()  # directory > (mtime_ns, structure files, sub directories)
+        self.load_state()
+
+    def load_state(self):
+        if not self.state_file.exists():
+            return
+        try:
+            with self.state_file.open(mode='r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            self.logger('State file: ' + str(self.state_file) + ' is broken and ignored.')
+            return
+        if data.get('version') == STATE_VERSION:
+            self.state = data.get('files', dict())
+
+    def save_state(self):
+        # write to temporary file and replace, so that the state file is not broken when killed.
+        temp_file = self.state_file.with_name(self.state_file.name + '.tmp')
+        with temp_file.open(mode='w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'settings': str(self.settings_file), 'files': self.state}, f)
+        os.replace(temp_file, self.state_file)
+
+    def get_output_file(self, file: Path) -> Path:
+        name = file.stem
+        output_file_name = (self.prefix + name + self.suffix + '.gjf').replace('${NAME}', name)
+        return file.parent / output_file_name
+
+    def walk_files(self, directory: Path, now: float) -> Iterator[Tuple[str, bool]]:
+        """
+        Structure files under the directory (recursive) from the cache of directory listings.
+        :return: iterator of (file, True if its directory is listed again)
+        """
+        stack = [str(directory)]
+        while stack:
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                self.directory_cache.pop(current, None)
+                continue
+            cached = self.directory_cache.get(current)
+            changed = cached is None or cached[0] != mtime_ns or now - mtime_ns * 1e-9 < DIRECTORY_MTIME_MARGIN
+            if changed:
+                files, sub_dirs = file_list.scan_structure_directory(current, extensions=self.extensions)
+                cached = (mtime_ns, files, sub_dirs)
+                self.directory_cache[current] = cached
+            for file_string in cached[1]:
+                yield file_string, changed
+            stack.extend(reversed(cached[2]))
+
+    def poll(self) -> List[Path]:
+        """
+        Check the directories once.
+        :return: generated files
+        """
+        now = time.time()
+        generated = []
+        changed = False
+
+        for directory in self.directories:
+            for (file_string, directory_changed) in self.walk_files(directory, now):
+                if not directory_changed and file_string in self.state and file_string not in self.pending:
+                    continue  # already processed
+                try:
+                    stat = os.stat(file_string)
+                except OSError:
+                    continue
+                signature = [stat.st_size, stat.st_mtime_ns]
+
+                if file_string in self.state and self.state[file_string][:2] == signature:
+                    continue  # already processed
+
+                # debounce: wait until the file is not changed for settle_time
+                if file_string not in self.pending or self.pending[file_string][0] != signature:
+                    self.pending[file_string] = (signature, now)
+                    continue
+                if now - self.pending[file_string][1] < self.settle_time:
+                    continue
+
+                status = self.process(Path(file_string))
+                if status is None:
+                    continue  # not ready (running log file)
+                del self.pending[file_string]
+                self.state[file_string] = signature + [status]
+                changed = True
+                if status == 'done':
+                    generated.append(self.get_output_file(Path(file_string)))
+
+        if changed:
+            self.save_state()
+        return generated
+
+    def process(self, file: Path) -> Optional[str]:
+        """
+        :return: status string, or None if the file is not ready
+        """
+        if file.suffix.lstrip('.').lower() in ['log', 'out']:
+            terminated = is_log_terminated(file)
+            if terminated is None:
+                return None
+            if not terminated:
+                self.logger('Skipped (error termination): ' + str(file))
+                return 'error termination'
+
+        output_file = self.get_output_file(file)
+        if output_file.exists():
+            self.logger('Skipped (output file exists): ' + str(output_file))
+            return 'exists'
+
+        try:
+            charge, mult, structure = structure_reader.read_single_file(file)
+            title = self.title.replace('${NAME}', file.stem)
+            gid = generate_gaussian_input_data(self.setdata, title=title, charge=charge, multiplicity=mult,
+                                               structure=structure)
+            write_jobs(gid, output_file)
+        except Exception as e:
+            self.logger('Failed: ' + str(file) + ' ' + str(e))
+            return 'failed'
+
+        self.logger('Generated file: ' + str(output_file))
+        return 'done'
+
+    def run(self, interval: float = WATCH_INTERVAL):
+        self.logger('Watching: ' + ', '.join(str(d) for d in self.directories))
+        try:
+            while True:
+                self.poll()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            self.logger('Stopped.')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Watch folders and generate Gaussian input files.')
+    parser.add_argument('directories', nargs='+', help='directories to watch')
+    parser.add_argument('-s', '--settings', required=True, help='sset file for the jobs')
+    parser.add_argument('--state', default=None, help='state file (default: ' + WATCH_STATE_FILE +
+                                                      ' in the first directory)')
+    parser.add_argument('--prefix', default='', help='prefix of output file names')
+    parser.add_argument('--suffix', default='', help='suffix of output file names')
+    parser.add_argument('--title', default='${FILENAME} ${GEN}', help='title line')
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL, help='polling interval (s)')
+    parser.add_argument('--settle', type=float, default=WATCH_SETTLE_TIME,
+                        help='time (s) for which a file should be unchanged before processing')
+    args = parser.parse_args()
+
+    watcher = FolderWatcher(args.directories, args.settings, state_file=args.state, prefix=args.prefix,
+                            suffix=args.suffix, title=args.title, settle_time=args.settle)
+    watcher.run(interval=args.interval)
+
+
+if __name__ == '__main__':
+    main()
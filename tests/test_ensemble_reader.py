@@ -0,0 +1,35 @@
+from pathlib import Path
+
+import pytest
+
+from gauprep import ensemble_reader, conformer
+
+DATA_DIR = Path(__file__).absolute().parent / 'data'
+
+
+def test_sdf_energy_in_kcal_is_converted_to_hartree():
+    # RDKit ensemble of butane (anti, gauche+, gauche-, syn) with MMFF94 energies in kcal/mol
+    records = list(ensemble_reader.iterate_sdf_records(DATA_DIR / 'butane_conformers.sdf'))
+    energies = [conformer.parse_xyz_comment_energy(comment) for (comment, _, _, _) in records]
+    relative = [(e - energies[0]) * conformer.HARTREE_TO_KCAL for e in energies]
+    assert relative == pytest.approx([0.0, 0.8727, 0.8727, 5.2668], abs=1e-4)
+
+
+def test_sdf_energy_window_pruning():
+    pytest.importorskip('numpy')
+    records = list(ensemble_reader.iterate_sdf_records(DATA_DIR / 'butane_conformers.sdf'))
+    structures = [structure for (_, _, _, structure) in records]
+    energies = [conformer.parse_xyz_comment_energy(comment) for (comment, _, _, _) in records]
+    # syn butane is 5.3 kcal/mol above anti
+    assert conformer.prune_conformers(structures, energies, energy_window=2.0, ignore_hydrogen=False) == [0, 1, 2]
+
+
+@pytest.mark.parametrize('item_name, unit', [('>  <Energy (kcal/mol)>  (1)', 'kcal/mol'),
+                                             ('>  <energy>', 'kcal/mol'),
+                                             ('>  <E_hartree>', 'hartree'),
+                                             ('>  <Energy (a.u.)>', 'hartree'),
+                                             ('>  <r_mmod_Potential_Energy-MMFF94s>', 'kJ/mol'),
+                                             ('>  <energy_kJ/mol>', 'kJ/mol'),
+                                             ('>  <Energy (eV)>', 'eV')])
+def test_sdf_energy_unit(item_name, unit):
+    assert ensemble_reader.get_sdf_energy_unit(item_name)[0] == unit
@@ -0,0 +1,19 @@
+from config import STRUCTURE_FILE_EXTENSIONS
+from gauprep import file_list
+
+
+def test_expand_directory_with_sset(tmp_path):
+    (tmp_path / 'sub').mkdir()
+    for name in ['a.xyz', 'sub/b.log', 'sub/opt.sset', 'notes.txt']:
+        (tmp_path / name).write_text('')
+
+    # structure files only by default
+    expanded = file_list.expand_file_list([tmp_path])
+    assert expanded == [str(tmp_path / 'a.xyz'), str(tmp_path / 'sub' / 'b.log')]
+
+    # setting files in dropped directories (batch mode)
+    expanded = file_list.expand_file_list([tmp_path], extensions=STRUCTURE_FILE_EXTENSIONS + ['sset'])
+    assert expanded == [str(tmp_path / 'a.xyz'), str(tmp_path / 'sub' / 'b.log'), str(tmp_path / 'sub' / 'opt.sset')]
+
+    # files given directly are kept
+    assert file_list.expand_file_list([tmp_path / 'notes.txt']) == [str(tmp_path / 'notes.txt')]
@@ -0,0 +1,28 @@
+from pathlib import Path
+
+import pytest
+
+from gauprep import structure_reader
+
+DATA_DIR = Path(__file__).absolute().parent / 'data'
+
+
+@pytest.mark.parametrize('chunk_size', [structure_reader.IRC_READ_CHUNK_SIZE, 64])
+def test_irc_points_use_route_of_link1_section(chunk_size):
+    # stable=opt section, then IRC=(reverse) section (the route is continued in the next line)
+    points = list(structure_reader.iterate_irc_points(DATA_DIR / 'irc_link1.log', chunk_size=chunk_size))
+    assert [(direction, number) for (direction, number, _, _, _) in points] == \
+        [('reverse', 1), ('reverse', 2), ('reverse', 3)]
+
+
+def test_irc_endpoints_of_link1_log(tmp_path):
+    endpoints = structure_reader.read_irc_endpoints(DATA_DIR / 'irc_link1.log')
+    assert list(endpoints) == ['reverse']
+    charge, multi, structure = endpoints['reverse']
+    assert (charge, multi) == (0, 1)
+    assert structure[1].split() == ['H', '0.000000', '0.000000', '0.770000']
+
+    # the same log without reverse in the IRC route
+    forward_log = tmp_path / 'irc_forward.log'
+    forward_log.write_text((DATA_DIR / 'irc_link1.log').read_text().replace(',rev\n erse)', ')'))
+    assert list(structure_reader.read_irc_endpoints(forward_log)) == ['forward']
@@ -0,0 +1,24 @@
+import configparser
+
+import pytest
+
+from gauprep import sweep
+
+
+def _read_sweep(section: str):
+    setdata = configparser.ConfigParser()
+    setdata.read_string('[Sweep]\n' + section)
+    return sweep.read_sweep(setdata)
+
+
+def test_sweep_values_are_choices():
+    values = _read_sweep('method = B3LYP m062x wB97XD\ndispersion = none GD3BJ\n')
+    assert values == {'method': ['B3LYP', 'M062X', 'wB97XD'], 'dispersion': ['none', 'GD3BJ']}
+
+
+@pytest.mark.parametrize('section, term', [('method = B3LYP M06-2X\n', 'M06-2X'),
+                                           ('basis = def2-SVP\n', 'def2-SVP'),
+                                           ('dispersion = D3BJ\n', 'D3BJ')])
+def test_unknown_sweep_value(section, term):
+    with pytest.raises(ValueError, match=term):
+        _read_sweep(section)